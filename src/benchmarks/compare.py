@@ -0,0 +1,68 @@
+import argparse
+import json
+from typing import Any, Dict, List, Tuple
+
+# A configuration is comparable between commits when its workload, scale, runner and processes are the same.
+Configuration = Tuple[str, int, str, int]
+
+
+def load_results(paths: List[str]) -> List[Dict[str, Any]]:
+    """
+    Load the results written by run.py.
+
+    :param paths: The locations of the JSON lines results files.
+    :return: The results, in file order.
+    """
+    results = []
+    for path in paths:
+        with open(path) as results_file:
+            results.extend(json.loads(line) for line in results_file if line.strip())
+    return results
+
+
+def by_configuration(results: List[Dict[str, Any]], commit: str) -> Dict[Configuration, Dict[str, Any]]:
+    """
+    Select the results of a commit, the last one of each configuration.
+
+    :param results: The results.
+    :param commit: The commit.
+    :return: A dictionary from the configurations to their results.
+    """
+    return {(result['workload'], result['scale'], result['runner'], result['processes']): result
+            for result in results if result['commit'] == commit}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare the latency, throughput and peak memory of two commits in "
+                                                 "the results files of run.py.")
+    parser.add_argument("results", nargs='+', help="The JSON lines results files.")
+    parser.add_argument("--baseline", help="The baseline commit. The second to last commit of the results by default.")
+    parser.add_argument("--candidate", help="The candidate commit. The last commit of the results by default.")
+    args = parser.parse_args()
+
+    results = load_results(args.results)
+    commits = list(dict.fromkeys(result['commit'] for result in results))
+    if len(commits) < 2 and not (args.baseline and args.candidate):
+        parser.error(f"The results have {len(commits)} commit(s), comparing needs two.")
+    baseline = args.baseline or commits[-2]
+    candidate = args.candidate or commits[-1]
+    baseline_results = by_configuration(results, baseline)
+    candidate_results = by_configuration(results, candidate)
+
+    # The ratios are candidate / baseline, so a latency or a memory ratio below 1 is an improvement.
+    print(f"{baseline} -> {candidate}")
+    print(f"{'workload':>16} {'scale':>5} {'runner':>8} {'latency (s)':>21} {'ratio':>6} {'peak (MB)':>17} "
+          f"{'ratio':>6}")
+    for configuration in sorted(baseline_results.keys() & candidate_results.keys()):
+        old, new = baseline_results[configuration], candidate_results[configuration]
+        workload, scale, runner, _ = configuration
+        print(f"{workload:>16} {scale:>5} {runner:>8} {old['latency']:>10.3f} {new['latency']:>10.3f} "
+              f"{new['latency'] / old['latency']:>6.2f} {old['peak_memory']:>8.1f} {new['peak_memory']:>8.1f} "
+              f"{new['peak_memory'] / old['peak_memory']:>6.2f}")
+    for configuration in sorted(baseline_results.keys() ^ candidate_results.keys()):
+        print(f"{' '.join(map(str, configuration[:3]))}: only in "
+              f"{baseline if configuration in baseline_results else candidate}")
+
+
+if __name__ == '__main__':
+    main()
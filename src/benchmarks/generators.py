@@ -0,0 +1,188 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from frobenius.utils import write_csr_matrix  # noqa: E402
+
+IRIS_PREDICTORS = ['SepalLengthCm', 'SepalWidthCm', 'PetalLengthCm', 'PetalWidthCm']
+# The mean features of each class, close to those of the real data set, so the classes overlap as they do there.
+IRIS_CLASSES = {
+    'Iris-setosa': [5.0, 3.4, 1.5, 0.2],
+    'Iris-versicolor': [5.9, 2.8, 4.3, 1.3],
+    'Iris-virginica': [6.6, 3.0, 5.6, 2.0],
+}
+TITLE_WORDS = ['the', 'love', 'of', 'war', 'story', 'man', 'woman', 'night', 'day', 'city', 'dark', 'light', 'lost',
+               'king', 'queen', 'return', 'part', 'ii', 'iii', 'la', 'le', 'de', 'and', 'in', 'a', 'last', 'first',
+               'big', 'little', 'world', 'dead', 'life', 'time', 'house', "l'amour", 'mr.', 'vol.']
+GENRES = ['Action', 'Adventure', 'Animation', 'Children', 'Comedy', 'Crime', 'Documentary', 'Drama', 'Fantasy',
+          'Film-Noir', 'Horror', 'Musical', 'Mystery', 'Romance', 'Sci-Fi', 'Thriller', 'War', 'Western']
+
+
+def zipf_weights(n: int, exponent: float) -> np.ndarray:
+    """
+    Get the probabilities of the ranks of a Zipf distribution.
+
+    :param n: The number of ranks.
+    :param exponent: The exponent of the distribution.
+    :return: The probability of each rank, from the most frequent.
+    """
+    weights = 1. / np.arange(1, n + 1) ** exponent
+    return weights / weights.sum()
+
+
+def make_word(index: int) -> str:
+    """
+    Make up a word of letters only, as the title preprocessing removes digits.
+
+    :param index: The index of the word.
+    :return: A distinct word for each index.
+    """
+    letters = []
+    while True:
+        index, letter = divmod(index, 26)
+        letters.append(chr(ord('a') + letter))
+        if not index:
+            return 'zy' + ''.join(letters)
+
+
+def write_dense_matrix(path: str, n_rows: int, n_columns: int, matrix_format: str = 'text', seed: int = 0) -> float:
+    """
+    Write a random dense matrix for FrobeniusNormJob.
+
+    :param path: The location of the output file.
+    :param n_rows: The number of rows.
+    :param n_columns: The number of columns.
+    :param matrix_format: 'text', with the columns separated by spaces, or 'npy'.
+    :param seed: The seed of the random generator.
+    :return: The Frobenius norm of the matrix.
+    """
+    matrix = np.random.default_rng(seed).standard_normal((n_rows, n_columns)).round(6)
+    if matrix_format == 'npy':
+        np.save(path, matrix)
+    else:
+        np.savetxt(path, matrix, fmt='%.6f')
+    return float(np.linalg.norm(matrix))
+
+
+def write_sparse_matrix(path: str,
+                        n_rows: int,
+                        n_columns: int,
+                        density: float,
+                        matrix_format: str = 'text',
+                        seed: int = 0) -> float:
+    """
+    Write a random sparse matrix for FrobeniusNormJob, with about density * n_rows * n_columns non-zero entries at
+    uniform positions.
+
+    :param path: The location of the output file.
+    :param n_rows: The number of rows.
+    :param n_columns: The number of columns.
+    :param density: The fraction of non-zero entries.
+    :param matrix_format: 'text', with one 'row column value' line per entry (for --sparse), or 'csr'.
+    :param seed: The seed of the random generator.
+    :return: The Frobenius norm of the matrix.
+    """
+    rng = np.random.default_rng(seed)
+    # Sorted unique positions, so the entries are in row order and none is repeated.
+    positions = np.unique(rng.integers(0, n_rows * n_columns, size=int(n_rows * n_columns * density)))
+    rows, columns = np.divmod(positions, n_columns)
+    values = rng.standard_normal(len(positions)).round(6)
+    if matrix_format == 'csr':
+        indptr = np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=n_rows))])
+        write_csr_matrix(path, indptr, columns, values, n_columns)
+    else:
+        with open(path, 'w') as output_file:
+            output_file.write(f"% {n_rows} {n_columns} {len(values)}\n")
+            np.savetxt(output_file, np.column_stack([rows, columns, values]), fmt=['%d', '%d', '%.6f'])
+    return float(np.sqrt(np.sum(values * values)))
+
+
+def make_iris(n_rows: int, n_train: int = 1000, seed: int = 0) -> pd.DataFrame:
+    """
+    Generate an iris-like data set for the KNN jobs: the first n_train samples are labelled and the others are not.
+    The features of each class are normally distributed around its mean.
+
+    :param n_rows: The number of samples.
+    :param n_train: The number of labelled samples.
+    :param seed: The seed of the random generator.
+    :return: The samples, with the Id, predictor and Species columns of the iris CSV file.
+    """
+    rng = np.random.default_rng(seed)
+    classes = np.array(list(IRIS_CLASSES))
+    labels = rng.integers(0, len(classes), size=n_rows)
+    means = np.array(list(IRIS_CLASSES.values()))[labels]
+    features = np.clip(means + rng.normal(scale=0.4, size=(n_rows, len(IRIS_PREDICTORS))), 0.1, None).round(1)
+    df = pd.DataFrame(features, columns=IRIS_PREDICTORS)
+    df.insert(0, 'Id', np.arange(1, n_rows + 1))
+    species = classes[labels].astype(object)
+    species[n_train:] = None
+    df['Species'] = species
+    return df
+
+
+def write_iris(path: str, n_rows: int, n_train: int = 1000, seed: int = 0) -> None:
+    """
+    Write an iris-like CSV file for the KNN jobs, see make_iris.
+
+    :param path: The location of the output file.
+    :param n_rows: The number of samples.
+    :param n_train: The number of labelled samples.
+    :param seed: The seed of the random generator.
+    :return: None
+    """
+    make_iris(n_rows, n_train, seed).to_csv(path, index=False)
+
+
+def write_movies(path: str, n_rows: int, n_words: int = 5000, exponent: float = 1.1, seed: int = 0) -> None:
+    """
+    Write a MovieLens-shaped movies.csv file for TopKeywordsJob, with movieId, "title (year)" and genres columns. The
+    title words follow a Zipf distribution over a vocabulary of common title words and made-up ones, and a few movies
+    have no genres listed, as in MovieLens.
+
+    :param path: The location of the output file.
+    :param n_rows: The number of movies.
+    :param n_words: The size of the vocabulary.
+    :param exponent: The exponent of the Zipf distribution of the words.
+    :param seed: The seed of the random generator.
+    :return: None
+    """
+    rng = np.random.default_rng(seed)
+    vocabulary = np.array(TITLE_WORDS + [make_word(index) for index in range(max(n_words - len(TITLE_WORDS), 0))])
+    lengths = rng.integers(1, 7, size=n_rows)
+    words = rng.choice(vocabulary, size=lengths.sum(), p=zipf_weights(len(vocabulary), exponent))
+    years = rng.integers(1900, 2022, size=n_rows)
+    titles = [f"{' '.join(title_words).title()} ({year})"
+              for title_words, year in zip(np.split(words, np.cumsum(lengths)[:-1]), years.tolist())]
+    genres = ['|'.join(rng.choice(GENRES, size=n_genres, replace=False))
+              for n_genres in rng.integers(1, 4, size=n_rows).tolist()]
+    for index in np.flatnonzero(rng.random(n_rows) < 0.01).tolist():
+        genres[index] = '(no genres listed)'
+    pd.DataFrame({'movieId': np.arange(1, n_rows + 1), 'title': titles, 'genres': genres}).to_csv(path, index=False)
+
+
+def write_power_law_graph(path: str,
+                          n_nodes: int,
+                          n_edges: int,
+                          exponent: float = 1.2,
+                          seed: int = 0) -> np.ndarray:
+    """
+    Write a random directed graph for RevertGraphJob in the SNAP edge list format, with Zipf-distributed in-degrees
+    and uniform sources.
+
+    :param path: The location of the output file.
+    :param n_nodes: The number of nodes.
+    :param n_edges: The number of edges.
+    :param exponent: The exponent of the in-degree distribution.
+    :param seed: The seed of the random generator.
+    :return: The (n_edges, 2) array of source, destination edges.
+    """
+    rng = np.random.default_rng(seed)
+    destinations = rng.choice(n_nodes, size=n_edges, p=zipf_weights(n_nodes, exponent))
+    edges = np.column_stack([rng.integers(0, n_nodes, size=n_edges), rng.permutation(n_nodes)[destinations]])
+    with open(path, 'w') as output_file:
+        output_file.write(f"# Directed graph\n# Nodes: {n_nodes} Edges: {n_edges}\n# FromNodeId\tToNodeId\n")
+        np.savetxt(output_file, edges, fmt='%d', delimiter='\t')
+    return edges
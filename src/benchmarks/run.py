@@ -0,0 +1,219 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from generators import write_dense_matrix, write_sparse_matrix, write_iris, write_movies, write_power_law_graph
+
+SOURCE_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNNERS = ['inline', 'local', 'parallel']
+
+# Each workload: the directory of its job, the job class, the arguments of the job after the input path, and the
+# sizes of its input at scale 1.
+WORKLOADS = {
+    'frobenius-dense': ('frobenius', 'job.FrobeniusNormJob', [], dict(n_rows=5000, n_columns=100)),
+    'frobenius-sparse': ('frobenius', 'job.FrobeniusNormJob', ['--sparse'],
+                         dict(n_rows=100000, n_columns=10000, density=1e-4)),
+    'iris-sort-merge': ('iris', 'job.SortMergeIrisClassificationJob', ['-k', '15'], dict(n_rows=20000, n_train=1000)),
+    'iris-kd-tree': ('iris', 'job.KDTreeIrisClassificationJob', ['-k', '15'], dict(n_rows=20000, n_train=1000)),
+    'movies': ('movies', 'job.TopKeywordsJob', [], dict(n_rows=50000)),
+    'webgraph': ('webgraph', 'job.RevertGraphJob', [], dict(n_nodes=10000, n_edges=200000)),
+}
+# The local runner runs the job script of a workload as it is, and iris/job.py only runs SortMergeIrisClassificationJob.
+LOCAL_UNSUPPORTED = {'iris-kd-tree'}
+# The helper modules that the jobs import, which the local runner has to upload next to them.
+MODULES = {
+    'frobenius': ['utils.py'],
+    'iris': ['model.py', 'utils.py'],
+    'movies': ['sketch.py', 'utils.py'],
+    'webgraph': ['utils.py'],
+}
+
+# Each run is a fresh process in the directory of its job, so the peak memory is its own. The peak of the children
+# covers the tasks of the local runner and the workers of the parallel engine.
+RUN = """
+import json
+import resource
+import sys
+import time
+sys.path.append('..')
+from {module} import {job_class} as job_class
+args = {args!r}
+start = time.perf_counter()
+if {runner!r} == 'parallel':
+    import os
+    from common.parallel import ParallelRunner
+    with open(os.devnull, 'wb') as output_file:
+        n_output = ParallelRunner(job_class, args, {processes!r}).run(output_file)
+else:
+    with job_class(args).make_runner() as runner:
+        runner.run()
+        n_output = sum(chunk.count(b'\\n') for chunk in runner.cat_output())
+elapsed = time.perf_counter() - start
+peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+print(json.dumps([elapsed, n_output, peak]))
+"""
+
+
+def write_input(workload: str, path: str, scale: int, seed: int) -> int:
+    """
+    Write the input of a workload, with its sizes at scale 1 multiplied by scale.
+
+    :param workload: The name of the workload.
+    :param path: The location of the input file.
+    :param scale: The multiplier of the number of rows (or edges) of the input.
+    :param seed: The seed of the random generator.
+    :return: The number of input records: matrix entries, CSV rows or edges.
+    """
+    sizes = WORKLOADS[workload][3]
+    if workload == 'frobenius-dense':
+        write_dense_matrix(path, sizes['n_rows'] * scale, sizes['n_columns'], seed=seed)
+        return sizes['n_rows'] * scale * sizes['n_columns']
+    if workload == 'frobenius-sparse':
+        write_sparse_matrix(path, sizes['n_rows'] * scale, sizes['n_columns'], sizes['density'], seed=seed)
+        with open(path) as input_file:
+            # The header line is not an entry.
+            return sum(1 for _ in input_file) - 1
+    if workload.startswith('iris'):
+        write_iris(path, sizes['n_rows'] * scale, sizes['n_train'], seed=seed)
+        return sizes['n_rows'] * scale
+    if workload == 'movies':
+        write_movies(path, sizes['n_rows'] * scale, seed=seed)
+        return sizes['n_rows'] * scale
+    write_power_law_graph(path, sizes['n_nodes'] * scale, sizes['n_edges'] * scale, seed=seed)
+    return sizes['n_edges'] * scale
+
+
+def run_once(workload: str, path: str, runner: str, processes: Optional[int]) -> Tuple[float, int, int]:
+    """
+    Run the job of a workload once, in a fresh process.
+
+    :param workload: The name of the workload.
+    :param path: The location of the input file.
+    :param runner: 'inline', 'local' or 'parallel'.
+    :param processes: The number of processes of the local runner and of the parallel engine. All the cores if None.
+    :return: The wall time in seconds, the number of output records and the peak RSS in kilobytes.
+    """
+    directory, job, args, _ = WORKLOADS[workload]
+    module, job_class = job.rsplit('.', 1)
+    job_args = [path] + args
+    if runner != 'parallel':
+        job_args += ['-r', runner]
+    if runner == 'local':
+        for module_file in MODULES[directory]:
+            job_args += ['--py-files', os.path.join(SOURCE_DIRECTORY, directory, module_file)]
+        if processes:
+            job_args += ['--num-cores', str(processes)]
+    code = RUN.format(module=module, job_class=job_class, args=job_args, runner=runner, processes=processes)
+    output = subprocess.run([sys.executable, '-c', code], cwd=os.path.join(SOURCE_DIRECTORY, directory), check=True,
+                            capture_output=True, text=True)
+    elapsed, n_output, peak = json.loads(output.stdout.splitlines()[-1])
+    return elapsed, n_output, peak
+
+
+def git_commit() -> str:
+    """
+    Get the commit of the source tree, so that results can be compared between commits.
+
+    :return: The short hash of HEAD, with a '-dirty' suffix if tracked files were changed, or 'unknown'.
+    """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SOURCE_DIRECTORY, check=True,
+                                capture_output=True, text=True).stdout.strip()
+        status = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=SOURCE_DIRECTORY,
+                                check=True, capture_output=True, text=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return commit + ('-dirty' if status.strip() else '')
+
+
+def benchmark(workload: str,
+              path: str,
+              n_input: int,
+              scale: int,
+              runner: str,
+              repeat: int,
+              processes: Optional[int]) -> Dict[str, Any]:
+    """
+    Run the job of a workload repeat times and summarize the runs.
+
+    :param workload: The name of the workload.
+    :param path: The location of the input file.
+    :param n_input: The number of input records.
+    :param scale: The scale of the input.
+    :param runner: 'inline', 'local' or 'parallel'.
+    :param repeat: The number of runs.
+    :param processes: The number of processes of the local runner and of the parallel engine.
+    :return: The result: the median and all the wall times, the throughputs at the median wall time, and the largest
+    peak RSS, in megabytes.
+    """
+    runs = [run_once(workload, path, runner, processes) for _ in range(repeat)]
+    latencies = [elapsed for elapsed, _, _ in runs]
+    latency = statistics.median(latencies)
+    n_bytes = os.path.getsize(path)
+    return dict(workload=workload, scale=scale, runner=runner, processes=processes or os.cpu_count(),
+                input_records=n_input, input_bytes=n_bytes, output_records=runs[0][1],
+                latency=latency, latencies=latencies,
+                records_per_second=n_input / latency, megabytes_per_second=n_bytes / 1e6 / latency,
+                peak_memory=max(peak for _, _, peak in runs) / 1024)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the jobs on synthetic inputs of increasing size with each runner, "
+                                                 "and append the throughput, latency and peak memory of every run to a "
+                                                 "JSON lines results file. compare.py compares the results of two "
+                                                 "commits.")
+    parser.add_argument("--workloads", nargs='+', choices=sorted(WORKLOADS), default=sorted(WORKLOADS))
+    parser.add_argument("--scales", type=int, nargs='+', default=[1, 4],
+                        help="The multipliers of the input sizes of the workloads.")
+    parser.add_argument("--runners", nargs='+', choices=RUNNERS, default=RUNNERS)
+    parser.add_argument("--repeat", type=int, default=3, help="How many times to run each configuration.")
+    parser.add_argument("-p", "--processes", type=int,
+                        help="The number of processes of the local runner and of the parallel engine. All the cores "
+                             "by default.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dataDir", help="Where to keep the generated inputs, which are reused when they exist. A "
+                                          "temporary directory by default.")
+    parser.add_argument("--results", default='results.jsonl', help="The JSON lines file to append the results to.")
+    args = parser.parse_args()
+
+    environment = dict(commit=git_commit(), time=time.strftime('%Y-%m-%dT%H:%M:%S'), python=platform.python_version(),
+                       machine=platform.machine(), cpus=os.cpu_count())
+    print(f"commit {environment['commit']}, {environment['cpus']} cpus")
+    print(f"{'workload':>16} {'scale':>5} {'runner':>8} {'records':>10} {'MB':>7} {'latency (s)':>12} "
+          f"{'records/s':>11} {'MB/s':>7} {'peak (MB)':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        data_directory = args.dataDir or directory
+        os.makedirs(data_directory, exist_ok=True)
+        for workload in args.workloads:
+            for scale in args.scales:
+                path = os.path.join(data_directory, f'{workload}_{scale}_{args.seed}.input')
+                # The number of records of an input is kept next to it, so that the input can be reused.
+                counts_path = path + '.records'
+                if os.path.exists(path) and os.path.exists(counts_path):
+                    with open(counts_path) as counts_file:
+                        n_input = int(counts_file.read())
+                else:
+                    n_input = write_input(workload, path, scale, args.seed)
+                    with open(counts_path, 'w') as counts_file:
+                        counts_file.write(str(n_input))
+                for runner in args.runners:
+                    if runner == 'local' and workload in LOCAL_UNSUPPORTED:
+                        continue
+                    result = benchmark(workload, path, n_input, scale, runner, args.repeat, args.processes)
+                    result.update(environment)
+                    with open(args.results, 'a') as results_file:
+                        results_file.write(json.dumps(result) + '\n')
+                    print(f"{workload:>16} {scale:>5} {runner:>8} {n_input:>10} {result['input_bytes'] / 1e6:>7.1f} "
+                          f"{result['latency']:>12.3f} {result['records_per_second']:>11.0f} "
+                          f"{result['megabytes_per_second']:>7.2f} {result['peak_memory']:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
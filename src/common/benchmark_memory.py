@@ -0,0 +1,62 @@
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+SOURCE_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(SOURCE_DIRECTORY)
+from benchmarks.generators import write_iris, write_movies  # noqa: E402
+
+# Each snippet runs in a fresh process, in the directory of its job. It prints its RSS after the imports and its peak
+# RSS, in kilobytes, from /proc (ru_maxrss would include the RSS of this process at the time of the fork).
+MEMORY = ("from collections import deque\ndef memory(field): return int([line for line in open('/proc/self/status') "
+          "if line.startswith(field)][0].split()[1])\n")
+READ_CSV = MEMORY + ("import pandas as pd\nbase = memory('VmRSS')\ndf = pd.read_csv({path!r})\n"
+                     "print(base, memory('VmHWM'))")
+MOVIES_MAPPER = MEMORY + ("from job import TopKeywordsJob\nimport utils\nutils.get_stopwords()\n"
+                          "base = memory('VmRSS')\n"
+                          "job = TopKeywordsJob(['--chunkSize', '{chunk_size}'])\n"
+                          "deque(job.mapper_csv({path!r}, {path!r}), maxlen=0)\nprint(base, memory('VmHWM'))")
+IRIS_MAPPER = MEMORY + ("from job import MergeSortIrisClassificationJob\nbase = memory('VmRSS')\n"
+                        "job = MergeSortIrisClassificationJob(['--chunkSize', '{chunk_size}', '-k', '1'])\n"
+                        "deque(job.mapper_csv({path!r}, {path!r}), maxlen=0)\nprint(base, memory('VmHWM'))")
+
+
+def peak_rss(code: str, directory: str) -> float:
+    """
+    Run a snippet in a fresh Python process and get its peak RSS above the RSS after its imports.
+
+    :param code: The snippet, which prints its RSS after the imports and its peak RSS in kilobytes.
+    :param directory: The working directory of the process.
+    :return: The peak RSS increase, in megabytes.
+    """
+    output = subprocess.run([sys.executable, '-c', code], cwd=directory, check=True, capture_output=True, text=True)
+    base, peak = map(int, output.stdout.split()[-2:])
+    return (peak - base) / 1024
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the peak mapper memory of the CSV-based jobs (Linux).")
+    parser.add_argument("--rows", type=int, nargs='+', default=[100000, 400000, 1600000])
+    parser.add_argument("--chunkSize", type=int, default=100000)
+    args = parser.parse_args()
+
+    print(f"{'job':>7} {'rows':>9} {'file (MB)':>10} {'read_csv (MB)':>14} {'one chunk (MB)':>15} "
+          f"{'chunked (MB)':>13}")
+    with tempfile.TemporaryDirectory() as directory:
+        for job, write, mapper in [('movies', write_movies, MOVIES_MAPPER), ('iris', write_iris, IRIS_MAPPER)]:
+            job_directory = os.path.join(SOURCE_DIRECTORY, job)
+            for n_rows in args.rows:
+                path = os.path.join(directory, f'{job}_{n_rows}.csv')
+                write(path, n_rows)
+                full = peak_rss(READ_CSV.format(path=path), job_directory)
+                one_chunk = peak_rss(mapper.format(path=path, chunk_size=n_rows + 1), job_directory)
+                chunked = peak_rss(mapper.format(path=path, chunk_size=args.chunkSize), job_directory)
+                print(f"{job:>7} {n_rows:>9} {os.path.getsize(path) / 1e6:>10.1f} {full:>14.1f} {one_chunk:>15.1f} "
+                      f"{chunked:>13.1f}")
+                os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+SOURCE_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(SOURCE_DIRECTORY)
+from benchmarks.generators import write_dense_matrix, write_iris, write_movies, write_power_law_graph  # noqa: E402
+
+# Each snippet runs in a fresh process, in the directory of its job, collects the records of a mapper and prints, for
+# each protocol, the number of records, their size in bytes (with the line breaks) and the write and read times.
+MEASURE = """
+import sys
+import time
+sys.path.append('..')
+from mrjob.protocol import JSONProtocol
+from common.protocols import CompactProtocol
+{setup}
+records = list({records})
+for name, protocol in [('json', JSONProtocol()), ('compact', CompactProtocol())]:
+    start = time.perf_counter()
+    lines = [protocol.write(key, value) for key, value in records]
+    write = time.perf_counter() - start
+    start = time.perf_counter()
+    for line in lines:
+        protocol.read(line)
+    read = time.perf_counter() - start
+    print(name, len(records), sum(map(len, lines)) + len(lines), write, read)
+"""
+JOBS = {
+    'frobenius': ("from job import FrobeniusNormJob\njob = FrobeniusNormJob(['--blockRows', '16'])",
+                  "job.mapper_matrix({path!r}, {path!r})"),
+    'iris': ("from job import MergeSortIrisClassificationJob\njob = MergeSortIrisClassificationJob(['-k', '5'])",
+             "job.mapper_csv({path!r}, {path!r})"),
+    'movies': ("from job import TopKeywordsJob\njob = TopKeywordsJob(['--mapperCacheSize', '1'])",
+               "job.mapper_csv({path!r}, {path!r})"),
+    'webgraph': ("from job import RevertGraphJob\njob = RevertGraphJob([])",
+                 "job.mapper_nodes({path!r}, {path!r})"),
+}
+
+
+def measure(job: str, path: str) -> dict:
+    """
+    Serialize the records of the mapper of a job on an input file with the JSON and the compact protocols.
+
+    :param job: The directory of the job.
+    :param path: The location of the input file.
+    :return: A dictionary from the protocol names to tuples of the number of records, their size in bytes, and the
+    write and read times in seconds.
+    """
+    setup, records = JOBS[job]
+    code = MEASURE.format(setup=setup, records=records.format(path=path))
+    output = subprocess.run([sys.executable, '-c', code], cwd=os.path.join(SOURCE_DIRECTORY, job), check=True,
+                            capture_output=True, text=True)
+    results = {}
+    for line in output.stdout.splitlines()[-2:]:
+        name, n_records, n_bytes, write, read = line.split()
+        results[name] = int(n_records), int(n_bytes), float(write), float(read)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the size and the speed of the compact internal protocol "
+                                                 "against JSON, on the mapper records of every job.")
+    parser.add_argument("--scale", type=int, default=1, help="Multiply the size of the inputs.")
+    args = parser.parse_args()
+
+    print(f"{'job':>10} {'protocol':>9} {'records':>9} {'MB':>8} {'write (s)':>10} {'read (s)':>9} "
+          f"{'bytes':>6} {'time':>6}")
+    with tempfile.TemporaryDirectory() as directory:
+        inputs = {
+            'frobenius': (write_dense_matrix, (2000 * args.scale, 200), 'matrix.txt'),
+            'iris': (write_iris, (20000 * args.scale,), 'iris.csv'),
+            'movies': (write_movies, (100000 * args.scale,), 'movies.csv'),
+            'webgraph': (write_power_law_graph, (100000 * args.scale, 1000000 * args.scale), 'graph.txt'),
+        }
+        for job, (write, sizes, name) in inputs.items():
+            path = os.path.join(directory, name)
+            write(path, *sizes)
+            results = measure(job, path)
+            _, json_bytes, json_write, json_read = results['json']
+            for protocol, (n_records, n_bytes, write_time, read_time) in results.items():
+                print(f"{job:>10} {protocol:>9} {n_records:>9} {n_bytes / 1e6:>8.2f} {write_time:>10.3f} "
+                      f"{read_time:>9.3f} {n_bytes / json_bytes:>6.2f} "
+                      f"{(write_time + read_time) / (json_write + json_read):>6.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+import csv
+from io import StringIO
+from typing import Dict, Iterator, List, Optional
+
+import pandas as pd
+
+
+def read_csv_chunks(path: str,
+                    usecols: Optional[List[str]] = None,
+                    dtype: Optional[Dict[str, type]] = None,
+                    chunksize: int = 100000) -> Iterator[pd.DataFrame]:
+    """
+    Stream a CSV file as dataframes of at most chunksize rows, so that the memory is bounded by the chunk size instead
+    of the file size. Only the usecols columns are parsed, with explicit dtypes to skip the type inference.
+
+    :param path: The location of the CSV file.
+    :param usecols: The columns to read. All of them if None.
+    :param dtype: The type of each column. Missing values of str columns stay NaN.
+    :param chunksize: The maximum number of rows of a chunk.
+    :return: An iterator over the chunks, in file order.
+    """
+    with pd.read_csv(path, usecols=usecols, dtype=dtype, chunksize=chunksize) as reader:
+        yield from reader
+
+
+def split_csv_line(line: str) -> List[str]:
+    """
+    Split a line of a CSV file into its fields, with the quoting rules of read_csv_chunks, so that a line read on its
+    own is understood as it is in a whole file.
+
+    :param line: The line, with or without its line break.
+    :return: The fields of the line.
+    """
+    return next(csv.reader([line.rstrip('\r\n')]), [])
+
+
+def read_csv_lines(lines: List[str],
+                   names: List[str],
+                   usecols: Optional[List[str]] = None,
+                   dtype: Optional[Dict[str, type]] = None) -> pd.DataFrame:
+    """
+    Parse lines of a CSV file without their header, like read_csv_chunks parses whole files.
+
+    :param lines: The lines, with or without their line breaks.
+    :param names: The columns of the file.
+    :param usecols: The columns to read. All of them if None.
+    :param dtype: The type of each column.
+    :return: The dataframe of the lines.
+    """
+    return pd.read_csv(StringIO('\n'.join(line.rstrip('\r\n') for line in lines)), header=None, names=names,
+                       usecols=usecols, dtype=dtype)
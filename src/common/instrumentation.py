@@ -0,0 +1,357 @@
+import argparse
+import cProfile
+import json
+import os
+import signal
+import time
+from collections import Counter, defaultdict
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from mrjob.compat import jobconf_from_env
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def reset_peak_memory() -> None:
+    """
+    Reset the peak RSS of the process, so that it measures a single task when tasks share a process, as with the inline
+    runner. Only Linux supports this, elsewhere the peak covers the whole process.
+
+    :return: None
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+    except OSError:
+        pass
+
+
+def peak_memory() -> int:
+    """
+    Get the peak RSS of the process since the last reset_peak_memory.
+
+    :return: The peak RSS in kilobytes, or 0 if it is unknown.
+    """
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    # ru_maxrss is in kilobytes on Linux, and is never reset.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else 0
+
+
+class StackSampler:
+    """
+    A sampling profiler for the main thread of a task: a profiling timer interrupts it every interval seconds of CPU
+    time and counts its stack. Its overhead depends on the interval instead of the number of calls, unlike cProfile. It
+    has the enable, disable and dump_stats methods of cProfile.Profile, and dumps the stacks in the collapsed format of
+    flame graphs, one 'caller;...;callee count' line per stack.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        """
+        :param interval: The CPU time between two samples, in seconds.
+        """
+        self.interval = interval
+        self.stacks = Counter()
+        self.previous_handler = None
+
+    def sample(self, _: int, frame: Any) -> None:
+        """
+        Count the stack of the interrupted frame.
+
+        :param _: The signal number (unused).
+        :param frame: The interrupted frame.
+        :return: None
+        """
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+            frame = frame.f_back
+        self.stacks[';'.join(reversed(stack))] += 1
+
+    def enable(self) -> None:
+        """
+        Start sampling.
+
+        :return: None
+        """
+        self.previous_handler = signal.signal(signal.SIGPROF, self.sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def disable(self) -> None:
+        """
+        Stop sampling.
+
+        :return: None
+        """
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        signal.signal(signal.SIGPROF, self.previous_handler)
+
+    def dump_stats(self, path: str) -> None:
+        """
+        Write the sampled stacks in the collapsed format.
+
+        :param path: The location of the output file.
+        :return: None
+        """
+        with open(path, 'w') as output_file:
+            for stack, count in self.stacks.most_common():
+                output_file.write(f'{stack} {count}\n')
+
+
+PROFILERS = {
+    'cprofile': (cProfile.Profile, 'prof'),
+    'sample': (StackSampler, 'folded'),
+}
+
+
+class InstrumentationMixin:
+    """
+    A mixin for the MRJob subclasses, placed before MRJob in the bases, that measures each mapper, combiner and reducer
+    task: its records and bytes in and out, its wall and CPU time and its peak memory. The measures are reported as
+    counters with --instrument, and appended to a JSON lines report with --instrumentReport. --profileTask runs a
+    single task under a profiler. Without these options the tasks run unwrapped, so the overhead is a few attribute
+    lookups per task.
+
+    The bytes are those of the encoded records read and written with the protocols of the task, so the input of a raw
+    mapper is the size of its file. The times include the encoding and the decoding of the records.
+    """
+
+    def __init__(self, args: Optional[List[str]] = None):
+        """
+        :param args: The command line arguments of the job.
+        """
+        super(InstrumentationMixin, self).__init__(args)
+        # The bytes [in, out] of the protocols of the running tasks, by step number and type.
+        self.protocol_bytes: Dict[Tuple[int, str], List[int]] = {}
+
+    def configure_args(self) -> None:
+        """
+        Configure the command line arguments of the instrumentation.
+
+        :return: None
+        """
+        super(InstrumentationMixin, self).configure_args()
+        self.add_passthru_arg("--instrument",
+                              action="store_true",
+                              help="Report the records, bytes, times and peak memory of each task as counters, in "
+                                   "the 'step N mapper|combiner|reducer' groups.")
+        self.add_passthru_arg("--instrumentReport",
+                              help="Append the measures of each task to this JSON lines file, which "
+                                   "'python instrumentation.py' summarizes. Use an absolute path with the local "
+                                   "runner, whose tasks run in their own directories.")
+        self.add_passthru_arg("--profileTask",
+                              help="Profile a single task, given as STEP-TYPE-PARTITION, e.g. 1-mapper-0. The steps "
+                                   "are numbered from 1, as in the counters.")
+        self.add_passthru_arg("--profiler",
+                              choices=sorted(PROFILERS),
+                              default='cprofile',
+                              help="The profiler of --profileTask: cProfile, whose output pstats reads, or a sampling "
+                                   "profiler that writes collapsed stacks for flame graphs.")
+        self.add_passthru_arg("--profileDir",
+                              default='.',
+                              help="Where to write the profile of --profileTask. Use an absolute path with the local "
+                                   "runner.")
+
+    def pick_protocols(self, step_num: int, step_type: str) -> Tuple[Callable, Callable]:
+        """
+        Pick the read and write functions of a task and, if the task is instrumented, count the bytes they read and
+        write.
+
+        :param step_num: The number of the step, from 0.
+        :param step_type: 'mapper', 'combiner' or 'reducer'.
+        :return: The read and write functions.
+        """
+        read, write = super(InstrumentationMixin, self).pick_protocols(step_num, step_type)
+        if not (self.options.instrument or self.options.instrumentReport):
+            return read, write
+        task_bytes = self.protocol_bytes[step_num, step_type] = [0, 0]
+
+        def counted_read(line: bytes) -> Tuple[Any, Any]:
+            # The line break was stripped.
+            task_bytes[0] += len(line) + 1
+            return read(line)
+
+        def counted_write(key: Any, value: Any) -> bytes:
+            line = write(key, value)
+            task_bytes[1] += len(line) + 1
+            return line
+
+        return counted_read, counted_write
+
+    def map_pairs(self, pairs: Iterable, step_num: int = 0) -> Iterator:
+        """
+        Run a map task, instrumented if enabled.
+
+        :param pairs: The input records of the task.
+        :param step_num: The number of the step, from 0.
+        :return: The output records of the task.
+        """
+        return self.instrument_pairs(step_num, 'mapper', pairs,
+                                     lambda task_pairs: super(InstrumentationMixin, self).map_pairs(task_pairs,
+                                                                                                    step_num))
+
+    def combine_pairs(self, pairs: Iterable, step_num: int = 0) -> Iterator:
+        """
+        Run a combine task, instrumented if enabled.
+
+        :param pairs: The input records of the task.
+        :param step_num: The number of the step, from 0.
+        :return: The output records of the task.
+        """
+        return self.instrument_pairs(step_num, 'combiner', pairs,
+                                     lambda task_pairs: super(InstrumentationMixin, self).combine_pairs(task_pairs,
+                                                                                                        step_num))
+
+    def reduce_pairs(self, pairs: Iterable, step_num: int = 0) -> Iterator:
+        """
+        Run a reduce task, instrumented if enabled.
+
+        :param pairs: The input records of the task.
+        :param step_num: The number of the step, from 0.
+        :return: The output records of the task.
+        """
+        return self.instrument_pairs(step_num, 'reducer', pairs,
+                                     lambda task_pairs: super(InstrumentationMixin, self).reduce_pairs(task_pairs,
+                                                                                                       step_num))
+
+    def instrument_pairs(self,
+                         step_num: int,
+                         step_type: str,
+                         pairs: Iterable,
+                         run_pairs: Callable[[Iterable], Iterator]) -> Iterator:
+        """
+        Run a task, instrumented if any of the instrumentation options is set. Execution engines that do not go through
+        map_pairs, combine_pairs and reduce_pairs can call this directly.
+
+        :param step_num: The number of the step, from 0.
+        :param step_type: 'mapper', 'combiner' or 'reducer'.
+        :param pairs: The input records of the task.
+        :param run_pairs: Runs the task on its input records and returns its output records.
+        :return: The output records of the task.
+        """
+        options = self.options
+        if not (options.instrument or options.instrumentReport or options.profileTask):
+            return run_pairs(pairs)
+        return self.run_instrumented(step_num, step_type, pairs, run_pairs)
+
+    def run_instrumented(self,
+                         step_num: int,
+                         step_type: str,
+                         pairs: Iterable,
+                         run_pairs: Callable[[Iterable], Iterator]) -> Iterator:
+        """
+        Run a task and measure it from the first to the last of its output records, so the time spent by the caller
+        writing them is included.
+
+        :param step_num: The number of the step, from 0.
+        :param step_type: 'mapper', 'combiner' or 'reducer'.
+        :param pairs: The input records of the task.
+        :param run_pairs: Runs the task on its input records and returns its output records.
+        :return: The output records of the task.
+        """
+        partition = int(jobconf_from_env('mapreduce.task.partition', '0'))
+        task_name = f'{step_num + 1}-{step_type}-{partition}'
+        profiler = None
+        if self.options.profileTask == task_name:
+            profiler_class, extension = PROFILERS[self.options.profiler]
+            profiler = profiler_class()
+        records_in = 0
+
+        def counted(task_pairs: Iterable) -> Iterator:
+            nonlocal records_in
+            for pair in task_pairs:
+                records_in += 1
+                yield pair
+
+        records_out = 0
+        reset_peak_memory()
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        if profiler:
+            profiler.enable()
+        try:
+            for pair in run_pairs(counted(pairs)):
+                records_out += 1
+                yield pair
+        finally:
+            if profiler:
+                profiler.disable()
+                profiler.dump_stats(os.path.join(self.options.profileDir, f'{task_name}.{extension}'))
+        measures = dict(job=type(self).__name__, step=step_num + 1, type=step_type, partition=partition,
+                        records_in=records_in, records_out=records_out,
+                        wall_time=time.perf_counter() - wall_start, cpu_time=time.process_time() - cpu_start,
+                        peak_memory=peak_memory())
+        bytes_in, bytes_out = self.protocol_bytes.pop((step_num, step_type), (0, 0))
+        if step_type == 'mapper' and self.steps()[step_num]['mapper_raw']:
+            bytes_in = os.path.getsize(self.options.args[0])
+        measures.update(bytes_in=bytes_in, bytes_out=bytes_out)
+        self.report_task(measures)
+
+    def report_task(self, measures: Dict[str, Any]) -> None:
+        """
+        Report the measures of a task as counters and to the JSON report, according to the options.
+
+        :param measures: The measures of the task, see run_instrumented.
+        :return: None
+        """
+        if self.options.instrument:
+            group = f"step {measures['step']} {measures['type']}"
+            for counter in ('records_in', 'records_out', 'bytes_in', 'bytes_out'):
+                self.increment_counter(group, counter.replace('_', ' '), measures[counter])
+            self.increment_counter(group, 'tasks', 1)
+            self.increment_counter(group, 'wall time (ms)', int(measures['wall_time'] * 1000))
+            self.increment_counter(group, 'cpu time (ms)', int(measures['cpu_time'] * 1000))
+            # Counters are added up across tasks, so the peak memory has one per partition.
+            self.increment_counter(group, f"peak memory (kB) partition {measures['partition']}",
+                                   measures['peak_memory'])
+        if self.options.instrumentReport:
+            with open(self.options.instrumentReport, 'a') as report:
+                report.write(json.dumps(measures) + '\n')
+
+
+def summarize(path: str) -> Dict[Tuple[str, int, str], Dict[str, float]]:
+    """
+    Summarize a JSON lines report of the tasks by job, step and task type.
+
+    :param path: The location of the report.
+    :return: A dictionary from (job, step, type) to the number of tasks, their total records, bytes and times, and
+    their largest wall time and peak memory.
+    """
+    summary = defaultdict(lambda: defaultdict(float))
+    with open(path) as report:
+        for line in report:
+            measures = json.loads(line)
+            total = summary[measures['job'], measures['step'], measures['type']]
+            total['tasks'] += 1
+            for name in ('records_in', 'records_out', 'bytes_in', 'bytes_out', 'wall_time', 'cpu_time'):
+                total[name] += measures[name]
+            total['max_wall_time'] = max(total['max_wall_time'], measures['wall_time'])
+            total['peak_memory'] = max(total['peak_memory'], measures['peak_memory'])
+    return {key: dict(total) for key, total in summary.items()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Summarize the --instrumentReport of a job by step and task type.")
+    parser.add_argument("report", help="The JSON lines report.")
+    args = parser.parse_args()
+
+    print(f"{'job':>32} {'step':>4} {'type':>8} {'tasks':>5} {'records in':>11} {'records out':>11} {'MB in':>8} "
+          f"{'MB out':>8} {'wall (s)':>9} {'max (s)':>8} {'cpu (s)':>8} {'MB/s in':>8} {'peak (MB)':>9}")
+    for (job, step, task_type), total in sorted(summarize(args.report).items()):
+        throughput = total['bytes_in'] / 1e6 / total['wall_time'] if total['wall_time'] else 0.
+        print(f"{job:>32} {step:>4} {task_type:>8} {int(total['tasks']):>5} {int(total['records_in']):>11} "
+              f"{int(total['records_out']):>11} {total['bytes_in'] / 1e6:>8.2f} {total['bytes_out'] / 1e6:>8.2f} "
+              f"{total['wall_time']:>9.3f} {total['max_wall_time']:>8.3f} {total['cpu_time']:>8.3f} "
+              f"{throughput:>8.2f} {total['peak_memory'] / 1024:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
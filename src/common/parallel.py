@@ -0,0 +1,564 @@
+import argparse
+import heapq
+import importlib
+import itertools
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import zlib
+from collections import defaultdict
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple, Type, Union
+
+from mrjob.job import MRJob
+
+# A sorted run of intermediate records, or a chunk of the output of a task: either a list of lines in memory, or the
+# path of a file it was spilled to because the task was over its memory budget.
+Run = Union[List[bytes], str]
+
+# The job class and arguments of the running engine. The workers are forked, so they inherit them instead of
+# receiving them with every task.
+_context: Dict[str, Any] = {}
+_jobs: Dict[str, MRJob] = {}
+
+
+def record_key(line: bytes) -> bytes:
+    """
+    Get the encoded key of an intermediate record, which is what records are partitioned, sorted and grouped by, as in
+    Hadoop Streaming.
+
+    :param line: The record, without the line break.
+    :return: The bytes before the first tab.
+    """
+    return line.split(b'\t', 1)[0]
+
+
+def partition_of(line: bytes, n_partitions: int) -> int:
+    """
+    Hash-partition an intermediate record by its encoded key. crc32 does not depend on the hash seed of the process.
+
+    :param line: The record, without the line break.
+    :param n_partitions: The number of partitions.
+    :return: The partition of the record.
+    """
+    return zlib.crc32(record_key(line)) % n_partitions
+
+
+def read_split(path: str, start: int, end: int) -> Iterator[bytes]:
+    """
+    Read the lines of a file that start in [start, end), as Hadoop input splits do.
+
+    :param path: The location of the file.
+    :param start: The first byte of the split.
+    :param end: The byte after the split.
+    :return: An iterator over the lines, without the line breaks.
+    """
+    with open(path, 'rb') as input_file:
+        if start:
+            input_file.seek(start - 1)
+            # The line that contains the byte before start belongs to the previous split.
+            input_file.readline()
+        while input_file.tell() < end:
+            line = input_file.readline()
+            if not line:
+                break
+            yield line.rstrip(b'\r\n')
+
+
+def read_run(run: Run) -> Iterator[bytes]:
+    """
+    Iterate over the records of a run.
+
+    :param run: The run.
+    :return: An iterator over the records, without the line breaks.
+    """
+    if isinstance(run, list):
+        yield from run
+        return
+    with open(run, 'rb') as run_file:
+        for line in run_file:
+            yield line[:-1]
+
+
+def read_runs(runs: List[Run]) -> Iterator[bytes]:
+    """
+    Iterate over the records of consecutive runs, deleting the spill files once read.
+
+    :param runs: The runs, in order.
+    :return: An iterator over the records, without the line breaks.
+    """
+    for run in runs:
+        yield from read_run(run)
+        if not isinstance(run, list):
+            os.remove(run)
+
+
+def spill(lines: Iterable[bytes], spill_dir: str, suffix: str = '.run') -> str:
+    """
+    Write records to a new spill file, one per line, as they come.
+
+    :param lines: The records.
+    :param spill_dir: The directory of the spill files.
+    :param suffix: The suffix of the spill file.
+    :return: The location of the spill file.
+    """
+    descriptor, path = tempfile.mkstemp(dir=spill_dir, suffix=suffix)
+    with os.fdopen(descriptor, 'wb') as spill_file:
+        for line in lines:
+            spill_file.write(line)
+            spill_file.write(b'\n')
+    return path
+
+
+def read_reduce_output(runs: List[Run]) -> Iterator[Tuple[bytes, bytes]]:
+    """
+    Iterate over the output records of a reduce task, see reduce_task, deleting its spill files once read.
+
+    :param runs: The output chunks of the reduce task, in order.
+    :return: An iterator over (encoded key of the group that produced the record, record) tuples.
+    """
+    for line in read_runs(runs):
+        origin_key, record = line.split(b'\t', 1)
+        yield origin_key, record
+
+
+def buffer_output(lines: Iterable[bytes], memory_budget: int, spill_dir: str) -> List[Run]:
+    """
+    Buffer the output records of a task in memory, spilling them to a file whenever the buffer is over the memory
+    budget.
+
+    :param lines: The records.
+    :param memory_budget: The memory budget of the task, in bytes.
+    :param spill_dir: The directory of the spill files.
+    :return: The chunks of the output, in order.
+    """
+    runs: List[Run] = []
+    buffer = []
+    buffered = 0
+    for line in lines:
+        buffer.append(line)
+        buffered += len(line)
+        if buffered > memory_budget:
+            runs.append(spill(buffer, spill_dir, '.out'))
+            buffer = []
+            buffered = 0
+    if buffer:
+        runs.append(buffer)
+    return runs
+
+
+def split_files(paths: List[str], split_size: int) -> List[Dict[str, Any]]:
+    """
+    Split files into map tasks of about split_size bytes, in file order.
+
+    :param paths: The locations of the files.
+    :param split_size: The size of a split, in bytes.
+    :return: The map tasks.
+    """
+    tasks = []
+    for path in paths:
+        size = os.path.getsize(path)
+        for start in range(0, max(size, 1), split_size):
+            tasks.append(dict(kind='split', path=path, start=start, end=min(start + split_size, size)))
+    return tasks
+
+
+def get_job() -> MRJob:
+    """
+    Get the job of the worker, with its output captured. The job is created once per worker.
+
+    :return: The job.
+    """
+    job = _jobs.get('job')
+    if job is None:
+        job = _jobs['job'] = _context['job_class'](_context['args'])
+    # Counters are written to stderr, so capture them for each task.
+    return job.sandbox()
+
+
+def task_counters(job: MRJob) -> Dict[str, Dict[str, int]]:
+    """
+    Parse the counters that a task wrote to the stderr of its job.
+
+    :param job: The job.
+    :return: A dictionary from the counter groups to dictionaries from the counters to their amounts.
+    """
+    counters = defaultdict(lambda: defaultdict(int))
+    for line in job.stderr.getvalue().decode('utf_8').splitlines():
+        if line.startswith('reporter:counter:'):
+            group_and_counter, amount = line[len('reporter:counter:'):].rsplit(',', 1)
+            group, counter = group_and_counter.split(',', 1)
+            counters[group][counter] += int(amount)
+    return {group: dict(group_counters) for group, group_counters in counters.items()}
+
+
+def has_mapper(step: Any, step_num: int) -> bool:
+    """
+    Check whether a step has a mapper, or passes its input to the reducer as it is. MRStep fills in an identity mapper
+    for reducer-only steps, so this uses the step description that mrjob gives to Hadoop Streaming.
+
+    :param step: The MRStep.
+    :param step_num: The number of the step.
+    :return: True if the step has a script mapper.
+    """
+    return 'mapper' in step.description(step_num)
+
+
+def sort_and_combine(job: MRJob, step_num: int, lines: List[bytes]) -> List[bytes]:
+    """
+    Sort the records of a partition by key, keeping the order of the records of a key, and run the combiner of the
+    step on them, if any.
+
+    :param job: The job.
+    :param step_num: The number of the step.
+    :param lines: The records.
+    :return: The sorted (combined) records.
+    """
+    lines.sort(key=record_key)
+    step = job.steps()[step_num]
+    if not step['combiner']:
+        return lines
+    read, write = job.pick_protocols(step_num, 'combiner')
+    combined = [write(key, value) for key, value in job.combine_pairs(map(read, lines), step_num)]
+    combined.sort(key=record_key)
+    return combined
+
+
+def map_task(task: Dict[str, Any]) -> Tuple[List[List[Run]], Dict[str, Dict[str, int]]]:
+    """
+    Run a map task: run the mapper of the step on a split of its input, and hash-partition, sort and combine the
+    output. The records of a partition are spilled to disk as sorted runs only when the task buffers more than its
+    memory budget. The output of a map-only step is kept as it is, and spilled the same way.
+
+    :param task: The step number, the task number, the input (a raw file, a file split or records of the previous
+    step), the number of partitions, the memory budget of the task in bytes and the spill directory.
+    :return: For each partition, the sorted runs of the task in order (the output chunks for a map-only step), and the
+    counters of the task.
+    """
+    os.environ['mapreduce_task_partition'] = str(task['task_num'])
+    step_num = task['step_num']
+    job = get_job()
+    if task['kind'] == 'raw':
+        # A raw mapper reads its input file and URI from the arguments of the job.
+        job.options.args = [task['path'], task['path']]
+    step = job.steps()[step_num]
+    if task['kind'] == 'split':
+        lines = read_split(task['path'], task['start'], task['end'])
+    else:
+        lines = task.get('lines', ())
+    if has_mapper(step, step_num):
+        read, write = job.pick_protocols(step_num, 'mapper')
+        output = (write(key, value) for key, value in job.map_pairs(map(read, lines), step_num))
+    else:
+        # The records of the previous step are already encoded with the internal protocol.
+        output = lines
+    if not step['reducer']:
+        # A map-only step writes its output as it is.
+        return [buffer_output(output, task['memory_budget'], task['spill_dir'])], task_counters(job)
+
+    n_partitions = task['n_partitions']
+    runs: List[List[Run]] = [[] for _ in range(n_partitions)]
+    buffers: List[List[bytes]] = [[] for _ in range(n_partitions)]
+    buffered = 0
+    for line in output:
+        buffers[partition_of(line, n_partitions) if n_partitions > 1 else 0].append(line)
+        buffered += len(line)
+        if buffered > task['memory_budget']:
+            for partition, buffer in enumerate(buffers):
+                if buffer:
+                    runs[partition].append(spill(sort_and_combine(job, step_num, buffer), task['spill_dir']))
+            buffers = [[] for _ in range(n_partitions)]
+            buffered = 0
+    for partition, buffer in enumerate(buffers):
+        if buffer:
+            runs[partition].append(sort_and_combine(job, step_num, buffer))
+    return runs, task_counters(job)
+
+
+def reduce_groups(step: Any, read: Any, lines: Iterable[bytes]) -> Iterator[Tuple[bytes, Tuple[Any, Any]]]:
+    """
+    Run the reducer of a step on sorted records, as MRJob.reduce_pairs does, keeping track of the key group that
+    produced each output record.
+
+    :param step: The MRStep.
+    :param read: The read function of the input protocol of the reducer.
+    :param lines: The sorted records.
+    :return: An iterator over the output records, as (encoded key of the group, (key, value)) tuples. The records of
+    reducer_init have an empty key, and those of reducer_final the last key.
+    """
+    last_key = b''
+    if step['reducer_init']:
+        for pair in step['reducer_init']() or ():
+            yield last_key, pair
+    for last_key, group in itertools.groupby(lines, key=record_key):
+        pairs = map(read, group)
+        key, value = next(pairs)
+        values = itertools.chain([value], (value for _, value in pairs))
+        for pair in step['reducer'](key, values) or ():
+            yield last_key, pair
+    if step['reducer_final']:
+        for pair in step['reducer_final']() or ():
+            yield last_key, pair
+
+
+def reduce_task(task: Dict[str, Any]) -> Tuple[List[Run], Dict[str, Dict[str, int]]]:
+    """
+    Run a reduce task: merge the sorted runs of a partition, and run the reducer of the step on them. The spilled runs
+    are deleted once merged.
+
+    :param task: The step number, the partition, its sorted runs in map task order, the memory budget of the task in
+    bytes and the spill directory.
+    :return: The output chunks of the task, with one 'encoded key of the group that produced the record<TAB>record'
+    line per output record, spilled like those of buffer_output, and the counters of the task.
+    """
+    os.environ['mapreduce_task_partition'] = str(task['partition'])
+    step_num = task['step_num']
+    job = get_job()
+    step = job.steps()[step_num]
+    read, write = job.pick_protocols(step_num, 'reducer')
+    # heapq.merge is stable, so the records of a key keep their map task order.
+    lines = heapq.merge(*map(read_run, task['runs']), key=record_key)
+
+    def run_reducer(task_lines: Iterable[bytes]) -> Iterator[Tuple[bytes, Tuple[Any, Any]]]:
+        return reduce_groups(step, read, task_lines)
+
+    # Jobs with the instrumentation mixin measure the reducer like the other runners do through reduce_pairs.
+    instrument_pairs = getattr(job, 'instrument_pairs', None)
+    output_pairs = instrument_pairs(step_num, 'reducer', lines, run_reducer) if instrument_pairs else run_reducer(lines)
+    # The encoded keys have no tabs, as they end at the first one.
+    output = buffer_output((origin_key + b'\t' + write(key, value) for origin_key, (key, value) in output_pairs),
+                           task['memory_budget'], task['spill_dir'])
+    for run in task['runs']:
+        if not isinstance(run, list):
+            os.remove(run)
+    return output, task_counters(job)
+
+
+def add_counters(total: Dict[str, Dict[str, int]], counters: Dict[str, Dict[str, int]]) -> None:
+    """
+    Add the counters of a task to the counters of its step.
+
+    :param total: The counters of the step, updated in place.
+    :param counters: The counters of the task.
+    :return: None
+    """
+    for group, group_counters in counters.items():
+        for counter, amount in group_counters.items():
+            total.setdefault(group, {})
+            total[group][counter] = total[group].get(counter, 0) + amount
+
+
+class ParallelRunner:
+    """
+    Run the steps of an MRJob on all the cores of a single machine, in a process pool. Each step:
+    - runs the mappers and combiners on input splits in parallel;
+    - hash-partitions the intermediate records by their encoded key and sorts them in memory, spilling sorted runs to
+      disk only when a task is over its share of the memory budget;
+    - runs one reducer per partition in parallel.
+    The records between the steps stay in memory, and are only spilled to disk, by the tasks that write them or as a
+    whole step output, when they are over the memory budget. The output of the last step is streamed to the output
+    file. The output of a step is ordered by the keys that produced it, as with the inline runner, so a job gives the
+    same output with both, up to the grouping of the records by the combiners.
+    """
+
+    def __init__(self,
+                 job_class: Type[MRJob],
+                 args: List[str],
+                 processes: Optional[int] = None,
+                 memory_budget: int = 512 << 20,
+                 spill_dir: Optional[str] = None):
+        """
+        :param job_class: The MRJob subclass.
+        :param args: The command line arguments of the job, including its input paths.
+        :param processes: The number of worker processes and of partitions. All the cores if None.
+        :param memory_budget: How many bytes of intermediate records the tasks buffer in memory in total, and the
+        engine keeps in memory between two steps.
+        :param spill_dir: Where to spill sorted runs and step outputs. A temporary directory if None.
+        """
+        self.job_class = job_class
+        self.args = args
+        job = job_class(args)
+        self.input_paths = job.options.args
+        self.steps = job.steps()
+        self.processes = processes or os.cpu_count()
+        self.memory_budget = memory_budget
+        self.spill_dir = spill_dir
+        self.counters: List[Dict[str, Dict[str, int]]] = []
+
+    def split_size(self, paths: List[str]) -> int:
+        """
+        Get the size of the input splits of a step, about two per process, of at least 1 MiB.
+
+        :param paths: The locations of the input files of the step.
+        :return: The size of a split, in bytes.
+        """
+        return max(sum(os.path.getsize(path) for path in paths) // (2 * self.processes), 1 << 20)
+
+    def input_tasks(self) -> List[Dict[str, Any]]:
+        """
+        Split the input files of the first step into map tasks: one per file for a raw mapper, or file splits.
+
+        :return: The map tasks.
+        """
+        if self.steps[0]['mapper_raw']:
+            return [dict(kind='raw', path=path) for path in self.input_paths]
+        return split_files(self.input_paths, self.split_size(self.input_paths))
+
+    def run(self, output_file: BinaryIO) -> int:
+        """
+        Run the job.
+
+        :param output_file: The binary file to write the output records of the job to, encoded with its output
+        protocol, one per line.
+        :return: The number of output records.
+        """
+        _context.update(job_class=self.job_class, args=self.args)
+        _jobs.clear()
+        self.counters = []
+        with tempfile.TemporaryDirectory(dir=self.spill_dir) as spill_dir, \
+                multiprocessing.get_context('fork').Pool(self.processes) as pool:
+            tasks = self.input_tasks()
+            for step_num, step in enumerate(self.steps):
+                for task_num, task in enumerate(tasks):
+                    task.update(step_num=step_num, task_num=task_num, n_partitions=self.processes,
+                                memory_budget=self.memory_budget // self.processes, spill_dir=spill_dir)
+                output = self.run_step(pool, step_num, step, tasks, spill_dir)
+                if step_num:
+                    # The step output that the map tasks read, if it was spilled.
+                    for path in {task['path'] for task in tasks if task['kind'] == 'split'}:
+                        os.remove(path)
+                if step_num == len(self.steps) - 1:
+                    return self.write_output(output, output_file)
+                tasks = self.output_tasks(output, spill_dir)
+        return 0
+
+    def output_tasks(self, records: Iterator[bytes], spill_dir: str) -> List[Dict[str, Any]]:
+        """
+        Split the output records of a step into the map tasks of the next step: ordered chunks of the records in
+        memory, or splits of a spill file if the records are over the memory budget.
+
+        :param records: The output records of the step.
+        :param spill_dir: The directory of the spill files.
+        :return: The map tasks.
+        """
+        lines = []
+        buffered = 0
+        for line in records:
+            lines.append(line)
+            buffered += len(line)
+            if buffered > self.memory_budget:
+                path = spill(itertools.chain(lines, records), spill_dir, '.out')
+                return split_files([path], self.split_size([path]))
+        chunk_size = max(len(lines) // (2 * self.processes), 1)
+        return [dict(kind='lines', lines=lines[start:start + chunk_size]) for start in range(0, len(lines), chunk_size)]
+
+    def run_step(self,
+                 pool: Any,
+                 step_num: int,
+                 step: Any,
+                 tasks: List[Dict[str, Any]],
+                 spill_dir: str) -> Iterator[bytes]:
+        """
+        Run the map tasks of a step and, if it has a reducer, its reduce tasks.
+
+        :param pool: The process pool.
+        :param step_num: The number of the step.
+        :param step: The MRStep.
+        :param tasks: The map tasks.
+        :param spill_dir: The directory of the spill files.
+        :return: An iterator over the output records of the step: those of the map tasks in order for a map-only step,
+        and otherwise those of the reduce tasks, ordered by the keys that produced them.
+        """
+        counters = {}
+        self.counters.append(counters)
+        partitions: List[List[Run]] = [[] for _ in range(self.processes)]
+        for runs, task_counters_ in pool.imap(map_task, tasks):
+            add_counters(counters, task_counters_)
+            for partition, partition_runs in enumerate(runs):
+                partitions[partition].extend(partition_runs)
+        if not step['reducer']:
+            return read_runs(partitions[0])
+
+        reduce_tasks = [dict(step_num=step_num, partition=partition, runs=runs,
+                             memory_budget=self.memory_budget // self.processes, spill_dir=spill_dir)
+                        for partition, runs in enumerate(partitions)]
+        outputs = []
+        for output, task_counters_ in pool.imap(reduce_task, reduce_tasks):
+            add_counters(counters, task_counters_)
+            outputs.append(output)
+        return self.merge_outputs(outputs)
+
+    @staticmethod
+    def merge_outputs(outputs: List[List[Run]]) -> Iterator[bytes]:
+        """
+        Merge the outputs of the reduce tasks of a step by the keys that produced their records, across the partitions.
+
+        :param outputs: The output chunks of each reduce task, in partition order.
+        :return: An iterator over the output records of the step.
+        """
+        for _, record in heapq.merge(*map(read_reduce_output, outputs), key=lambda origin_record: origin_record[0]):
+            yield record
+
+    @staticmethod
+    def write_output(records: Iterator[bytes], output_file: BinaryIO) -> int:
+        """
+        Write the output records of the last step.
+
+        :param records: The output records.
+        :param output_file: The binary file to write the records to.
+        :return: The number of records.
+        """
+        n_records = 0
+        for line in records:
+            output_file.write(line)
+            output_file.write(b'\n')
+            n_records += 1
+        return n_records
+
+
+def load_job_class(name: str) -> Type[MRJob]:
+    """
+    Import a job class from the current directory.
+
+    :param name: The module and the class, e.g. job.RevertGraphJob.
+    :return: The class.
+    """
+    sys.path.insert(0, os.getcwd())
+    module_name, class_name = name.rsplit('.', 1)
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run an MRJob on all the cores of this machine, from the directory "
+                                                 "of the job, e.g. python ../common/parallel.py job.RevertGraphJob "
+                                                 "-p 8 -- graph.txt --outputFormat delta. The options of the engine "
+                                                 "come before --, and the arguments of the job after it.")
+    parser.add_argument("job", help="The module and the class of the job.")
+    parser.add_argument("-p", "--processes", type=int, help="The number of processes. All the cores by default.")
+    parser.add_argument("--memoryBudget", type=int, default=512, help="The memory budget of the intermediate "
+                                                                      "records, in megabytes.")
+    parser.add_argument("--spillDir", help="Where to spill sorted runs and step outputs. The temporary directory by "
+                                           "default.")
+    argv = sys.argv[1:]
+    if '--' in argv:
+        args = parser.parse_args(argv[:argv.index('--')])
+        job_args = argv[argv.index('--') + 1:]
+    else:
+        # Without --, the arguments that the engine does not know are those of the job.
+        args, job_args = parser.parse_known_args(argv)
+
+    runner = ParallelRunner(load_job_class(args.job), job_args, args.processes, args.memoryBudget << 20,
+                            args.spillDir)
+    start = time.perf_counter()
+    runner.run(sys.stdout.buffer)
+    print(f"Ran {len(runner.steps)} steps with {runner.processes} processes in {time.perf_counter() - start:.2f}s.",
+          file=sys.stderr)
+    for step_num, counters in enumerate(runner.counters, 1):
+        for group in sorted(counters):
+            for counter in sorted(counters[group]):
+                print(f"step {step_num}: {group}: {counter}={counters[group][counter]}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+import marshal
+import pickle
+import struct
+from array import array
+from typing import Any, Tuple
+
+# Records are lines of tab-separated keys and values, and Hadoop Streaming also splits lines at '\r'. Binary data
+# escapes these bytes with ESCAPE followed by a code byte, and ESCAPE itself as well, so it never contains them. ESCAPE
+# is not 0x00 or 0xff, which are the most frequent bytes of small numbers.
+ESCAPE = b'\x1b'
+ESCAPED = [(ESCAPE, ESCAPE + b'\x01'), (b'\t', ESCAPE + b'\x02'), (b'\n', ESCAPE + b'\x03'), (b'\r', ESCAPE + b'\x04')]
+ESCAPED_BYTES = b''.join(byte for byte, _ in ESCAPED)
+
+# The first byte of an encoded object tells its type. Ints and lists of ints use the narrowest of these widths.
+INT_STRUCTS = {b'b': struct.Struct('<b'), b'h': struct.Struct('<h'), b'i': struct.Struct('<i'),
+               b'q': struct.Struct('<q')}
+INT_ARRAYS = {b'B': 'b', b'H': 'h', b'I': 'i', b'Q': 'q'}
+INT_WIDTHS = [(1 << 7, b'b', b'B'), (1 << 15, b'h', b'H'), (1 << 31, b'i', b'I'), (1 << 63, b'q', b'Q')]
+FLOAT, STR, STR_TUPLE, FLOAT_LIST, MARSHAL, PICKLE = b'd', b's', b't', b'D', b'm', b'p'
+FLOAT_STRUCT = struct.Struct('<d')
+# Separates the strings of STR_TUPLE.
+STR_SEPARATOR = '\x1f'
+# marshal version 2 has no back-references, so equal keys always have equal bytes, as they are partitioned by their
+# bytes. Values use the shorter encodings of the latest version.
+KEY_MARSHAL_VERSION = 2
+VALUE_MARSHAL_VERSION = marshal.version
+
+
+def escape(data: bytes) -> bytes:
+    """
+    Escape the tabs and line breaks of binary data.
+
+    :param data: The binary data.
+    :return: The escaped data.
+    """
+    if len(data.translate(None, ESCAPED_BYTES)) == len(data):
+        return data
+    for byte, escaped in ESCAPED:
+        data = data.replace(byte, escaped)
+    return data
+
+
+def unescape(data: bytes) -> bytes:
+    """
+    Reverse escape. Every ESCAPE starts an escape sequence, so the sequences are replaced in reverse order.
+
+    :param data: The escaped data.
+    :return: The binary data.
+    """
+    if ESCAPE not in data:
+        return data
+    for byte, escaped in reversed(ESCAPED):
+        data = data.replace(escaped, byte)
+    return data
+
+
+def int_width(low: int, high: int) -> Tuple[bytes, bytes]:
+    """
+    Find the narrowest width of a range of ints.
+
+    :param low: The smallest int.
+    :param high: The largest int.
+    :return: The tags of an int and of a list of ints of that width.
+    :raise OverflowError: If the range does not fit in 64 bits.
+    """
+    for limit, int_tag, list_tag in INT_WIDTHS:
+        if -limit <= low and high < limit:
+            return int_tag, list_tag
+    raise OverflowError("The ints do not fit in 64 bits.")
+
+
+def encode(obj: Any, marshal_version: int = VALUE_MARSHAL_VERSION) -> bytes:
+    """
+    Encode an object: ints and floats as fixed-width little-endian numbers, lists of ints or floats as packed arrays,
+    strings and tuples of strings as UTF-8, other built-in objects with marshal and anything else with pickle. The type
+    of the object is kept, so tuples stay tuples unlike with JSON.
+
+    :param obj: The object.
+    :param marshal_version: The marshal version of the objects without a specific encoding.
+    :return: The tagged binary encoding.
+    """
+    obj_type = type(obj)
+    try:
+        if obj_type is int:
+            int_tag, _ = int_width(obj, obj)
+            return int_tag + INT_STRUCTS[int_tag].pack(obj)
+        if obj_type is float:
+            return FLOAT + FLOAT_STRUCT.pack(obj)
+        if obj_type is str:
+            return STR + obj.encode('utf_8')
+        if obj_type is list and obj:
+            item_types = set(map(type, obj))
+            if item_types == {int}:
+                _, list_tag = int_width(min(obj), max(obj))
+                return list_tag + array(INT_ARRAYS[list_tag], obj).tobytes()
+            if item_types == {float}:
+                return FLOAT_LIST + array('d', obj).tobytes()
+        if obj_type is tuple and obj and set(map(type, obj)) == {str}:
+            joined = STR_SEPARATOR.join(obj)
+            if joined.count(STR_SEPARATOR) == len(obj) - 1:
+                return STR_TUPLE + joined.encode('utf_8')
+    except OverflowError:
+        pass
+    try:
+        data = marshal.dumps(obj, marshal_version)
+        # marshal writes other objects with the buffer protocol, such as NumPy scalars, as bytes.
+        if marshal.loads(data) == obj:
+            return MARSHAL + data
+    except ValueError:
+        pass
+    return PICKLE + pickle.dumps(obj, pickle.HIGHEST_PROTOCOL)
+
+
+def decode(data: bytes) -> Any:
+    """
+    Decode an object written by encode.
+
+    :param data: The tagged binary encoding.
+    :return: The object.
+    """
+    tag, payload = data[:1], data[1:]
+    if tag in INT_STRUCTS:
+        return INT_STRUCTS[tag].unpack(payload)[0]
+    if tag in INT_ARRAYS:
+        return array(INT_ARRAYS[tag], payload).tolist()
+    if tag == FLOAT:
+        return FLOAT_STRUCT.unpack(payload)[0]
+    if tag == STR:
+        return payload.decode('utf_8')
+    if tag == STR_TUPLE:
+        return tuple(payload.decode('utf_8').split(STR_SEPARATOR))
+    if tag == FLOAT_LIST:
+        return array('d', payload).tolist()
+    if tag == MARSHAL:
+        return marshal.loads(payload)
+    if tag == PICKLE:
+        return pickle.loads(payload)
+    raise ValueError(f"Unknown encoding tag {tag!r}.")
+
+
+class CompactProtocol:
+    """
+    A compact binary protocol for the records between the steps of a job, which can replace the JSON INTERNAL_PROTOCOL.
+    Keys and values are encoded with encode and escaped, so the records are still tab-separated lines. The arrays are
+    in the native byte order, so all the nodes of a cluster must share it.
+    """
+
+    def __init__(self):
+        self.last_key = None
+        self.last_decoded_key = None
+
+    def read(self, line: bytes) -> Tuple[Any, Any]:
+        """
+        Decode a record. The reducers read the records of a key one after the other, so the last key is cached.
+
+        :param line: The record, without the line break.
+        :return: The key and the value.
+        """
+        key, value = line.split(b'\t', 1)
+        if key != self.last_key:
+            self.last_key = key
+            self.last_decoded_key = decode(unescape(key))
+        return self.last_decoded_key, decode(unescape(value))
+
+    def write(self, key: Any, value: Any) -> bytes:
+        """
+        Encode a record.
+
+        :param key: The key.
+        :param value: The value.
+        :return: The record, without the line break.
+        """
+        return escape(encode(key, KEY_MARSHAL_VERSION)) + b'\t' + escape(encode(value))
@@ -0,0 +1,89 @@
+import io
+import os
+import sys
+
+import pytest
+from mrjob.job import MRJob
+from mrjob.step import MRStep
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from common.instrumentation import InstrumentationMixin, summarize  # noqa: E402
+from common.parallel import ParallelRunner  # noqa: E402
+from common.protocols import CompactProtocol  # noqa: E402
+
+LINES = ['a b c', 'b c', 'c', '', 'a a']
+
+
+class WordCountJob(InstrumentationMixin, MRJob):
+    """Count the words of the input, with a combiner."""
+
+    INTERNAL_PROTOCOL = CompactProtocol
+
+    def mapper(self, _, line):
+        for word in line.split():
+            yield word, 1
+
+    def combiner(self, word, counts):
+        yield word, sum(counts)
+
+    def reducer(self, word, counts):
+        yield word, sum(counts)
+
+    def steps(self):
+        return [MRStep(mapper=self.mapper, combiner=self.combiner, reducer=self.reducer)]
+
+
+@pytest.fixture
+def input_path(tmp_path):
+    path = tmp_path / 'input.txt'
+    path.write_text('\n'.join(LINES) + '\n')
+    return str(path)
+
+
+def run_inline(args):
+    with WordCountJob(args + ['-r', 'inline']).make_runner() as runner:
+        runner.run()
+        return runner.counters()[0]
+
+
+def test_counters(input_path):
+    counters = run_inline([input_path, '--instrument'])
+    mapper, combiner, reducer = counters['step 1 mapper'], counters['step 1 combiner'], counters['step 1 reducer']
+    assert mapper['records in'] == len(LINES)
+    assert mapper['records out'] == combiner['records in'] == 8
+    assert mapper['bytes in'] == os.path.getsize(input_path)
+    assert combiner['records out'] == reducer['records in']
+    assert reducer['records out'] == 3
+    for group in (mapper, combiner, reducer):
+        assert group['tasks'] >= 1
+        assert group['bytes out'] > 0
+        assert any(counter.startswith('peak memory (kB) partition') for counter in group)
+
+
+def test_no_counters_without_instrument(input_path):
+    assert not any(group.startswith('step ') for group in run_inline([input_path]))
+
+
+def test_parallel_counters(input_path):
+    runner = ParallelRunner(WordCountJob, [input_path, '--instrument'], processes=2)
+    runner.run(io.BytesIO())
+    counters = runner.counters[0]
+    assert counters['step 1 mapper']['records in'] == len(LINES)
+    assert counters['step 1 mapper']['records out'] == 8
+    assert counters['step 1 reducer']['records out'] == 3
+    assert counters['step 1 reducer']['tasks'] == 2
+
+
+def test_report_and_summary(input_path, tmp_path):
+    report_path = str(tmp_path / 'report.jsonl')
+    run_inline([input_path, '--instrumentReport', report_path])
+    summary = summarize(report_path)
+    assert summary['WordCountJob', 1, 'mapper']['records_in'] == len(LINES)
+    assert summary['WordCountJob', 1, 'reducer']['records_out'] == 3
+    assert all(total['tasks'] >= 1 and total['wall_time'] >= 0 for total in summary.values())
+
+
+@pytest.mark.parametrize('profiler, extension', [('cprofile', 'prof'), ('sample', 'folded')])
+def test_profile_task(input_path, tmp_path, profiler, extension):
+    run_inline([input_path, '--profileTask', '1-mapper-0', '--profiler', profiler, '--profileDir', str(tmp_path)])
+    assert os.path.exists(tmp_path / f'1-mapper-0.{extension}')
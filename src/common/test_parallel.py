@@ -0,0 +1,128 @@
+import io
+import os
+import sys
+
+import pytest
+from mrjob.job import MRJob
+from mrjob.step import MRStep
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from common import parallel  # noqa: E402
+from common.parallel import ParallelRunner, read_run, read_split, record_key  # noqa: E402
+from common.protocols import CompactProtocol  # noqa: E402
+
+
+class WordLengthsJob(MRJob):
+    """Count the words, group them by length, then count the words of each length: a step with a combiner, a step
+    with a reducer and a map-only step."""
+
+    INTERNAL_PROTOCOL = CompactProtocol
+
+    def mapper_words(self, _, line):
+        for word in line.split():
+            yield word, 1
+
+    def combiner_words(self, word, counts):
+        yield word, sum(counts)
+
+    def reducer_words(self, word, counts):
+        yield word, sum(counts)
+
+    def mapper_lengths(self, word, count):
+        yield len(word), (word, count)
+
+    def reducer_lengths(self, length, words):
+        yield length, sorted(words)
+
+    def mapper_summary(self, length, words):
+        yield length, [len(words), sum(count for _, count in words)]
+
+    def steps(self):
+        return [MRStep(mapper=self.mapper_words, combiner=self.combiner_words, reducer=self.reducer_words),
+                MRStep(mapper=self.mapper_lengths, reducer=self.reducer_lengths),
+                MRStep(mapper=self.mapper_summary)]
+
+
+@pytest.fixture
+def words_path(tmp_path):
+    path = tmp_path / 'words.txt'
+    words = [f'w{index % 97}' + 'x' * (index % 7) for index in range(5000)]
+    path.write_text('\n'.join(' '.join(words[start:start + 10]) for start in range(0, len(words), 10)) + '\n')
+    return str(path)
+
+
+def run_inline(path):
+    with WordLengthsJob([path, '-r', 'inline']).make_runner() as runner:
+        runner.run()
+        return b''.join(runner.cat_output()).splitlines()
+
+
+@pytest.mark.parametrize('memory_budget', [512 << 20, 2048])
+def test_parallel_matches_inline(words_path, tmp_path, memory_budget):
+    output = io.BytesIO()
+    runner = ParallelRunner(WordLengthsJob, [words_path], processes=2, memory_budget=memory_budget,
+                            spill_dir=str(tmp_path))
+    n_records = runner.run(output)
+    lines = output.getvalue().splitlines()
+    assert n_records == len(lines) == 8
+    assert sorted(lines) == sorted(run_inline(words_path))
+    # The spill files are removed with the run.
+    assert sorted(os.listdir(tmp_path)) == ['words.txt']
+
+
+def test_no_spill_under_budget(words_path, tmp_path, monkeypatch):
+    def fail_spill(*_):
+        raise AssertionError("spilled under the memory budget")
+
+    # The workers are forked, so they inherit the patched spill.
+    monkeypatch.setattr(parallel, 'spill', fail_spill)
+    output = io.BytesIO()
+    ParallelRunner(WordLengthsJob, [words_path], processes=2, spill_dir=str(tmp_path)).run(output)
+    assert sorted(output.getvalue().splitlines()) == sorted(run_inline(words_path))
+
+
+def test_map_task_spills_sorted_runs(words_path, tmp_path):
+    parallel._context.update(job_class=WordLengthsJob, args=[words_path])
+    parallel._jobs.clear()
+    task = dict(kind='split', path=words_path, start=0, end=os.path.getsize(words_path), step_num=0, task_num=0,
+                n_partitions=2, memory_budget=1024, spill_dir=str(tmp_path))
+    runs, _ = parallel.map_task(task)
+    assert len(runs) == 2 and all(len(partition_runs) > 1 for partition_runs in runs)
+    # Only the runs over the budget are spilled, the last one of each partition stays in memory.
+    assert all(isinstance(partition_runs[-1], list) for partition_runs in runs)
+    assert all(isinstance(run, str) for partition_runs in runs for run in partition_runs[:-1])
+    counts = {}
+    for partition, partition_runs in enumerate(runs):
+        for run in partition_runs:
+            lines = list(read_run(run))
+            assert lines == sorted(lines, key=record_key)
+            for line in lines:
+                assert parallel.partition_of(line, 2) == partition
+                word, count = CompactProtocol().read(line)
+                counts[word] = counts.get(word, 0) + count
+    assert sum(counts.values()) == 5000 and len(counts) == 97 * 7
+
+
+@pytest.mark.parametrize('content', [b'a\nbb\n\nccc\r\ndddd', b'one line\n', b'', b'\n\n\n'])
+def test_splits_cover_every_line_once(tmp_path, content):
+    path = tmp_path / 'input.txt'
+    path.write_bytes(content)
+    expected = [line.rstrip(b'\r') for line in content.split(b'\n')]
+    if content.endswith(b'\n') or not content:
+        expected = expected[:-1]
+    for split_size in range(1, len(content) + 2):
+        lines = [line for start in range(0, max(len(content), 1), split_size)
+                 for line in read_split(str(path), start, min(start + split_size, len(content)))]
+        assert lines == expected, split_size
+
+
+@pytest.mark.parametrize('arguments', [['-p', '2', '--memoryBudget', '1', '--', '{path}'],
+                                       ['{path}', '-p', '2', '--memoryBudget', '1']])
+def test_cli_separates_engine_and_job_arguments(words_path, monkeypatch, capsysbinary, arguments):
+    monkeypatch.chdir(os.path.dirname(os.path.abspath(__file__)))
+    monkeypatch.setattr(sys, 'argv', ['parallel.py', 'test_parallel.WordLengthsJob'] +
+                        [argument.format(path=words_path) for argument in arguments])
+    parallel.main()
+    captured = capsysbinary.readouterr()
+    assert sorted(captured.out.splitlines()) == sorted(run_inline(words_path))
+    assert b'with 2 processes' in captured.err
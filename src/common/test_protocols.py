@@ -0,0 +1,67 @@
+import os
+import sys
+from fractions import Fraction
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from common.protocols import CompactProtocol, PICKLE, MARSHAL, decode, encode, escape, unescape  # noqa: E402
+
+OBJECTS = [
+    0, -1, 127, 128, -129, 1 << 20, -(1 << 40), (1 << 63) - 1, 1 << 70,
+    0.5, -1e300, float('inf'),
+    '', 'word', 'tab\tnew\nline\rreturn\x1bescape', 'l\'amour',
+    ('drama', 'love'), ('a\x1fb', 'c'), ('tab\t',),
+    [1, 2, 3], [-(1 << 40), 1 << 40], [1 << 64], [0.5, 1.5], [], [1, 'mixed', 2.5],
+    None, True, {'key': [1, 2]}, (1, ('nested', 2.5)), b'\t\n\r',
+]
+
+
+@pytest.mark.parametrize('obj', OBJECTS, ids=repr)
+def test_round_trip(obj):
+    protocol = CompactProtocol()
+    line = protocol.write(obj, obj)
+    # A record is a single line with a single tab between the key and the value.
+    assert b'\n' not in line and b'\r' not in line
+    assert line.count(b'\t') == 1
+    key, value = CompactProtocol().read(line)
+    assert key == obj and type(key) is type(obj)
+    assert value == obj and type(value) is type(obj)
+
+
+@pytest.mark.parametrize('obj', [Fraction(1, 3), np.float32(1.5), np.arange(3)], ids=repr)
+def test_pickle_fallback(obj):
+    data = encode(obj)
+    assert data[:1] == PICKLE
+    assert np.array_equal(decode(data), obj) and type(decode(data)) is type(obj)
+    key, value = CompactProtocol().read(CompactProtocol().write(obj, obj))
+    assert np.array_equal(key, obj) and np.array_equal(value, obj)
+
+
+def test_marshal_fallback():
+    data = encode({'key': (1, 2)})
+    assert data[:1] == MARSHAL
+    assert decode(data) == {'key': (1, 2)}
+
+
+def test_escape_all_bytes():
+    data = bytes(range(256)) * 2
+    escaped = escape(data)
+    assert not set(escaped) & set(b'\t\n\r')
+    assert unescape(escaped) == data
+    # Escape sequences in the data itself are escaped too.
+    assert unescape(escape(b'\x1b\x02\x1b\x01')) == b'\x1b\x02\x1b\x01'
+
+
+def test_equal_keys_have_equal_bytes():
+    # Records are partitioned by the bytes of their keys, so equal keys must be encoded the same way.
+    shared = 'word'
+    key = (shared, shared, 1)
+    assert CompactProtocol().write(key, 0) == CompactProtocol().write(('wo' + 'rd', 'word', 1), 0)
+
+
+def test_read_caches_the_last_key():
+    protocol = CompactProtocol()
+    lines = [protocol.write('key', value) for value in range(3)] + [protocol.write('other', 3)]
+    assert [protocol.read(line) for line in lines] == [('key', 0), ('key', 1), ('key', 2), ('other', 3)]
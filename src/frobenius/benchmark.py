@@ -0,0 +1,100 @@
+import argparse
+import math
+import os
+import tempfile
+import time
+from typing import Tuple
+
+import numpy as np
+
+from job import FrobeniusNormJob
+from utils import write_raw_matrix
+
+
+def write_matrix(directory: str,
+                 n_rows: int,
+                 n_columns: int,
+                 seed: int = 0) -> Tuple[float, str, str, str]:
+    """
+    Write a random dense matrix in the text, .npy and raw formats of the job.
+
+    :param directory: The directory of the output files.
+    :param n_rows: The number of rows.
+    :param n_columns: The number of columns.
+    :param seed: The seed of the random generator.
+    :return: The Frobenius norm of the written matrix and the locations of the text, .npy and raw files.
+    """
+    rng = np.random.default_rng(seed)
+    matrix = rng.normal(size=(n_rows, n_columns)).round(6)
+    text_path = os.path.join(directory, f'matrix_{n_rows}.txt')
+    npy_path = os.path.join(directory, f'matrix_{n_rows}.npy')
+    raw_path = os.path.join(directory, f'matrix_{n_rows}.raw')
+    np.savetxt(text_path, matrix, fmt='%.6f')
+    np.save(npy_path, matrix)
+    write_raw_matrix(raw_path, matrix)
+    return float(np.linalg.norm(matrix)), text_path, npy_path, raw_path
+
+
+def run_raw_mapper(path: str, block_rows: int) -> Tuple[int, float]:
+    """
+    Run the mapper_raw of the job, which emits one record per element of a text matrix, or one record per column of a
+    binary matrix.
+
+    :param path: The location of the matrix file.
+    :param block_rows: How many rows to read at once from a binary matrix.
+    :return: The number of records and the sum of squares.
+    """
+    job = FrobeniusNormJob(['--blockRows', str(block_rows)])
+    records, total = 0, 0.
+    for _, square in job.mapper_matrix(path, path):
+        records += 1
+        total += square
+    return records, total
+
+
+def run_block_mapper(path: str, block_rows: int) -> Tuple[int, float]:
+    """
+    Run the --splitInput mapper of the job over the lines of the file, as a single split.
+
+    :param path: The location of the matrix file.
+    :param block_rows: How many rows to parse at once.
+    :return: The number of records and the sum of squares.
+    """
+    job = FrobeniusNormJob(['--splitInput', '--blockRows', str(block_rows)])
+    job.mapper_init_rows()
+    with open(path, 'r') as input_file:
+        for line in input_file:
+            job.mapper_rows(None, line)
+    records, total = 0, 0.
+    for _, column_sum in job.mapper_final_rows():
+        records += 1
+        total += column_sum
+    return records, total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the throughput of the FrobeniusNormJob mappers.")
+    parser.add_argument("--rows", type=int, nargs='+', default=[1000, 5000])
+    parser.add_argument("--columns", type=int, default=500)
+    parser.add_argument("--blockRows", type=int, default=1024)
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'columns':>8} {'mapper':>8} {'records':>10} {'time (s)':>9} {'MB/s':>8} {'elements/s':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        for n_rows in args.rows:
+            expected, text_path, npy_path, raw_path = write_matrix(directory, n_rows, args.columns)
+            elements = n_rows * args.columns
+            for name, path, run in [('text', text_path, lambda: run_raw_mapper(text_path, args.blockRows)),
+                                    ('block', text_path, lambda: run_block_mapper(text_path, args.blockRows)),
+                                    ('npy', npy_path, lambda: run_raw_mapper(npy_path, args.blockRows)),
+                                    ('raw', raw_path, lambda: run_raw_mapper(raw_path, args.blockRows))]:
+                start = time.perf_counter()
+                records, total = run()
+                elapsed = time.perf_counter() - start
+                assert math.isclose(math.sqrt(total), expected, rel_tol=1e-9)
+                print(f"{n_rows:>8} {args.columns:>8} {name:>8} {records:>10} {elapsed:>9.3f} "
+                      f"{os.path.getsize(path) / 1e6 / elapsed:>8.1f} {elements / elapsed:>12.0f}")
+
+
+if __name__ == '__main__':
+    main()
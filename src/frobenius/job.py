@@ -1,29 +1,294 @@
 import math
-from typing import List, Tuple, Generator
+import os
+import sys
+from typing import List, Tuple, Generator, Dict, Any
 
+import numpy as np
 from mrjob.job import MRJob
 from mrjob.step import MRStep
 
+from utils import parse_rows, column_sums_of_squares, coo_column_sums_of_squares, detect_format, open_matrix, \
+    open_csr_matrix
 
-class FrobeniusNormJob(MRJob):
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from common.instrumentation import InstrumentationMixin  # noqa: E402
+from common.protocols import CompactProtocol  # noqa: E402
+
+
+class FrobeniusNormJob(InstrumentationMixin, MRJob):
     """A mapreduce job that wraps the computation of the Frobenius norm of a matrix."""
 
+    # Upload the shared modules next to the job.
+    DIRS = ['../common']
+    INTERNAL_PROTOCOL = CompactProtocol
+
+    def configure_args(self) -> None:
+        """
+        Configure the command line arguments for running the job.
+
+        :return: None
+        """
+        super(FrobeniusNormJob, self).configure_args()
+        self.add_passthru_arg("-s",
+                              "--splitInput",
+                              action="store_true",
+                              help="Split the rows of text matrices across the mappers, instead of one mapper per "
+                                   "file. Binary matrices cannot be split by lines, see --rowRanges.")
+        self.add_passthru_arg("-b",
+                              "--blockRows",
+                              type=int,
+                              default=1024,
+                              help="How many rows a mapper parses at once, with --splitInput, or reads at once from a "
+                                   "binary matrix.")
+        self.add_passthru_arg("--rowRanges",
+                              action="store_true",
+                              help="Read input manifests of 'path start end' lines, written by manifest.py, instead of "
+                                   "matrices. The ranges are split across the mappers, which memory-map the .npy, raw "
+                                   "or CSR matrix at path and read its rows [start, end), so the rows of one binary "
+                                   "matrix are shared by several mappers. The paths have to be readable by every "
+                                   "mapper.")
+        self.add_passthru_arg("--sparse",
+                              action="store_true",
+                              help="Read text matrices as sparse 'row column value' lines, one per non-zero entry. "
+                                   "Lines starting with '#' or '%%' are skipped. Duplicate entries of a position are "
+                                   "summed, as in scipy.sparse, when they are in the same block of --blockRows lines.")
+
     def mapper_matrix(self,
                       input_path: str,
                       _: str) -> Generator[Tuple[int, float], None, None]:
         """
-        Reads a 2D matrix from a file. Lines are separated by newlines and columns by spaces.
-        
+        Reads a 2D matrix from a file. In the text format, lines are separated by newlines and columns by spaces, or
+        contain one 'row column value' entry with --sparse. NumPy .npy files, raw float files (see utils.RAW_HEADER)
+        and sparse CSR files (see utils.CSR_HEADER) are detected automatically and memory-mapped.
+
         :param input_path: The location of the input file.
         :param _: The URI to the input file (unused).
-        :return: Key-value tuples with the key being the column index and the value being the square of an element.
+        :return: Key-value tuples with the key being the column index and the value being the square of an element
+        (dense text), or the sum of squares of the whole column (otherwise).
         """
+        matrix_format = detect_format(input_path)
+        if matrix_format == 'csr':
+            yield from self.mapper_csr(*open_csr_matrix(input_path))
+            return
+        if matrix_format != 'text':
+            yield from self.mapper_binary(open_matrix(input_path, matrix_format))
+            return
+        if self.options.sparse:
+            self.mapper_init_rows()
+            with open(input_path, 'r') as input_file:
+                for line in input_file:
+                    self.mapper_rows(None, line)
+            yield from self.mapper_final_rows()
+            return
+        empty = True
         with open(input_path, 'r') as input_file:
             for line in input_file:
                 values = line.split()
                 for j, value in enumerate(values):
                     value_f = float(value)
+                    empty = False
                     yield j, value_f * value_f
+        if empty:
+            # As in emit_column_sums, so that the norm of an empty matrix is output.
+            yield 0, 0.
+
+    def mapper_binary(self, matrix: np.ndarray) -> Generator[Tuple[int, float], None, None]:
+        """
+        Sum the squares of each column of a memory-mapped matrix, reading --blockRows rows at a time directly from the
+        mapped buffer.
+
+        :param matrix: A 2D memory-mapped matrix.
+        :return: Key-value tuples with the key being the column index and the value being the sum of squares of the
+        column.
+        """
+        self.mapper_init_rows()
+        self.add_binary_rows(matrix, 0, matrix.shape[0])
+        yield from self.emit_column_sums()
+
+    def mapper_csr(self,
+                   indptr: np.ndarray,
+                   indices: np.ndarray,
+                   data: np.ndarray,
+                   n_columns: int) -> Generator[Tuple[int, float], None, None]:
+        """
+        Sum the squares of each column of a memory-mapped CSR matrix, reading the non-zero entries of --blockRows rows
+        at a time. Only the non-zero entries are read.
+
+        :param indptr: The row pointers.
+        :param indices: The column index of each non-zero entry.
+        :param data: The value of each non-zero entry.
+        :param n_columns: The number of columns.
+        :return: Key-value tuples with the key being the column index and the value being the sum of squares of the
+        column.
+        """
+        self.mapper_init_rows()
+        self.add_csr_rows((indptr, indices, data, n_columns), 0, len(indptr) - 1)
+        yield from self.emit_column_sums()
+
+    def add_binary_rows(self, matrix: np.ndarray, start: int, end: int) -> None:
+        """
+        Add the squares of the rows [start, end) of a memory-mapped matrix to the per-column sums, --blockRows rows at
+        a time.
+
+        :param matrix: A 2D memory-mapped matrix.
+        :param start: The first row.
+        :param end: The row after the last one.
+        :return: None
+        """
+        for block_start in range(start, end, self.options.blockRows):
+            block = matrix[block_start:min(block_start + self.options.blockRows, end)]
+            self.add_column_sums(column_sums_of_squares(np.asarray(block, dtype=np.float64)))
+
+    def add_csr_rows(self,
+                     matrix: Tuple[np.ndarray, np.ndarray, np.ndarray, int],
+                     start: int,
+                     end: int) -> None:
+        """
+        Add the squares of the non-zero entries of the rows [start, end) of a memory-mapped CSR matrix to the
+        per-column sums, --blockRows rows at a time.
+
+        :param matrix: The row pointers, column indices, values and number of columns, as returned by open_csr_matrix.
+        :param start: The first row.
+        :param end: The row after the last one.
+        :return: None
+        """
+        indptr, indices, data, n_columns = matrix
+        for block_start in range(start, end, self.options.blockRows):
+            begin = int(indptr[block_start])
+            block_end = int(indptr[min(block_start + self.options.blockRows, end)])
+            values = np.asarray(data[begin:block_end], dtype=np.float64)
+            self.add_column_sums(np.bincount(indices[begin:block_end], weights=values * values, minlength=n_columns))
+
+    def mapper_init_ranges(self) -> None:
+        """
+        Initialize the per-column sums of the mapper and its memory-mapped matrices, which are opened once per mapper.
+
+        :return: None
+        """
+        self.mapper_init_rows()
+        self.matrices = {}
+
+    def mapper_ranges(self,
+                      _: None,
+                      line: str) -> None:
+        """
+        Add the squares of a range of rows of a binary matrix to the per-column sums.
+
+        :param _: The key (unused).
+        :param line: A 'path start end' manifest line, separated by whitespace.
+        :return: None, the sums are emitted by mapper_final_rows.
+        """
+        if not line.strip():
+            return
+        path, start, end = line.rsplit(None, 2)
+        if path not in self.matrices:
+            matrix_format = detect_format(path)
+            if matrix_format == 'text':
+                raise ValueError(f"{path} is not a binary matrix, --rowRanges reads .npy, raw and CSR files.")
+            self.matrices[path] = (matrix_format, open_csr_matrix(path) if matrix_format == 'csr'
+                                   else open_matrix(path, matrix_format))
+        matrix_format, matrix = self.matrices[path]
+        if matrix_format == 'csr':
+            self.add_csr_rows(matrix, int(start), int(end))
+        else:
+            self.add_binary_rows(matrix, int(start), int(end))
+
+    def mapper_init_rows(self) -> None:
+        """
+        Initialize the row buffer and the per-column sums of squares of the mapper.
+
+        :return: None
+        """
+        self.rows = []
+        self.column_sums = np.zeros(0)
+
+    def mapper_rows(self,
+                    _: None,
+                    line: str) -> None:
+        """
+        Buffers a row of the matrix (or an entry, with --sparse), and adds the squares of the buffered rows to the
+        per-column sums once there are --blockRows of them.
+
+        :param _: The key (unused).
+        :param line: A row of the matrix, with the columns separated by spaces.
+        :return: None, the sums are emitted by mapper_final_rows.
+        """
+        if self.options.sparse and line.startswith(('#', '%')):
+            return
+        if line.strip():
+            self.rows.append(line)
+        if len(self.rows) >= self.options.blockRows:
+            self.add_rows()
+
+    def add_rows(self) -> None:
+        """
+        Parse the buffered rows as a block and add their squares to the per-column sums.
+
+        :return: None
+        """
+        if not self.rows:
+            return
+        block = parse_rows(self.rows)
+        self.rows = []
+        if self.options.sparse:
+            self.add_column_sums(coo_column_sums_of_squares(block))
+        else:
+            self.add_column_sums(column_sums_of_squares(block))
+
+    def add_column_sums(self, block_sums: np.ndarray) -> None:
+        """
+        Add the per-column sums of squares of a block to those of the mapper, growing them if the block has more
+        columns.
+
+        :param block_sums: The sum of squares of each column of the block.
+        :return: None
+        """
+        if block_sums.size > self.column_sums.size:
+            block_sums[:self.column_sums.size] += self.column_sums
+            self.column_sums = block_sums
+        else:
+            self.column_sums[:block_sums.size] += block_sums
+
+    def emit_column_sums(self) -> Generator[Tuple[int, float], None, None]:
+        """
+        Emit the sums of squares of the mapper, one per column. Columns without non-zero entries are skipped, as they
+        do not change the norm, but a mapper always emits at least the sum of column 0, so that the norm of an all-zero
+        or empty matrix is still output, as 0.
+
+        :return: Key-value tuples with the key being the column index and the value being the mapper-local sum of
+        squares of that column.
+        """
+        columns = np.flatnonzero(self.column_sums).tolist() or [0]
+        for j in columns:
+            yield j, float(self.column_sums[j]) if j < self.column_sums.size else 0.
+
+    def mapper_final_rows(self) -> Generator[Tuple[int, float], None, None]:
+        """
+        Add the remaining buffered rows and emit the sums of squares of the mapper, one per column.
+
+        :return: Key-value tuples with the key being the column index and the value being the mapper-local sum of
+        squares of that column.
+        """
+        self.add_rows()
+        yield from self.emit_column_sums()
+
+    def mapper_kwargs(self) -> Dict[str, Any]:
+        """
+        Select the mapper of the first step: either every mapper reads a whole file element by element, or the rows are
+        split across the mappers and parsed in blocks, or the row ranges of binary matrices are split across the
+        mappers.
+
+        :return: The mapper keyword arguments of the MRStep.
+        """
+        if self.options.rowRanges:
+            return dict(mapper_init=self.mapper_init_ranges,
+                        mapper=self.mapper_ranges,
+                        mapper_final=self.mapper_final_rows)
+        if self.options.splitInput:
+            return dict(mapper_init=self.mapper_init_rows,
+                        mapper=self.mapper_rows,
+                        mapper_final=self.mapper_final_rows)
+        return dict(mapper_raw=self.mapper_matrix)
 
     def combiner_column(self,
                         key: int,
@@ -70,7 +335,7 @@ class FrobeniusNormJob(MRJob):
        """
 
         return [
-            MRStep(mapper_raw=self.mapper_matrix,
+            MRStep(**self.mapper_kwargs(),
                    combiner=self.combiner_column,
                    reducer=self.reducer_column),
             MRStep(reducer=self.reducer_line)
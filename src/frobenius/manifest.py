@@ -0,0 +1,27 @@
+import argparse
+
+from utils import row_ranges
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Write the input manifest of FrobeniusNormJob --rowRanges: one "
+                                                 "'path start end' line per range of rows of the binary matrices, so "
+                                                 "that the mappers share the rows of a matrix instead of reading a "
+                                                 "whole file each.")
+    parser.add_argument("matrices", nargs='+', help="The .npy, raw or CSR matrix files.")
+    parser.add_argument("output", help="The manifest file.")
+    parser.add_argument("--rangeRows", type=int, default=65536, help="The number of rows of each range.")
+    args = parser.parse_args()
+    if args.rangeRows < 1:
+        parser.error("--rangeRows must be positive.")
+    n_ranges = 0
+    with open(args.output, 'w') as output_file:
+        for matrix in args.matrices:
+            for path, start, end in row_ranges(matrix, args.rangeRows):
+                output_file.write(f"{path}\t{start}\t{end}\n")
+                n_ranges += 1
+    print(f"Wrote {n_ranges} row ranges to {args.output}.")
+
+
+if __name__ == '__main__':
+    main()
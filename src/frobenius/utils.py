@@ -0,0 +1,178 @@
+import os
+import struct
+from typing import List, Tuple
+
+import numpy as np
+
+NPY_MAGIC = b'\x93NUMPY'
+RAW_MAGIC = b'RAWMATRX'
+# The header of the raw format: the magic, the item size of the little-endian floats (4 or 8), padding, rows, columns.
+RAW_HEADER = struct.Struct('<8sB7xQQ')
+RAW_DTYPES = {4: '<f4', 8: '<f8'}
+CSR_MAGIC = b'CSRMATRX'
+# The header of the CSR format: the magic, the item size of the values, padding, rows, columns, non-zero entries.
+# It is followed by the row pointers (rows + 1 int64), the column indices (nnz int64) and the values (nnz floats).
+CSR_HEADER = struct.Struct('<8sB7xQQQ')
+CSR_INDEX_DTYPE = '<i8'
+
+
+def parse_rows(lines: List[str]) -> np.ndarray:
+    """
+    Parse a block of matrix rows, with the columns separated by whitespace, in a single NumPy call.
+
+    :param lines: Non-empty lines of the matrix, with the same number of columns.
+    :return: A (len(lines), n_columns) matrix.
+    """
+    n_columns = len(lines[0].split())
+    values = np.fromstring(' '.join(lines), sep=' ')
+    if values.size != n_columns * len(lines):
+        raise ValueError("The rows of the matrix block have different lengths.")
+    return values.reshape(len(lines), n_columns)
+
+
+def column_sums_of_squares(rows: np.ndarray) -> np.ndarray:
+    """
+    Compute the sum of the squares of each column of a matrix block.
+
+    :param rows: A (n_rows, n_columns) matrix.
+    :return: An array with the sum of squares of each column.
+    """
+    return np.einsum('ij,ij->j', rows, rows)
+
+
+def detect_format(path: str) -> str:
+    """
+    Detect the format of a matrix file from its first bytes.
+
+    :param path: The location of the matrix file.
+    :return: 'npy' for NumPy .npy files, 'raw' for raw little-endian float files with a RAW_HEADER, 'csr' for sparse
+    files with a CSR_HEADER, 'text' otherwise.
+    """
+    with open(path, 'rb') as input_file:
+        head = input_file.read(len(RAW_MAGIC))
+    if head.startswith(NPY_MAGIC):
+        return 'npy'
+    if head == RAW_MAGIC:
+        return 'raw'
+    if head == CSR_MAGIC:
+        return 'csr'
+    return 'text'
+
+
+def open_matrix(path: str, matrix_format: str) -> np.ndarray:
+    """
+    Memory-map a binary matrix file, without reading or copying its content.
+
+    :param path: The location of the matrix file.
+    :param matrix_format: The format of the file, 'npy' or 'raw' (see detect_format).
+    :return: A read-only 2D memory-mapped array.
+    """
+    if matrix_format == 'npy':
+        matrix = np.load(path, mmap_mode='r')
+    else:
+        with open(path, 'rb') as input_file:
+            _, item_size, n_rows, n_columns = RAW_HEADER.unpack(input_file.read(RAW_HEADER.size))
+        matrix = np.memmap(path, dtype=RAW_DTYPES[item_size], mode='r', offset=RAW_HEADER.size,
+                           shape=(n_rows, n_columns))
+    return matrix.reshape(1, -1) if matrix.ndim == 1 else matrix
+
+
+def write_raw_matrix(path: str, matrix: np.ndarray) -> None:
+    """
+    Write a matrix in the raw format: a RAW_HEADER followed by the little-endian float32/float64 rows.
+
+    :param path: The location of the output file.
+    :param matrix: A 2D float32 or float64 matrix.
+    :return: None
+    """
+    dtype = np.dtype(RAW_DTYPES[matrix.dtype.itemsize])
+    with open(path, 'wb') as output_file:
+        output_file.write(RAW_HEADER.pack(RAW_MAGIC, dtype.itemsize, *matrix.shape))
+        output_file.write(np.ascontiguousarray(matrix, dtype=dtype).tobytes())
+
+
+def coo_column_sums_of_squares(triples: np.ndarray) -> np.ndarray:
+    """
+    Compute the sum of the squares of each column of a block of sparse coordinate entries. The values of duplicate
+    entries of the same position are summed before squaring, as scipy.sparse does.
+
+    :param triples: A (nnz, 3) matrix of (row, column, value) entries.
+    :return: An array with the sum of squares of each column, up to the largest column index of the block.
+    """
+    rows = triples[:, 0].astype(np.int64)
+    columns = triples[:, 1].astype(np.int64)
+    positions, entries = np.unique(rows * (int(columns.max(initial=0)) + 1) + columns, return_inverse=True)
+    values = np.bincount(entries.ravel(), weights=triples[:, 2], minlength=positions.size)
+    return np.bincount(positions % (int(columns.max(initial=0)) + 1), weights=values * values)
+
+
+def open_csr_matrix(path: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray, int]:
+    """
+    Memory-map the arrays of a CSR matrix file, without reading or copying its content.
+
+    :param path: The location of the matrix file.
+    :return: The row pointers, the column indices, the values and the number of columns.
+    """
+    with open(path, 'rb') as input_file:
+        _, item_size, n_rows, n_columns, nnz = CSR_HEADER.unpack(input_file.read(CSR_HEADER.size))
+    index_size = np.dtype(CSR_INDEX_DTYPE).itemsize
+    indptr_offset = CSR_HEADER.size
+    indices_offset = indptr_offset + (n_rows + 1) * index_size
+    data_offset = indices_offset + nnz * index_size
+    indptr = np.memmap(path, dtype=CSR_INDEX_DTYPE, mode='r', offset=indptr_offset, shape=(n_rows + 1,))
+    if not nnz:
+        return indptr, np.zeros(0, dtype=CSR_INDEX_DTYPE), np.zeros(0), n_columns
+    indices = np.memmap(path, dtype=CSR_INDEX_DTYPE, mode='r', offset=indices_offset, shape=(nnz,))
+    data = np.memmap(path, dtype=RAW_DTYPES[item_size], mode='r', offset=data_offset, shape=(nnz,))
+    return indptr, indices, data, n_columns
+
+
+def write_csr_matrix(path: str,
+                     indptr: np.ndarray,
+                     indices: np.ndarray,
+                     data: np.ndarray,
+                     n_columns: int) -> None:
+    """
+    Write a sparse matrix in the CSR format: a CSR_HEADER followed by the row pointers, column indices and values.
+
+    :param path: The location of the output file.
+    :param indptr: The row pointers, of length rows + 1.
+    :param indices: The column index of each non-zero entry.
+    :param data: The float32 or float64 value of each non-zero entry.
+    :param n_columns: The number of columns.
+    :return: None
+    """
+    dtype = np.dtype(RAW_DTYPES[data.dtype.itemsize])
+    with open(path, 'wb') as output_file:
+        output_file.write(CSR_HEADER.pack(CSR_MAGIC, dtype.itemsize, len(indptr) - 1, n_columns, len(data)))
+        output_file.write(np.ascontiguousarray(indptr, dtype=CSR_INDEX_DTYPE).tobytes())
+        output_file.write(np.ascontiguousarray(indices, dtype=CSR_INDEX_DTYPE).tobytes())
+        output_file.write(np.ascontiguousarray(data, dtype=dtype).tobytes())
+
+
+def count_rows(path: str) -> int:
+    """
+    Get the number of rows of a binary matrix file from its header.
+
+    :param path: The location of the matrix file, in the npy, raw or csr format.
+    :return: The number of rows.
+    """
+    matrix_format = detect_format(path)
+    if matrix_format == 'csr':
+        return len(open_csr_matrix(path)[0]) - 1
+    if matrix_format == 'text':
+        raise ValueError(f"{path} is a text matrix, which --splitInput splits by lines instead of row ranges.")
+    return open_matrix(path, matrix_format).shape[0]
+
+
+def row_ranges(path: str, range_rows: int) -> List[Tuple[str, int, int]]:
+    """
+    Split the rows of a binary matrix file into ranges, for the input manifests of --rowRanges.
+
+    :param path: The location of the matrix file, in the npy, raw or csr format.
+    :param range_rows: The number of rows of each range, the last one excepted.
+    :return: (absolute path, first row, end row) tuples that cover the rows of the matrix.
+    """
+    path = os.path.abspath(path)
+    n_rows = count_rows(path)
+    return [(path, start, min(start + range_rows, n_rows)) for start in range(0, n_rows, range_rows)]
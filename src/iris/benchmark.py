@@ -0,0 +1,91 @@
+import argparse
+import os
+import sys
+import timeit
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+from numpy.linalg import norm
+
+from utils import PREDICTORS, min_max_scaling, min_max_normalize, blocked_distances
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from benchmarks.generators import make_iris  # noqa: E402
+
+
+def loop_distances(train_df: pd.DataFrame, test_df: pd.DataFrame) -> List[Tuple[int, int, float]]:
+    """
+    The original per-pair implementation of the mapper, with two nested iterrows() loops.
+
+    :param train_df: The train samples.
+    :param test_df: The test samples.
+    :return: A list of (test id, train id, distance) tuples.
+    """
+    test_df = test_df.copy(deep=True)
+    train_df = train_df.copy(deep=True)
+    for column in PREDICTORS:
+        column_min = train_df[column].min()
+        column_max = train_df[column].max()
+        test_df[column] = (test_df[column] - column_min) / (column_max - column_min)
+        train_df[column] = (train_df[column] - column_min) / (column_max - column_min)
+    result = []
+    for _, test_sample in test_df.iterrows():
+        for _, train_sample in train_df.iterrows():
+            distance = norm(train_sample[PREDICTORS].to_numpy(dtype=float) -
+                            test_sample[PREDICTORS].to_numpy(dtype=float))
+            result.append((test_sample['Id'], train_sample['Id'], distance))
+    return result
+
+
+def vectorized_distances(train_df: pd.DataFrame,
+                         test_df: pd.DataFrame,
+                         block_size: int) -> List[Tuple[int, int, float]]:
+    """
+    The blocked NumPy implementation of the mapper.
+
+    :param train_df: The train samples.
+    :param test_df: The test samples.
+    :param block_size: How many test samples to compute the distances for at once.
+    :return: A list of (test id, train id, distance) tuples.
+    """
+    train_features = train_df[PREDICTORS].to_numpy(dtype=float)
+    scaling = min_max_scaling(train_features)
+    train_features = min_max_normalize(train_features, *scaling)
+    test_features = min_max_normalize(test_df[PREDICTORS].to_numpy(dtype=float), *scaling)
+    test_ids = test_df['Id'].tolist()
+    train_ids = train_df['Id'].tolist()
+    result = []
+    for start, distances in blocked_distances(test_features, train_features, block_size):
+        for offset, test_distances in enumerate(distances.tolist()):
+            test_id = test_ids[start + offset]
+            result.extend((test_id, train_id, distance) for train_id, distance in zip(train_ids, test_distances))
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the iris KNN distance computation.")
+    parser.add_argument("--train", type=int, nargs='+', default=[100, 500, 2000])
+    parser.add_argument("--test", type=int, default=50)
+    parser.add_argument("--blockSize", type=int, default=256)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'train':>8} {'test':>6} {'loop (s)':>10} {'vectorized (s)':>15} {'speedup':>8}")
+    for n_train in args.train:
+        df = make_iris(n_train + args.test, n_train)
+        train_df, test_df = df.iloc[:n_train], df.iloc[n_train:]
+        loop_result = loop_distances(train_df, test_df)
+        vectorized_result = vectorized_distances(train_df, test_df, args.blockSize)
+        assert [r[:2] for r in loop_result] == [r[:2] for r in vectorized_result]
+        assert np.allclose([r[2] for r in loop_result], [r[2] for r in vectorized_result])
+
+        loop_time = min(timeit.repeat(lambda: loop_distances(train_df, test_df), number=1, repeat=args.repeat))
+        vectorized_time = min(timeit.repeat(lambda: vectorized_distances(train_df, test_df, args.blockSize),
+                                            number=1, repeat=args.repeat))
+        print(f"{n_train:>8} {args.test:>6} {loop_time:>10.4f} {vectorized_time:>15.4f} "
+              f"{loop_time / vectorized_time:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+import argparse
+import heapq
+import random
+import timeit
+from typing import List, Tuple
+
+from utils import merge_k_lists
+
+
+class Node:
+    """A wrapper class for the nodes (for constructing singly linked lists)."""
+
+    __slots__ = ('value', 'next_node', 'metadata')
+
+    def __init__(self,
+                 value: float = 0.,
+                 metadata: Tuple[int, str] = None,
+                 next_node=None):
+        self.value = value
+        self.next_node = next_node
+        self.metadata = metadata
+
+
+def convert_to_nodes(list_: List[Tuple[int, str, float]]) -> Node:
+    """
+    Convert a list to a linked-list Node structure.
+
+    :param list_: A list of tuples
+    :return:
+    """
+    head = list_[0]
+    head_node = Node(value=head[2],
+                     metadata=(head[0], head[1]))
+    current = head_node
+    length = len(list_)
+    for index in range(1, length):
+        el = list_[index]
+        new_node = Node(value=el[2],
+                        metadata=(el[0], el[1]))
+        current.next_node = new_node
+        current = new_node
+    current.next_node = None
+    return head_node
+
+
+def convert_to_list(node: Node) -> List:
+    """
+    Converts a linked list stored in a Node to a regular list.
+
+    :param node: The head of the linked list.
+    :return: A flat list containing the values in the nodes of the linked list.
+    """
+    li = []
+    current_node = node
+    while current_node:
+        distance = current_node.value
+        id, class_ = current_node.metadata
+        li.append((id, class_, distance))
+        current_node = current_node.next_node
+    return li
+
+
+def linked_list_merge_k_lists(sorted_lists: List[List[Tuple[int, str, float]]]) -> List[Tuple[int, str, float]]:
+    """
+    The original implementation of the merge, which converts the lists to linked lists and merges all of them.
+
+    :param sorted_lists: A list of K sorted lists of neighbour tuples.
+    :return: The merged sorted list.
+    """
+    sorted_linked_lists = [convert_to_nodes(raw_list) for raw_list in sorted_lists]
+    curr = head = Node(0)
+    queue = []
+    count = 0
+    for sorted_linked_list in sorted_linked_lists:
+        if sorted_linked_list:
+            count += 1
+            heapq.heappush(queue, (sorted_linked_list.value, count, sorted_linked_list))
+    while len(queue) > 0:
+        _, _, curr.next_node = heapq.heappop(queue)
+        curr = curr.next_node
+        if curr.next_node is not None:
+            count += 1
+            heapq.heappush(queue, (curr.next_node.value, count, curr.next_node))
+    return convert_to_list(head.next_node)
+
+
+def make_sorted_lists(n_lists: int,
+                      length: int,
+                      seed: int = 0) -> List[List[Tuple[int, str, float]]]:
+    """
+    Generate sorted lists of random neighbour tuples. Distances are rounded to produce ties.
+
+    :param n_lists: How many lists to generate (K).
+    :param length: The length of each of the lists.
+    :param seed: The seed of the random generator.
+    :return: A list of K sorted lists of neighbour tuples.
+    """
+    rng = random.Random(seed)
+    return [sorted(((i * length + j, rng.choice('abc'), round(rng.random(), 3)) for j in range(length)),
+                   key=lambda x: x[2])
+            for i in range(n_lists)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the k-way merge of the sorted neighbour lists.")
+    parser.add_argument("--lists", type=int, nargs='+', default=[10, 100])
+    parser.add_argument("--length", type=int, default=10000)
+    parser.add_argument("-k", "--kNearest", type=int, default=15)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'lists':>6} {'length':>8} {'k':>5} {'linked list (s)':>16} {'streaming (s)':>14} {'speedup':>8}")
+    for n_lists in args.lists:
+        sorted_lists = make_sorted_lists(n_lists, args.length)
+        expected = linked_list_merge_k_lists(sorted_lists)[:args.kNearest]
+        assert merge_k_lists(sorted_lists, args.kNearest) == expected
+        assert merge_k_lists(sorted_lists) == linked_list_merge_k_lists(sorted_lists)
+
+        linked_time = min(timeit.repeat(lambda: linked_list_merge_k_lists(sorted_lists)[:args.kNearest],
+                                        number=1, repeat=args.repeat))
+        streaming_time = min(timeit.repeat(lambda: merge_k_lists(sorted_lists, args.kNearest),
+                                           number=1, repeat=args.repeat))
+        print(f"{n_lists:>6} {args.length:>8} {args.kNearest:>5} {linked_time:>16.4f} {streaming_time:>14.6f} "
+              f"{linked_time / streaming_time:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+import argparse
+import timeit
+from typing import List, Tuple
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from utils import blocked_distances, k_nearest_indices, tree_k_nearest_indices
+
+
+def brute_force(train_features: np.ndarray,
+                test_features: np.ndarray,
+                k: int,
+                block_size: int) -> List[Tuple[int, np.ndarray, np.ndarray]]:
+    """
+    The brute force K nearest neighbours search of BaseIrisClassificationJob.
+
+    :param train_features: The normalized features of the train samples.
+    :param test_features: The normalized features of the test samples.
+    :param k: How many nearest neighbours to select.
+    :param block_size: How many test samples to compute the distances for at once.
+    :return: A list of (test index, neighbour indices, neighbour distances) tuples.
+    """
+    result = []
+    for start, distances in blocked_distances(test_features, train_features, block_size):
+        for offset, test_distances in enumerate(distances):
+            indices = k_nearest_indices(test_distances, k)
+            result.append((start + offset, indices, test_distances[indices]))
+    return result
+
+
+def kd_tree(train_features: np.ndarray,
+            test_features: np.ndarray,
+            k: int,
+            leaf_size: int) -> List[Tuple[int, np.ndarray, np.ndarray]]:
+    """
+    The KD-tree K nearest neighbours search of KDTreeIrisClassificationJob, including building the tree.
+
+    :param train_features: The normalized features of the train samples.
+    :param test_features: The normalized features of the test samples.
+    :param k: How many nearest neighbours to select.
+    :param leaf_size: The number of train samples at which the KD-tree switches to brute force.
+    :return: A list of (test index, neighbour indices, neighbour distances) tuples.
+    """
+    tree = cKDTree(train_features, leafsize=leaf_size)
+    return list(tree_k_nearest_indices(tree, train_features, test_features, k))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the KD-tree against the brute force KNN search.")
+    parser.add_argument("--train", type=int, nargs='+', default=[100, 1000, 5000, 20000, 50000])
+    parser.add_argument("--test", type=int, default=500)
+    parser.add_argument("-k", "--kNearest", type=int, default=15)
+    parser.add_argument("--blockSize", type=int, default=256)
+    parser.add_argument("--leafSize", type=int, default=16)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    crossover = None
+    print(f"{'train':>8} {'test':>6} {'brute force (s)':>16} {'kd-tree (s)':>12} {'speedup':>8}")
+    for n_train in args.train:
+        # Rounded uniform features, like the iris measurements, so that there are ties in the distances.
+        train_features = rng.uniform(size=(n_train, 4)).round(2)
+        test_features = rng.uniform(size=(args.test, 4)).round(2)
+
+        expected = brute_force(train_features, test_features, args.kNearest, args.blockSize)
+        actual = kd_tree(train_features, test_features, args.kNearest, args.leafSize)
+        assert all(e[0] == a[0] and np.array_equal(e[1], a[1]) for e, a in zip(expected, actual))
+
+        brute_time = min(timeit.repeat(lambda: brute_force(train_features, test_features, args.kNearest,
+                                                           args.blockSize), number=1, repeat=args.repeat))
+        tree_time = min(timeit.repeat(lambda: kd_tree(train_features, test_features, args.kNearest,
+                                                      args.leafSize), number=1, repeat=args.repeat))
+        if crossover is None and tree_time < brute_time:
+            crossover = n_train
+        print(f"{n_train:>8} {args.test:>6} {brute_time:>16.4f} {tree_time:>12.4f} {brute_time / tree_time:>7.1f}x")
+
+    if crossover is None:
+        print("The KD-tree was not faster for any of the train sizes.")
+    else:
+        print(f"The KD-tree is faster from {crossover} train samples.")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,17 +1,34 @@
+import os
+import sys
 from abc import ABC, abstractmethod
-from typing import Tuple, Generator, List
+from typing import Tuple, Generator, List, Dict, Any
 
+import numpy as np
 import pandas as pd
 from mrjob.job import MRJob
 from mrjob.step import MRStep
-from numpy.linalg import norm
+from scipy.spatial import cKDTree
 
-from utils import get_most_frequent, merge_k_lists
+from model import load_model, content_hash
+from utils import PREDICTORS, get_most_frequent, merge_k_lists, min_max_scaling, min_max_normalize, \
+    blocked_distances, k_nearest_indices, tree_k_nearest_indices
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from common.chunked_csv import read_csv_chunks, read_csv_lines, split_csv_line  # noqa: E402
+from common.instrumentation import InstrumentationMixin  # noqa: E402
+from common.protocols import CompactProtocol  # noqa: E402
 
-class BaseIrisClassificationJob(MRJob, ABC):
+COLUMNS = ['Id'] + PREDICTORS + ['Species']
+DTYPES = {'Id': np.int64, 'Species': str, **{column: np.float64 for column in PREDICTORS}}
+
+
+class BaseIrisClassificationJob(InstrumentationMixin, MRJob, ABC):
     """An mapreduce job that wraps the iris classification using KNN task."""
 
+    # Upload the shared modules next to the job.
+    DIRS = ['../common']
+    INTERNAL_PROTOCOL = CompactProtocol
+
     def configure_args(self) -> None:
         """
         Configure the command line arguments for running the job.
@@ -23,13 +40,120 @@ class BaseIrisClassificationJob(MRJob, ABC):
                               type=int,
                               default=15,
                               help="How many closest neighbours to consider.")
+        self.add_passthru_arg("-b",
+                              "--blockSize",
+                              type=int,
+                              default=256,
+                              help="How many test samples to compute the distances for at once.")
+        self.add_passthru_arg("--chunkSize",
+                              type=int,
+                              default=100000,
+                              help="How many rows of a CSV file to read at once.")
+        self.add_file_arg("-t",
+                          "--trainSet",
+                          help="A CSV file with the labelled samples, uploaded to every mapper. If given, the input is "
+                               "split by lines across the mappers and its unlabelled samples are classified.")
+        self.add_file_arg("--model",
+                          help="A .npz file built from the train set by model.py, uploaded to every mapper and used "
+                               "instead of the train set. If --trainSet is given too, the model is only used while "
+                               "its content hash matches.")
+
+    def build_index(self, train_features: np.ndarray) -> Any:
+        """
+        Build the structure used to search the nearest train samples. The brute force search uses the features as they
+        are.
+
+        :param train_features: The normalized features of the train samples.
+        :return: The search structure passed to nearest_neighbours.
+        """
+        return train_features
+
+    def nearest_neighbours(self,
+                           index: Any,
+                           test_features: np.ndarray) -> Generator[Tuple[int, np.ndarray, np.ndarray], None, None]:
+        """
+        Find the K nearest train samples of each test sample by computing the test x train distances in blocks of test
+        samples (brute force).
+
+        :param index: The normalized features of the train samples, from build_index.
+        :param test_features: The normalized features of the test samples.
+        :return: A generator of tuples containing the index of a test sample, the indices of its K nearest train
+        samples and their distances, in ascending order of the distance.
+        """
+        for start, distances in blocked_distances(test_features, index, self.options.blockSize):
+            for offset, test_distances in enumerate(distances):
+                indices = k_nearest_indices(test_distances, self.options.kNearest)
+                yield start + offset, indices, test_distances[indices]
+
+    def load_train_set(self, train_df: pd.DataFrame) -> None:
+        """
+        Compute the min-max normalization statistics of the train samples, normalize them and build the search index.
+        This happens once per mapper, before any test sample is classified.
+
+        :param train_df: The labelled samples.
+        :return: None.
+        """
+        train_features = train_df[PREDICTORS].to_numpy(dtype=float)
+        self.scaling = min_max_scaling(train_features)
+        self.index = self.build_index(min_max_normalize(train_features, *self.scaling))
+        self.train_ids = train_df['Id'].tolist()
+        self.train_classes = train_df['Species'].tolist()
+
+    def load_model_file(self) -> bool:
+        """
+        Load the normalized train samples, their ids, classes and the normalization statistics from the --model file,
+        unless it was built from a different train set than --trainSet.
+
+        :return: True if the model was loaded, False if it is missing or stale.
+        """
+        if not self.options.model:
+            return False
+        model = load_model(self.options.model)
+        if self.options.trainSet and model['digest'].item() != content_hash(self.options.trainSet):
+            self.increment_counter('iris', 'stale model')
+            return False
+        self.scaling = model['column_min'], model['column_range']
+        self.index = self.build_index(model['features'])
+        self.train_ids = model['ids'].tolist()
+        self.train_classes = model['classes'].tolist()
+        self.columns = model['columns'].tolist()
+        return True
+
+    def classify(self, test_df: pd.DataFrame) -> Generator[Tuple[int, Tuple[int, str, float]], None, None]:
+        """
+        Find the K nearest train samples (specified by the command line argument -k) of the test samples. Only these
+        can end up among the K nearest neighbours of the reducer, so the other train samples are not emitted.
+
+        :param test_df: The unlabelled samples.
+        :return: A generator of key-value pairs, where the key is the id of a test sample, and the value is a neighbour
+        tuple containing the id of a train sample, its class, and the distance between the features of the test and
+        train samples. The neighbours of a test sample are emitted in ascending order of the distance.
+        """
+        test_features = min_max_normalize(test_df[PREDICTORS].to_numpy(dtype=float), *self.scaling)
+        test_ids = test_df['Id'].tolist()
+        for test_index, indices, distances in self.nearest_neighbours(self.index, test_features):
+            test_id = test_ids[test_index]
+            for index, distance in zip(indices.tolist(), distances.tolist()):
+                yield test_id, (self.train_ids[index], self.train_classes[index], distance)
+
+    def read_train_set(self, path: str) -> pd.DataFrame:
+        """
+        Read the labelled samples of a CSV file, --chunkSize rows at a time.
+
+        :param path: The location of the CSV file.
+        :return: The labelled samples, in file order.
+        """
+        chunks = [chunk[chunk['Species'].notnull()]
+                  for chunk in read_csv_chunks(path, COLUMNS, DTYPES, self.options.chunkSize)]
+        return pd.concat(chunks)
 
     def mapper_csv(self,
                    input_path: str,
                    _: str) -> Generator[Tuple[int, Tuple[int, str, float]], None, None]:
         """
         Reads a CSV-format file and outputs key-value pairs that indicate the distance between the test samples and
-        the train samples.
+        their K nearest train samples. The file is streamed twice, --chunkSize rows at a time: first to load the train
+        samples, then to classify the test samples of each chunk.
 
         :param input_path: The path to the CSV file.
         :param _: The URI to the CSV file (unused).
@@ -37,30 +161,72 @@ class BaseIrisClassificationJob(MRJob, ABC):
         tuple containing the id of a train sample, its class, and the distance between the features of the test and
         train samples.
         """
-        df = pd.read_csv(input_path)
-        predictors = ['SepalLengthCm', 'SepalWidthCm', 'PetalLengthCm', 'PetalWidthCm']
+        self.load_train_set(self.read_train_set(input_path))
+        for chunk in read_csv_chunks(input_path, COLUMNS, DTYPES, self.options.chunkSize):
+            yield from self.classify(chunk[chunk['Species'].isnull()])
 
-        test_df = df[df['Species'].isnull()]
-        train_df = df[df['Species'].notnull()]
+    def mapper_init_train_set(self) -> None:
+        """
+        Load the model uploaded with --model or else the train set uploaded with --trainSet, once per mapper.
 
-        # Inplace modification of the dataframes results in an encoding error (bytes not 'str' required).
-        # This is probably because the mapper is a raw_mapper.
-        test_df_deep_copy = test_df.copy(deep=True)
-        train_df_deep_copy = train_df.copy(deep=True)
+        :return: None.
+        """
+        self.test_lines = []
+        if self.load_model_file():
+            return
+        self.load_train_set(self.read_train_set(self.options.trainSet))
+        self.columns = pd.read_csv(self.options.trainSet, nrows=0).columns.tolist()
+
+    def mapper_test(self,
+                    _: None,
+                    line: str) -> Generator[Tuple[int, Tuple[int, str, float]], None, None]:
+        """
+        Buffers a line of a CSV-format file with the columns of the train set, and classifies the buffered test samples
+        once there are --blockSize of them. Headers and labelled samples are skipped, and lines whose number of fields
+        differs from the header are counted in the 'malformed lines' counter of the 'iris' group and dropped.
+
+        :param _: The key (unused).
+        :param line: A line of the CSV file.
+        :return: A generator of key-value pairs, where the key is the id of a test sample, and the value is a neighbour
+        tuple containing the id of a train sample, its class, and the distance between the features of the test and
+        train samples.
+        """
+        fields = split_csv_line(line)
+        if len(fields) != len(self.columns):
+            self.increment_counter('iris', 'malformed lines')
+            return
+        if fields == self.columns:
+            return
+        if fields[self.columns.index('Species')]:
+            return
+        self.test_lines.append(line)
+        if len(self.test_lines) >= self.options.blockSize:
+            yield from self.mapper_final_test()
+
+    def mapper_final_test(self) -> Generator[Tuple[int, Tuple[int, str, float]], None, None]:
+        """
+        Classify the test samples left in the buffer of the mapper.
+
+        :return: A generator of key-value pairs, like mapper_test.
+        """
+        if not self.test_lines:
+            return
+        test_df = read_csv_lines(self.test_lines, self.columns, COLUMNS, DTYPES)
+        self.test_lines = []
+        yield from self.classify(test_df)
 
-        # Min-max normalize the predictors
-        for column in predictors:
-            column_min = train_df[column].min()
-            column_max = train_df[column].max()
-            test_df_deep_copy[column] = (test_df[column] - column_min) / (column_max - column_min)
-            train_df_deep_copy[column] = (train_df[column] - column_min) / (column_max - column_min)
+    def mapper_kwargs(self) -> Dict[str, Any]:
+        """
+        Select the mapper of the first step: either every mapper reads a whole CSV file, or the test samples are split
+        by lines across the mappers and the train set (or the model built from it) is uploaded to each of them.
 
-        # Iterate through test_sample, train_sample pairs:
-        for _, test_sample in test_df_deep_copy.iterrows():
-            for _, train_sample in train_df_deep_copy.iterrows():
-                distance = norm(train_sample[predictors].to_numpy() -
-                                test_sample[predictors].to_numpy())
-                yield test_sample['Id'], (train_sample['Id'], train_sample['Species'], distance)
+        :return: The mapper keyword arguments of the MRStep.
+        """
+        if self.options.trainSet or self.options.model:
+            return dict(mapper_init=self.mapper_init_train_set,
+                        mapper=self.mapper_test,
+                        mapper_final=self.mapper_final_test)
+        return dict(mapper_raw=self.mapper_csv)
 
     @abstractmethod
     def steps(self):
@@ -94,8 +260,8 @@ class SortMergeIrisClassificationJob(BaseIrisClassificationJob):
                 key: int,
                 values: List[List[Tuple[int, str, float]]]) -> Generator[Tuple[int, str], None, None]:
         """
-        Merges the sorted list of neighbours from the combiner, selects the first K (specified by the command line
-        argument -k) and determines the predominant class.
+        Merges the sorted list of neighbours from the combiner until the first K (specified by the command line
+        argument -k) are found and determines the predominant class.
 
         :param key: The id of a test sample.
         :param values: A list of sorted lists of key's neighbours, each from the combiner in a different mapper node.
@@ -103,13 +269,12 @@ class SortMergeIrisClassificationJob(BaseIrisClassificationJob):
         predicted class based on the KNN algorithm.
         """
 
-        neighbours = merge_k_lists(values)
-        k_nearest = neighbours[:self.options.kNearest]
+        k_nearest = merge_k_lists(values, self.options.kNearest)
         class_ = get_most_frequent(k_nearest)
         yield key, class_
 
     def steps(self):
-        return [MRStep(mapper_raw=self.mapper_csv,
+        return [MRStep(**self.mapper_kwargs(),
                        combiner=self.combiner,
                        reducer=self.reducer)]
 
@@ -133,10 +298,49 @@ class MergeSortIrisClassificationJob(BaseIrisClassificationJob):
         yield key, class_
 
     def steps(self):
-        return [MRStep(mapper_raw=self.mapper_csv,
+        return [MRStep(**self.mapper_kwargs(),
                        reducer=self.reducer)]
 
 
+class KDTreeIrisClassificationJob(MergeSortIrisClassificationJob):
+
+    def configure_args(self) -> None:
+        """
+        Configure the command line arguments for running the job.
+        :return: None.
+        """
+        super(KDTreeIrisClassificationJob, self).configure_args()
+        self.add_passthru_arg("-l",
+                              "--leafSize",
+                              type=int,
+                              default=16,
+                              help="The number of train samples at which the KD-tree switches to brute force.")
+
+    def build_index(self, train_features: np.ndarray) -> cKDTree:
+        """
+        Build a KD-tree over the normalized train samples, once per mapper.
+
+        :param train_features: The normalized features of the train samples.
+        :return: The KD-tree passed to nearest_neighbours.
+        """
+        return cKDTree(train_features, leafsize=self.options.leafSize)
+
+    def nearest_neighbours(self,
+                           index: cKDTree,
+                           test_features: np.ndarray) -> Generator[Tuple[int, np.ndarray, np.ndarray], None, None]:
+        """
+        Find the K nearest train samples of each test sample by querying the KD-tree. The neighbours (including the
+        ties at the K-th distance) are the same as the brute force ones.
+
+        :param index: The KD-tree over the normalized train samples, from build_index.
+        :param test_features: The normalized features of the test samples.
+        :return: A generator of tuples containing the index of a test sample, the indices of its K nearest train
+        samples and their distances, in ascending order of the distance.
+        """
+        yield from tree_k_nearest_indices(index, index.data, test_features, self.options.kNearest)
+
+
 if __name__ == '__main__':
     SortMergeIrisClassificationJob().run()
     # MergeSortIrisClassificationJob().run()
+    # KDTreeIrisClassificationJob().run()
@@ -0,0 +1,122 @@
+import argparse
+import hashlib
+import os
+import struct
+import zipfile
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+from utils import PREDICTORS, min_max_scaling, min_max_normalize
+
+# The size of the fixed part of a zip local file header, and the offset of the name and extra field lengths in it.
+LOCAL_HEADER_SIZE = 30
+LOCAL_HEADER_LENGTHS_OFFSET = 26
+
+
+def content_hash(path: str, chunk_size: int = 1 << 20) -> str:
+    """
+    Compute the SHA-256 digest of a file, reading it in chunks.
+
+    :param path: The location of the file.
+    :param chunk_size: How many bytes to read at a time.
+    :return: The hexadecimal digest of the file content.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as input_file:
+        for chunk in iter(lambda: input_file.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def save_model(train_path: str, model_path: str) -> None:
+    """
+    Normalize the labelled samples of a CSV file and save them, along with their ids, classes, the normalization
+    statistics, the CSV columns and the content hash of the CSV, to an uncompressed .npz file.
+
+    :param train_path: The location of the CSV file with the labelled samples.
+    :param model_path: The location of the .npz model file.
+    :return: None.
+    """
+    df = pd.read_csv(train_path)
+    train_df = df[df['Species'].notnull()]
+    train_features = train_df[PREDICTORS].to_numpy(dtype=float)
+    column_min, column_range = min_max_scaling(train_features)
+    # Write to a file object, as np.savez would otherwise append .npz to the name.
+    with open(model_path, 'wb') as model_file:
+        np.savez(model_file,
+                 features=min_max_normalize(train_features, column_min, column_range),
+                 column_min=column_min,
+                 column_range=column_range,
+                 ids=train_df['Id'].to_numpy(),
+                 classes=train_df['Species'].to_numpy(dtype=str),
+                 columns=np.array(df.columns.tolist()),
+                 digest=np.array(content_hash(train_path)))
+
+
+def load_model(model_path: str) -> Dict[str, np.ndarray]:
+    """
+    Load the arrays of a .npz model file. np.load does not memory-map the members of an archive, but np.savez stores
+    them uncompressed, so each of them is memory-mapped directly from its offset in the file.
+
+    :param model_path: The location of the .npz model file.
+    :return: A dictionary from the array names to read-only (memory-mapped) arrays.
+    """
+    arrays = {}
+    with zipfile.ZipFile(model_path) as archive, open(model_path, 'rb') as model_file:
+        for info in archive.infolist():
+            name = info.filename[:-len('.npy')]
+            if info.compress_type != zipfile.ZIP_STORED:
+                with archive.open(info) as member:
+                    arrays[name] = np.lib.format.read_array(member)
+                continue
+            model_file.seek(info.header_offset + LOCAL_HEADER_LENGTHS_OFFSET)
+            name_length, extra_length = struct.unpack('<HH', model_file.read(4))
+            model_file.seek(info.header_offset + LOCAL_HEADER_SIZE + name_length + extra_length)
+            version = np.lib.format.read_magic(model_file)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(model_file)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(model_file)
+            if not int(np.prod(shape)):
+                arrays[name] = np.empty(shape, dtype=dtype)
+                continue
+            arrays[name] = np.memmap(model_path,
+                                     dtype=dtype,
+                                     mode='r',
+                                     offset=model_file.tell(),
+                                     shape=shape,
+                                     order='F' if fortran_order else 'C')
+    return arrays
+
+
+def is_up_to_date(train_path: str, model_path: str) -> bool:
+    """
+    Check whether a model file exists and was built from the current content of a CSV file.
+
+    :param train_path: The location of the CSV file with the labelled samples.
+    :param model_path: The location of the .npz model file.
+    :return: True if the model can be reused, False if it has to be (re)built.
+    """
+    if not os.path.exists(model_path):
+        return False
+    return load_model(model_path)['digest'].item() == content_hash(train_path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build the normalized KNN model used by the iris jobs' --model.")
+    parser.add_argument("trainSet", help="The CSV file with the labelled samples.")
+    parser.add_argument("model", help="The .npz model file.")
+    parser.add_argument("-f", "--force", action="store_true", help="Rebuild the model even if it is up to date.")
+    args = parser.parse_args()
+
+    if not args.force and is_up_to_date(args.trainSet, args.model):
+        print(f"{args.model} is up to date.")
+        return
+    save_model(args.trainSet, args.model)
+    print(f"Built {args.model} from {args.trainSet}.")
+
+
+if __name__ == '__main__':
+    main()
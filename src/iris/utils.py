@@ -1,17 +1,10 @@
 import heapq
-from typing import Tuple, List
+from itertools import islice
+from typing import Tuple, List, Generator, Iterator, Optional
 
+import numpy as np
 
-class Node:
-    """A wrapper class for the nodes (for constructing singly linked lists)."""
-
-    def __init__(self,
-                 value: float = 0.,
-                 metadata: Tuple[int, str] = None,
-                 next_node=None):
-        self.value = value
-        self.next_node = next_node
-        self.metadata = metadata
+PREDICTORS = ['SepalLengthCm', 'SepalWidthCm', 'PetalLengthCm', 'PetalWidthCm']
 
 
 def get_most_frequent(array: List[Tuple[int, str, float]]) -> str:
@@ -35,65 +28,133 @@ def get_most_frequent(array: List[Tuple[int, str, float]]) -> str:
             return k
 
 
-def convert_to_nodes(list_: List[Tuple[int, str, float]]) -> Node:
+def iter_merge_k_lists(sorted_lists: List[List[Tuple[int, str, float]]]) -> Iterator[Tuple[int, str, float]]:
     """
-    Convert a list to a linked-list Node structure.
+    Lazily merge K sorted lists using a min-heap of (distance, insertion count, list index, position) tuples.
+    The insertion count breaks the ties between equal distances in the order the elements entered the heap.
 
-    :param list_: A list of tuples
-    :return:
+    :param sorted_lists: A list of K sorted lists of neighbour tuples.
+    :return: An iterator over the neighbour tuples, in ascending order of the distance.
     """
-    head = list_[0]
-    head_node = Node(value=head[2],
-                     metadata=(head[0], head[1]))
-    current = head_node
-    length = len(list_)
-    for index in range(1, length):
-        el = list_[index]
-        new_node = Node(value=el[2],
-                        metadata=(el[0], el[1]))
-        current.next_node = new_node
-        current = new_node
-    current.next_node = None
-    return head_node
+    sorted_lists = list(sorted_lists)
+    queue = []
+    count = 0
+    for list_index, sorted_list in enumerate(sorted_lists):
+        if sorted_list:
+            count += 1
+            queue.append((sorted_list[0][2], count, list_index, 0))
+    heapq.heapify(queue)
+    while queue:
+        _, _, list_index, position = queue[0]
+        sorted_list = sorted_lists[list_index]
+        yield sorted_list[position]
+        position += 1
+        if position < len(sorted_list):
+            count += 1
+            heapq.heapreplace(queue, (sorted_list[position][2], count, list_index, position))
+        else:
+            heapq.heappop(queue)
 
 
-def convert_to_list(node: Node) -> List:
+def merge_k_lists(sorted_lists: List[List[Tuple[int, str, float]]],
+                  limit: Optional[int] = None) -> List[Tuple[int, str, float]]:
     """
-    Converts a linked list stored in a Node to a regular list.
+    Merge K sorted lists using a min-heap, stopping after the first limit elements.
 
-    :param node: The head of the linked list.
-    :return: A flat list containing the values in the nodes of the linked list.
+    :param sorted_lists: A list of K sorted lists of neighbour tuples.
+    :param limit: How many elements of the merged list to compute. All of them if None.
+    :return: The (first limit elements of the) merged sorted list.
     """
-    li = []
-    current_node = node
-    while current_node:
-        distance = current_node.value
-        id, class_ = current_node.metadata
-        li.append((id, class_, distance))
-        current_node = current_node.next_node
-    return li
+    return list(islice(iter_merge_k_lists(sorted_lists), limit))
 
 
-def merge_k_lists(sorted_lists: List[List[Tuple[int, str, float]]]):
+def min_max_scaling(train_features: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
     """
-    Merge K sorted lists using a min-heap.
-    Source: https://leetcode.com/problems/merge-k-sorted-lists/discuss/10511/10-line-python-solution-with-priority-queue/281748
+    Compute the column-wise min-max normalization statistics of the train features.
 
-    :param sorted_lists: A list of K sorted lists of neighbour tuples.
-    :return: The merged sorted list.
+    :param train_features: A (n_train, n_features) matrix with the features of the train samples.
+    :return: The minimum and the range (maximum - minimum) of each column.
     """
-    sorted_linked_lists = [convert_to_nodes(raw_list) for raw_list in sorted_lists]
-    curr = head = Node(0)
-    queue = []
-    count = 0
-    for sorted_linked_list in sorted_linked_lists:
-        if sorted_linked_list:
-            count += 1
-            heapq.heappush(queue, (sorted_linked_list.value, count, sorted_linked_list))
-    while len(queue) > 0:
-        _, _, curr.next_node = heapq.heappop(queue)
-        curr = curr.next_node
-        if curr.next_node is not None:
-            count += 1
-            heapq.heappush(queue, (curr.next_node.value, count, curr.next_node))
-    return convert_to_list(head.next_node)
+    column_min = train_features.min(axis=0)
+    return column_min, train_features.max(axis=0) - column_min
+
+
+def min_max_normalize(features: np.ndarray,
+                      column_min: np.ndarray,
+                      column_range: np.ndarray) -> np.ndarray:
+    """
+    Min-max normalize the features, column-wise, using the statistics of the train features.
+
+    :param features: A (n_samples, n_features) matrix of features.
+    :param column_min: The minimum of each column of the train features.
+    :param column_range: The range (maximum - minimum) of each column of the train features.
+    :return: The normalized feature matrix.
+    """
+    return (features - column_min) / column_range
+
+
+def blocked_distances(test_features: np.ndarray,
+                      train_features: np.ndarray,
+                      block_size: int) -> Generator[Tuple[int, np.ndarray], None, None]:
+    """
+    Compute the euclidean distance matrix between the test and the train samples, one block of test samples at a
+    time. A block holds block_size x n_train x n_features intermediate differences, which bounds the memory usage.
+
+    :param test_features: A (n_test, n_features) matrix with the features of the test samples.
+    :param train_features: A (n_train, n_features) matrix with the features of the train samples.
+    :param block_size: How many test samples to process at a time.
+    :return: A generator of tuples containing the index of the first test sample in the block and the
+    (block_size, n_train) matrix of distances between the test samples of the block and all the train samples.
+    """
+    for start in range(0, len(test_features), block_size):
+        block = test_features[start:start + block_size]
+        differences = block[:, np.newaxis, :] - train_features[np.newaxis, :, :]
+        yield start, np.sqrt(np.einsum('ijk,ijk->ij', differences, differences))
+
+
+def k_nearest_indices(distances: np.ndarray, k: int) -> np.ndarray:
+    """
+    Select the indices of the k smallest distances, in ascending order of the distance. Ties are broken by the index,
+    which gives the same neighbours as a stable sort of all the distances followed by taking the first k.
+
+    :param distances: A 1D array of distances.
+    :param k: How many nearest neighbours to select.
+    :return: The indices of the (at most) k nearest neighbours.
+    """
+    if k >= len(distances):
+        return np.argsort(distances, kind='stable')
+    # Partitioning is O(n); only the candidates at most as far as the k-th distance (k + ties) are sorted.
+    kth_distance = np.partition(distances, k - 1)[k - 1]
+    candidates = np.flatnonzero(distances <= kth_distance)
+    return candidates[np.argsort(distances[candidates], kind='stable')][:k]
+
+
+def tree_k_nearest_indices(tree,
+                           train_features: np.ndarray,
+                           test_features: np.ndarray,
+                           k: int) -> Generator[Tuple[int, np.ndarray, np.ndarray], None, None]:
+    """
+    Select the K nearest train samples of each test sample using a spatial index (e.g. scipy's cKDTree) built over the
+    train features. The tree only provides the K-th distance and the candidates within it; the candidates are then
+    ranked like in the brute force search, so ties at the K-th distance are broken by the index as well.
+
+    :param tree: A spatial index over train_features, with scipy's query and query_ball_point interface.
+    :param train_features: A (n_train, n_features) matrix with the features of the train samples.
+    :param test_features: A (n_test, n_features) matrix with the features of the test samples.
+    :param k: How many nearest neighbours to select.
+    :return: A generator of tuples containing the index of a test sample, the indices of its (at most) k nearest
+    train samples and their distances, in ascending order of the distance.
+    """
+    k = min(k, len(train_features))
+    if not len(test_features) or not k:
+        return
+    kth_distances = tree.query(test_features, k=[k])[0][:, 0]
+    # Widen the radius slightly so that rounding differences with the brute force distances cannot drop a candidate.
+    radii = kth_distances * (1 + 1e-9) + 1e-12
+    all_candidates = tree.query_ball_point(test_features, radii, return_sorted=True)
+    for test_index, candidates in enumerate(all_candidates):
+        candidates = np.asarray(candidates, dtype=np.intp)
+        _, distances = next(blocked_distances(test_features[test_index:test_index + 1],
+                                              train_features[candidates], 1))
+        order = k_nearest_indices(distances[0], k)
+        yield test_index, candidates[order], distances[0][order]
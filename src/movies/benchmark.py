@@ -0,0 +1,76 @@
+import argparse
+import os
+import re
+import string
+import sys
+import tempfile
+import timeit
+from typing import List
+
+import pandas as pd
+
+import utils
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from benchmarks.generators import write_movies  # noqa: E402
+
+
+def legacy_preprocess_text(text: str) -> str:
+    """
+    The original implementation of utils.preprocess_text, which builds its tables and compiles its regex on every call.
+
+    :param text: A text string.
+    :return: The preprocessed text string.
+    """
+    result = text.lower()
+    result = result.translate(str.maketrans('', '', string.digits))
+    pattern = r"\b(?=[mdclxvii])m{0,4}(cm|cd|d?c{0,3})(xc|xl|l?x{0,3})([ii]x|[ii]v|v?[ii]{0,3})\b\.?"
+    result = re.sub(pattern, '', result, flags=re.I)
+    result = " ".join([x for x in result.split() if x not in utils.all_stopwords])
+    return result.translate(str.maketrans('', '', string.punctuation))
+
+
+def legacy(titles: pd.Series) -> List[str]:
+    """Preprocess the titles one by one with the original implementation."""
+    return [legacy_preprocess_text(title) for title in titles]
+
+
+def cached(titles: pd.Series) -> List[str]:
+    """Preprocess the titles one by one with utils.preprocess_text, starting from empty caches."""
+    utils.preprocess_text.cache_clear()
+    utils.preprocess_word.cache_clear()
+    return [utils.preprocess_text(title) for title in titles]
+
+
+def batch(titles: pd.Series) -> List[str]:
+    """Preprocess the titles as a column with utils.preprocess_texts, starting from an empty cache."""
+    utils.preprocess_word.cache_clear()
+    return utils.preprocess_texts(titles).tolist()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the preprocessing of the movie titles.")
+    parser.add_argument("--input", help="A movies.csv file. A random MovieLens-sized one is generated if missing.")
+    parser.add_argument("--rows", type=int, default=62423)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = args.input
+        if path is None:
+            path = os.path.join(directory, 'movies.csv')
+            write_movies(path, args.rows)
+        titles = pd.read_csv(path)['title']
+
+    expected = legacy(titles)
+    print(f"{'method':>8} {'titles':>8} {'time (s)':>9} {'speedup':>8}")
+    legacy_time = None
+    for name, method in [('legacy', legacy), ('cached', cached), ('batch', batch)]:
+        assert method(titles) == expected
+        elapsed = min(timeit.repeat(lambda: method(titles), number=1, repeat=args.repeat))
+        legacy_time = legacy_time or elapsed
+        print(f"{name:>8} {len(titles):>8} {elapsed:>9.3f} {legacy_time / elapsed:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
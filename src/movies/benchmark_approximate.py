@@ -0,0 +1,79 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from job import TopKeywordsJob
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from benchmarks.generators import write_movies  # noqa: E402
+
+
+def run_job(args: List[str]) -> Tuple[Dict[str, list], float]:
+    """
+    Run TopKeywordsJob with the inline runner.
+
+    :param args: The command line arguments of the job.
+    :return: The output of the job, by genre, and the wall time in seconds.
+    """
+    job = TopKeywordsJob(args)
+    start = time.perf_counter()
+    with job.make_runner() as runner:
+        runner.run()
+        output = dict(job.parse_output(runner.cat_output()))
+    return output, time.perf_counter() - start
+
+
+def exact_counts(path: str) -> Dict[str, Dict[str, int]]:
+    """
+    Count all the words of each genre exactly, in memory.
+
+    :param path: The location of the movies.csv file.
+    :return: The count of each word, by genre.
+    """
+    job = TopKeywordsJob([path])
+    counts = {}
+    for (word, genre), count in job.mapper_csv(path, path):
+        genre_counts = counts.setdefault(genre, {})
+        genre_counts[word] = genre_counts.get(word, 0) + count
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the accuracy of the approximate TopKeywordsJob.")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--vocabulary", type=int, default=50000)
+    parser.add_argument("--exponent", type=float, default=1.1)
+    parser.add_argument("--maxWords", type=int, default=10)
+    parser.add_argument("--sketchSizes", type=int, nargs='+', default=[50, 200, 1000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'movies.csv')
+        write_movies(path, args.rows, args.vocabulary, args.exponent)
+        counts = exact_counts(path)
+        exact, exact_time = run_job([path, '--maxWords', str(args.maxWords)])
+        print(f"{'mode':>18} {'time (s)':>9} {'top-k recall':>13} {'mean rel. error':>16} {'bounds hold':>12}")
+        print(f"{'exact':>18} {exact_time:>9.2f} {1.:>13.3f} {0.:>16.4f} {'yes':>12}")
+        for sketch_size in args.sketchSizes:
+            approximate, approximate_time = run_job([path, '--maxWords', str(args.maxWords), '--approximate',
+                                                     '--sketchSize', str(sketch_size)])
+            hits, total, errors, bounds_hold = 0, 0, [], True
+            for genre, top_words in exact.items():
+                exact_words = {word for word, _ in top_words}
+                for word, count, error in approximate.get(genre, []):
+                    true_count = counts[genre].get(word, 0)
+                    hits += word in exact_words
+                    errors.append(abs(count - true_count) / max(true_count, 1))
+                    bounds_hold &= count - error <= true_count <= count
+                total += len(exact_words)
+            print(f"{'approx. (' + str(sketch_size) + ')':>18} {approximate_time:>9.2f} {hits / total:>13.3f} "
+                  f"{float(np.mean(errors)):>16.4f} {'yes' if bounds_hold else 'no':>12}")
+
+
+if __name__ == '__main__':
+    main()
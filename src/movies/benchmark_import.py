@@ -0,0 +1,62 @@
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import utils
+
+# The module-level work of utils.py before the stop words were loaded lazily.
+EAGER_IMPORT = """
+import nltk
+from nltk.corpus import stopwords
+nltk.download('stopwords', quiet=True)
+languages_stopwords = [stopwords.words(language) for language in ['english', 'italian', 'french']]
+all_stopwords = set([word for language_stopwords in languages_stopwords for word in language_stopwords])
+"""
+LAZY_IMPORT = "import utils"
+LAZY_IMPORT_AND_USE = "import utils; utils.set_stopwords_path({path!r}); utils.get_stopwords()"
+
+
+def time_process(code: str, repeat: int) -> float:
+    """
+    Measure the best wall time of a fresh Python process running some code in the directory of this file.
+
+    :param code: The code to run.
+    :param repeat: How many processes to run.
+    :return: The best time, in seconds.
+    """
+    directory = os.path.dirname(os.path.abspath(__file__))
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], cwd=directory, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the process startup cost of importing the movie utils.")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        # A snapshot of the stop words in the local NLTK data, as shipped with the job.
+        snapshot_path = os.path.join(directory, 'stopwords.txt')
+        with open(snapshot_path, 'w', encoding='utf-8') as snapshot_file:
+            snapshot_file.writelines(f"{word}\n" for word in sorted(utils.get_stopwords()))
+
+        baseline = time_process("pass", args.repeat)
+        print(f"{'import':>22} {'time (s)':>9} {'minus interpreter (s)':>22}")
+        for name, code in [('eager (before)', EAGER_IMPORT),
+                           ('lazy', LAZY_IMPORT),
+                           ('lazy + snapshot use', LAZY_IMPORT_AND_USE.format(path=snapshot_path)),
+                           ('lazy + NLTK data use', LAZY_IMPORT_AND_USE.format(path=os.path.join(directory, 'none')))]:
+            elapsed = time_process(code, args.repeat)
+            print(f"{name:>22} {elapsed:>9.3f} {elapsed - baseline:>22.3f}")
+
+
+if __name__ == '__main__':
+    main()
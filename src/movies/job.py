@@ -1,14 +1,28 @@
+import heapq
+import os
+import sys
+from collections import Counter
 from typing import Tuple, Generator, List
 
-import pandas as pd
 from mrjob.job import MRJob
 from mrjob.step import MRStep
 import utils
+from sketch import SpaceSaving
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from common.chunked_csv import read_csv_chunks  # noqa: E402
+from common.instrumentation import InstrumentationMixin  # noqa: E402
+from common.protocols import CompactProtocol  # noqa: E402
 
-class TopKeywordsJob(MRJob):
+
+class TopKeywordsJob(InstrumentationMixin, MRJob):
     """A mapreduce job that wraps the top keyword in the movie titles task."""
 
+    # Upload the shared modules next to the job, and the stop words snapshot next to utils.py.
+    DIRS = ['../common']
+    FILES = ['stopwords.txt']
+    INTERNAL_PROTOCOL = CompactProtocol
+
     def configure_args(self) -> None:
         """
         Configure the command line arguments for running the job.
@@ -21,6 +35,44 @@ class TopKeywordsJob(MRJob):
                               type=int,
                               default=10,
                               help="How many words to display from the top.")
+        self.add_passthru_arg("--mapperCacheSize",
+                              type=int,
+                              default=100000,
+                              help="How many distinct (word, genre) counts a mapper keeps in memory before emitting "
+                                   "them.")
+        self.add_passthru_arg("-a",
+                              "--approximate",
+                              action="store_true",
+                              help="Count the words of each genre approximately, with fixed-size Space-Saving "
+                                   "summaries.")
+        self.add_passthru_arg("--sketchSize",
+                              type=int,
+                              default=1000,
+                              help="How many words a Space-Saving summary counts per genre, with --approximate.")
+        self.add_passthru_arg("--chunkSize",
+                              type=int,
+                              default=100000,
+                              help="How many rows of the CSV file to read at once.")
+        self.add_file_arg("--stopwords",
+                          help="A stop words snapshot written by 'python utils.py --download', uploaded to the "
+                               "mappers. Defaults to the stopwords.txt snapshot shipped next to utils.py.")
+
+    def read_titles(self, input_path: str) -> Generator[Tuple[List[str], List[str]], None, None]:
+        """
+        Reads a CSV-format file, --chunkSize rows at a time, and preprocesses the titles of the movies with genres.
+
+        :param input_path: The path to the CSV file.
+        :return: A generator of tuples consisting of the words of a title and the genres of the movie.
+        """
+        if self.options.stopwords:
+            utils.set_stopwords_path(self.options.stopwords)
+        for df in read_csv_chunks(input_path, ['title', 'genres'], {'title': str, 'genres': str},
+                                  self.options.chunkSize):
+            # This is sort of a null value, so drop those lines.
+            df = df[df['genres'] != "(no genres listed)"]
+            clean_titles = utils.preprocess_texts(df["title"])
+            for clean_title, genres in zip(clean_titles.tolist(), df["genres"].tolist()):
+                yield clean_title.split(), genres.split('|')
 
     def mapper_csv(self,
                    input_path: str,
@@ -31,20 +83,80 @@ class TopKeywordsJob(MRJob):
         :param input_path: The path to the CSV file.
         :param _: The URI of the CSV (unused).
         :return: A generator of key-value pairs, where the key is a tuple consisting of the word and the genre, and the
-        value is 1 (1 appearance).
+        value is the number of appearances. The counts are aggregated in memory and emitted whenever there are
+        --mapperCacheSize of them, so the same key can be emitted more than once.
         """
-        df = pd.read_csv(input_path)
+        counts = Counter()
+        for title_words, genres in self.read_titles(input_path):
+            for genre in genres:
+                for word in title_words:
+                    counts[word, genre] += 1
+            if len(counts) >= self.options.mapperCacheSize:
+                yield from counts.items()
+                counts.clear()
+        yield from counts.items()
+
+    def mapper_csv_approximate(self,
+                               input_path: str,
+                               _: str) -> Generator[Tuple[str, List[Tuple[str, int, int]]], None, None]:
+        """
+        Reads a CSV-format file and counts the words in the titles of each genre with a Space-Saving summary of
+        --sketchSize words, so the memory does not grow with the vocabulary.
 
-        # This is sort of a null value, so drop those lines.
-        df = df[df['genres'] != "(no genres listed)"]
-        for _, data in df.iterrows():
-            title = data["title"]
-            clean_title = utils.preprocess_text(title)
-            title_words = clean_title.split()
-            genres = data["genres"].split('|')
+        :param input_path: The path to the CSV file.
+        :param _: The URI of the CSV (unused).
+        :return: A generator of key-value pairs, where the key is a genre and the value is its serialized summary.
+        """
+        summaries = {}
+        for title_words, genres in self.read_titles(input_path):
             for genre in genres:
+                summary = summaries.get(genre)
+                if summary is None:
+                    summary = summaries[genre] = SpaceSaving(self.options.sketchSize)
                 for word in title_words:
-                    yield (word, genre), 1
+                    summary.update(word)
+        for genre, summary in summaries.items():
+            yield genre, summary.to_list()
+
+    def merge_summaries(self, values: List[List[Tuple[str, int, int]]]) -> SpaceSaving:
+        """
+        Merge serialized Space-Saving summaries.
+
+        :param values: The serialized summaries.
+        :return: The merged summary.
+        """
+        merged = None
+        for entries in values:
+            summary = SpaceSaving.from_list(self.options.sketchSize, entries)
+            merged = summary if merged is None else merged.merge(summary)
+        return merged
+
+    def combiner_merge(self,
+                       key: str,
+                       values: List[List[Tuple[str, int, int]]]) -> Generator[Tuple[str, List[Tuple[str, int, int]]],
+                                                                              None, None]:
+        """
+        Merge the summaries of a genre. This step happens locally in the mapper node.
+
+        :param key: The genre.
+        :param values: The serialized summaries of the genre from the mapper.
+        :return: The genre and its node-local serialized summary.
+        """
+        yield key, self.merge_summaries(values).to_list()
+
+    def reducer_merge(self,
+                      key: str,
+                      values: List[List[Tuple[str, int, int]]]) -> Generator[Tuple[str, List[Tuple[str, int, int]]],
+                                                                             None, None]:
+        """
+        Merge the summaries of a genre from all the mapper nodes and take the first maxWords words.
+
+        :param key: The genre.
+        :param values: The serialized summaries of the genre from the combiners.
+        :return: The first maxWords words, as tuples consisting of a word, its approximate number of appearances and the
+        maximum overestimation of that number.
+        """
+        yield key, self.merge_summaries(values).top(self.options.maxWords)
 
     def combiner_sum(self,
                      key: Tuple[str, str],
@@ -53,7 +165,7 @@ class TopKeywordsJob(MRJob):
         Combine the pairs with the same by adding their values. This step happens locally in the mapper node.
 
         :param key: (word, genre) tuples.
-        :param values: The count of the keys from the mapper (always "1").
+        :param values: The partial counts of the keys from the mapper.
         :return: Key-value pairs where the key is the word and the value is the node-local sum of the counts.
         """
         yield key, sum(values),
@@ -77,25 +189,30 @@ class TopKeywordsJob(MRJob):
                      key: str,
                      values: List[Tuple[str, int]]) -> Generator[Tuple[str, Tuple[str, int]], None, None]:
         """
-        Sort the tuples from the previous reducer by their total occurrences element. Take the first maxWords pairs for
-        each of the genres.
+        Select the first maxWords tuples from the previous reducer by their total occurrences element, for each of the
+        genres. A bounded heap keeps only maxWords tuples in memory; ties keep their input order, like a stable sort.
 
         :param key: The genre.
         :param values: Tuples consisting of a word and its total appearances.
         :return: The first maxWords words, by the number of appearances.
         """
         top_size = self.options.maxWords
-        sorted_values = sorted(values,
-                               key=lambda x: x[1],
-                               reverse=True)[:top_size]
-        yield key, sorted_values
+        top_values = heapq.nlargest(top_size,
+                                    values,
+                                    key=lambda x: x[1])
+        yield key, top_values
 
     def steps(self) -> List:
         """
         Define the job steps. As there can only be 1 reducer step, another MRStep has to be defined for the sorting.
+        The approximate counts are merged and sorted in a single step.
 
         :return: The list of the steps of the job.
         """
+        if self.options.approximate:
+            return [MRStep(mapper_raw=self.mapper_csv_approximate,
+                           combiner=self.combiner_merge,
+                           reducer=self.reducer_merge)]
         return [
             MRStep(mapper_raw=self.mapper_csv,
                    combiner=self.combiner_sum,
@@ -0,0 +1,126 @@
+import heapq
+from typing import Dict, List, Tuple, Optional
+
+
+class SpaceSaving:
+    """
+    A Space-Saving summary of the most frequent items of a stream, with at most capacity counters.
+    The count of an item overestimates its true frequency by at most its error, so the true frequency is in
+    [count - error, count]. Summaries can be merged, following Agarwal et al., "Mergeable Summaries" (2012).
+    """
+
+    __slots__ = ('capacity', 'counts', 'errors', 'heap')
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.counts: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        # A min-heap of (count, item) entries; entries of items whose count changed since are skipped lazily.
+        self.heap: List[Tuple[int, str]] = []
+
+    def update(self, item: str, count: int = 1) -> None:
+        """
+        Add occurrences of an item. If the item is not counted and the summary is full, it replaces the item with the
+        smallest count, inheriting that count as its error.
+
+        :param item: The item.
+        :param count: The number of occurrences.
+        :return: None
+        """
+        if item in self.counts:
+            self.counts[item] += count
+        elif len(self.counts) < self.capacity:
+            self.counts[item] = count
+            self.errors[item] = 0
+        else:
+            min_count, min_item = self.pop_min()
+            del self.counts[min_item]
+            del self.errors[min_item]
+            self.counts[item] = min_count + count
+            self.errors[item] = min_count
+        heapq.heappush(self.heap, (self.counts[item], item))
+        if len(self.heap) > 4 * self.capacity:
+            self.heap = [(item_count, heap_item) for heap_item, item_count in self.counts.items()]
+            heapq.heapify(self.heap)
+
+    def pop_min(self) -> Tuple[int, str]:
+        """
+        Remove the heap entry of the item with the smallest count (the item stays counted).
+
+        :return: The smallest count and its item.
+        """
+        while True:
+            item_count, item = heapq.heappop(self.heap)
+            if self.counts.get(item) == item_count:
+                return item_count, item
+
+    def min_count(self) -> int:
+        """
+        Get the largest possible count of an item that is not in the summary.
+
+        :return: The smallest count if the summary is full, 0 otherwise.
+        """
+        if len(self.counts) < self.capacity:
+            return 0
+        while self.counts.get(self.heap[0][1]) != self.heap[0][0]:
+            heapq.heappop(self.heap)
+        return self.heap[0][0]
+
+    def merge(self, other: 'SpaceSaving') -> 'SpaceSaving':
+        """
+        Merge two summaries. An item missing from a full summary may have occurred up to its min_count times, which is
+        added to both its count and its error.
+
+        :param other: Another summary, with the same capacity.
+        :return: A new summary of both streams.
+        """
+        self_min, other_min = self.min_count(), other.min_count()
+        counts = {}
+        errors = {}
+        for item in set(self.counts) | set(other.counts):
+            counts[item] = self.counts.get(item, self_min) + other.counts.get(item, other_min)
+            errors[item] = self.errors.get(item, self_min) + other.errors.get(item, other_min)
+        merged = SpaceSaving(self.capacity)
+        for item in heapq.nsmallest(self.capacity, counts, key=lambda x: (-counts[x], x)):
+            merged.counts[item] = counts[item]
+            merged.errors[item] = errors[item]
+        merged.heap = [(item_count, item) for item, item_count in merged.counts.items()]
+        heapq.heapify(merged.heap)
+        return merged
+
+    def top(self, n: Optional[int] = None) -> List[Tuple[str, int, int]]:
+        """
+        Get the items with the largest counts, breaking ties by the item.
+
+        :param n: How many items to return. All of them if None.
+        :return: A list of (item, count, error) tuples, in descending order of the count.
+        """
+        items = sorted(self.counts, key=lambda x: (-self.counts[x], x))[:n]
+        return [(item, self.counts[item], self.errors[item]) for item in items]
+
+    def to_list(self) -> List[Tuple[str, int, int]]:
+        """
+        Serialize the summary, e.g. to emit it from a mapper.
+
+        :return: A list of (item, count, error) tuples.
+        """
+        return [(item, item_count, self.errors[item]) for item, item_count in self.counts.items()]
+
+    @classmethod
+    def from_list(cls,
+                  capacity: int,
+                  entries: List[Tuple[str, int, int]]) -> 'SpaceSaving':
+        """
+        Deserialize a summary created by to_list.
+
+        :param capacity: The capacity of the summary.
+        :param entries: A list of (item, count, error) tuples.
+        :return: The summary.
+        """
+        summary = cls(capacity)
+        for item, item_count, error in entries:
+            summary.counts[item] = item_count
+            summary.errors[item] = error
+        summary.heap = [(item_count, item) for item, item_count in summary.counts.items()]
+        heapq.heapify(summary.heap)
+        return summary
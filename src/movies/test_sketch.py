@@ -0,0 +1,77 @@
+import os
+import sys
+from collections import Counter
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from sketch import SpaceSaving  # noqa: E402
+
+
+def zipf_stream(n_items, vocabulary, seed):
+    rng = np.random.default_rng(seed)
+    weights = 1. / np.arange(1, vocabulary + 1) ** 1.1
+    return [f'word{index}' for index in rng.choice(vocabulary, size=n_items, p=weights / weights.sum()).tolist()]
+
+
+def summarize(stream, capacity):
+    summary = SpaceSaving(capacity)
+    for item in stream:
+        summary.update(item)
+    return summary
+
+
+def assert_bounds(summary, stream):
+    true_counts = Counter(stream)
+    for item, count, error in summary.top():
+        # The count overestimates the true frequency by at most the error, which is at most N / capacity.
+        assert count - error <= true_counts[item] <= count
+        assert error <= len(stream) / summary.capacity
+    # Any item that is not counted occurred at most min_count times.
+    for item, true_count in true_counts.items():
+        if item not in summary.counts:
+            assert true_count <= summary.min_count()
+
+
+@pytest.mark.parametrize('capacity', [10, 50, 1000])
+def test_update_bounds(capacity):
+    stream = zipf_stream(20000, 500, seed=0)
+    summary = summarize(stream, capacity)
+    assert len(summary.counts) <= capacity
+    assert_bounds(summary, stream)
+
+
+def test_exact_below_capacity():
+    stream = zipf_stream(5000, 50, seed=1)
+    summary = summarize(stream, 100)
+    assert summary.top() == [(item, count, 0) for item, count in sorted(Counter(stream).items(),
+                                                                          key=lambda x: (-x[1], x[0]))]
+
+
+def test_merge_bounds():
+    streams = [zipf_stream(10000, 500, seed=seed) for seed in range(4)]
+    summaries = [summarize(stream, 50) for stream in streams]
+    merged = summaries[0]
+    for summary in summaries[1:]:
+        merged = merged.merge(summary)
+    assert len(merged.counts) <= 50
+    assert_bounds(merged, [item for stream in streams for item in stream])
+
+
+def test_heavy_hitters_are_kept():
+    stream = zipf_stream(20000, 500, seed=2)
+    summary = summarize(stream, 50)
+    # Every item more frequent than N / capacity is in the summary.
+    for item, true_count in Counter(stream).items():
+        if true_count > len(stream) / 50:
+            assert item in summary.counts
+
+
+def test_list_round_trip():
+    summary = summarize(zipf_stream(5000, 200, seed=3), 20)
+    restored = SpaceSaving.from_list(20, summary.to_list())
+    assert restored.top() == summary.top()
+    assert restored.min_count() == summary.min_count()
+    restored.update('new word')
+    assert 'new word' in restored.counts
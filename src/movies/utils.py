@@ -1,12 +1,106 @@
+import argparse
+import os
 import re
 import string
-import nltk
-from nltk.corpus import stopwords
+from functools import lru_cache
+from typing import Optional, FrozenSet, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 languages = ['english', 'italian', 'french']
-nltk.download('stopwords')
-languages_stopwords = [stopwords.words(language) for language in languages]
-all_stopwords = set([word for language_stopwords in languages_stopwords for word in language_stopwords])
+# A snapshot of the stop words of all the languages, one per line. Ship it with the job through --stopwords.
+stopwords_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stopwords.txt')
+
+# The translate tables and the regex are built once, instead of once per call.
+punctuation_table = str.maketrans('', '', string.punctuation)
+digits_table = str.maketrans('', '', string.digits)
+# From https://stackoverflow.com/a/68050802
+roman_numerals_pattern = re.compile(r"\b(?=[mdclxvii])m{0,4}(cm|cd|d?c{0,3})(xc|xl|l?x{0,3})"
+                                    r"([ii]x|[ii]v|v?[ii]{0,3})\b\.?",
+                                    flags=re.I)
+
+
+@lru_cache(maxsize=None)
+def load_stopwords(path: str) -> FrozenSet[str]:
+    """
+    Load the stop words from a snapshot file or, if it does not exist, from the local NLTK data. Nothing is downloaded.
+
+    :param path: The location of the snapshot file.
+    :return: The stop words of all the languages.
+    """
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as snapshot_file:
+            return frozenset(line.rstrip('\n') for line in snapshot_file if line.strip())
+    from nltk.corpus import stopwords
+    try:
+        return frozenset(word for language in languages for word in stopwords.words(language))
+    except LookupError as e:
+        raise LookupError(f"No stop words snapshot at {path} and no local NLTK stopwords corpus. "
+                          f"Run 'python utils.py --download' once to create the snapshot.") from e
+
+
+def get_stopwords() -> FrozenSet[str]:
+    """
+    Get the stop words, loading them on first use from stopwords_path.
+
+    :return: The stop words of all the languages.
+    """
+    return load_stopwords(stopwords_path)
+
+
+def set_stopwords_path(path: str) -> None:
+    """
+    Load the stop words from another snapshot file. The cached preprocessed words and texts, which depend on the stop
+    words, are cleared when the path changes.
+
+    :param path: The location of the snapshot file.
+    :return: None
+    """
+    global stopwords_path
+    if path != stopwords_path:
+        stopwords_path = path
+        clear_caches()
+
+
+def clear_caches() -> None:
+    """
+    Clear the cached stop words and the cached preprocessed words and texts.
+
+    :return: None
+    """
+    load_stopwords.cache_clear()
+    preprocess_word.cache_clear()
+    preprocess_text.cache_clear()
+
+
+def download_stopwords(path: str = stopwords_path) -> FrozenSet[str]:
+    """
+    Download the NLTK stopwords corpus and write the stop words of all the languages to a snapshot file.
+
+    :param path: The location of the snapshot file.
+    :return: The stop words of all the languages.
+    """
+    import nltk
+    from nltk.corpus import stopwords
+    nltk.download('stopwords')
+    all_stopwords = frozenset(word for language in languages for word in stopwords.words(language))
+    with open(path, 'w', encoding='utf-8') as snapshot_file:
+        snapshot_file.writelines(f"{word}\n" for word in sorted(all_stopwords))
+    clear_caches()
+    return all_stopwords
+
+
+def __getattr__(name: str) -> FrozenSet[str]:
+    """
+    Keep all_stopwords available as a module attribute, loaded on first access.
+
+    :param name: The name of the attribute.
+    :return: The stop words of all the languages.
+    """
+    if name == 'all_stopwords':
+        return get_stopwords()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def remove_punctuation(text: str) -> str:
@@ -16,7 +110,7 @@ def remove_punctuation(text: str) -> str:
     :param text: A text string that may contain punctuation.
     :return: The text string without punctuation.
     """
-    return text.translate(str.maketrans('', '', string.punctuation))
+    return text.translate(punctuation_table)
 
 
 def remove_stop_words(text: str) -> str:
@@ -27,6 +121,7 @@ def remove_stop_words(text: str) -> str:
     :return: The text string without stop words.
     """
     text_tokens = text.split()
+    all_stopwords = get_stopwords()
     return " ".join([x for x in text_tokens if x not in all_stopwords])
 
 
@@ -38,7 +133,7 @@ def remove_numbers(text: str) -> str:
     :return: A string without numbers.
     """
     # From https://stackoverflow.com/a/68325680
-    return text.translate(str.maketrans('', '', string.digits))
+    return text.translate(digits_table)
 
 
 def remove_roman_numerals(text: str) -> str:
@@ -48,14 +143,66 @@ def remove_roman_numerals(text: str) -> str:
     :param text: A text that may contain roman numerals.
     :return: A text without Roman numerals.
     """
-    # From https://stackoverflow.com/a/68050802
-    pattern = r"\b(?=[mdclxvii])m{0,4}(cm|cd|d?c{0,3})(xc|xl|l?x{0,3})([ii]x|[ii]v|v?[ii]{0,3})\b\.?"
-    return re.sub(pattern, '', text, flags=re.I)
+    return roman_numerals_pattern.sub('', text)
+
+
+@lru_cache(maxsize=65536)
+def preprocess_word(word: str) -> Optional[str]:
+    """
+    Remove the numbers, Roman numerals and punctuation from a lowercase word, or drop it if it is a stop word. None of
+    the steps of preprocess_text can merge or split whitespace-separated words, so they can be applied word by word,
+    and the results are cached, as titles share most of their words.
+
+    :param word: A lowercase word, without whitespace.
+    :return: The preprocessed word, or None if it is dropped.
+    """
+    result = remove_roman_numerals(remove_numbers(word))
+    if not result or result in get_stopwords():
+        return None
+    return remove_punctuation(result)
+
+
+def join_words(text: str) -> str:
+    """
+    Preprocess the words of a lowercase string and join the ones that are kept.
+
+    :param text: A lowercase text string.
+    :return: The preprocessed text string.
+    """
+    return " ".join([word for word in map(preprocess_word, text.split()) if word is not None])
 
 
+@lru_cache(maxsize=65536)
 def preprocess_text(text: str) -> str:
-    result = text.lower()
-    methods = [remove_numbers, remove_roman_numerals, remove_stop_words, remove_punctuation]
-    for method in methods:
-        result = method(result)
-    return result
+    """
+    Lowercase a string and remove its numbers, Roman numerals, stop words and punctuation.
+
+    :param text: A text string.
+    :return: The preprocessed text string.
+    """
+    return join_words(text.lower())
+
+
+def preprocess_texts(texts: 'pd.Series') -> 'pd.Series':
+    """
+    Preprocess a whole column of strings like preprocess_text. Each distinct string is only processed once. pandas is
+    imported here, so that importing this module stays cheap.
+
+    :param texts: A series of text strings.
+    :return: A series with the preprocessed text strings, with the same index.
+    """
+    import pandas as pd
+    unique_texts = pd.Series(texts.unique())
+    clean_texts = unique_texts.str.lower().map(join_words)
+    return texts.map(dict(zip(unique_texts.tolist(), clean_texts.tolist())))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Manage the stop words snapshot used by the movie jobs.")
+    parser.add_argument("--download", action="store_true", help="Download the NLTK stop words to the snapshot.")
+    parser.add_argument("--path", default=stopwords_path, help="The location of the snapshot file.")
+    args = parser.parse_args()
+    if args.download:
+        print(f"Wrote {len(download_stopwords(args.path))} stop words to {args.path}.")
+    else:
+        print(f"{len(load_stopwords(args.path))} stop words available.")
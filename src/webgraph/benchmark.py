@@ -0,0 +1,46 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from job import RevertGraphJob
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from benchmarks.generators import write_power_law_graph  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the output size of RevertGraphJob.")
+    parser.add_argument("--nodes", type=int, default=100000)
+    parser.add_argument("--edges", type=int, default=1000000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'graph.txt')
+        edges = write_power_law_graph(path, args.nodes, args.edges)
+
+        # The previous version of the job wrote one JSON (destination, source) line per edge.
+        per_edge_bytes = sum(len(f"{json.dumps(int(d))}\t{json.dumps(int(s))}\n") for s, d in edges)
+        n_destinations = len(np.unique(edges[:, 1]))
+        print(f"{args.edges} edges, {n_destinations} destinations, max in-degree "
+              f"{np.bincount(edges[:, 1]).max()}")
+        print(f"{'output':>10} {'records':>10} {'bytes':>12} {'ratio':>6} {'time (s)':>9}")
+        print(f"{'per edge':>10} {args.edges:>10} {per_edge_bytes:>12} {1.:>6.2f} {'-':>9}")
+        for output_format in ['list', 'delta', 'varint']:
+            job = RevertGraphJob([path, '--outputFormat', output_format])
+            start = time.perf_counter()
+            with job.make_runner() as runner:
+                runner.run()
+                output = b''.join(runner.cat_output())
+            elapsed = time.perf_counter() - start
+            records = output.count(b'\n')
+            print(f"{output_format:>10} {records:>10} {len(output):>12} "
+                  f"{len(output) / per_edge_bytes:>6.2f} {elapsed:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from job import RevertGraphJob
+from pagerank import PageRankJob
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from benchmarks.generators import write_power_law_graph  # noqa: E402
+
+
+def run(job_args: List[str]) -> Tuple[float, Dict[int, float], List[Dict[str, Dict[str, int]]]]:
+    """
+    Run a PageRankJob with the inline runner.
+
+    :param job_args: The arguments of the job.
+    :return: The wall time in seconds, the ranks, and the counters of the steps.
+    """
+    job = PageRankJob(job_args)
+    start = time.perf_counter()
+    with job.make_runner() as runner:
+        runner.run()
+        ranks = dict(job.parse_output(runner.cat_output()))
+        return time.perf_counter() - start, ranks, runner.counters()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the time per iteration of PageRankJob, in memory over "
+                                                 "CSR arrays and as a chain of MRSteps.")
+    parser.add_argument("--nodes", type=int, default=20000)
+    parser.add_argument("--edges", type=int, default=200000)
+    parser.add_argument("--iterations", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        graph_path = os.path.join(directory, 'graph.txt')
+        adjacency_path = os.path.join(directory, 'adjacency.txt')
+        write_power_law_graph(graph_path, args.nodes, args.edges)
+        with RevertGraphJob([graph_path]).make_runner() as runner:
+            runner.run()
+            with open(adjacency_path, 'wb') as adjacency_file:
+                for chunk in runner.cat_output():
+                    adjacency_file.write(chunk)
+
+        common_args = [adjacency_path, '--maxIterations', str(args.iterations), '--tolerance', '0']
+        csr_time, csr_ranks, csr_counters = run(common_args)
+        chain_time, chain_ranks, _ = run(common_args + ['--chain'])
+        iteration_times = [value for step in csr_counters
+                           for value in step.get('pagerank iteration time (us)', {}).values()]
+        nodes = sorted(csr_ranks)
+        difference = np.abs(np.array([csr_ranks[node] - chain_ranks[node] for node in nodes])).max()
+
+        print(f"{args.edges} edges, {len(nodes)} nodes, {args.iterations} iterations, "
+              f"max rank difference {difference:.2e}")
+        # The per-iteration time of the runs includes their fixed costs; the CSR reducer also reports the time of its
+        # in-memory iterations alone.
+        print(f"{'mode':>14} {'total (s)':>10} {'per iteration (ms)':>19}")
+        print(f"{'chain':>14} {chain_time:>10.2f} {chain_time / args.iterations * 1000:>19.2f}")
+        print(f"{'csr':>14} {csr_time:>10.2f} {csr_time / args.iterations * 1000:>19.2f}")
+        print(f"{'csr in memory':>14} {'-':>10} {np.mean(iteration_times) / 1000:>19.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+from collections import deque
+from typing import Callable, Generator, Tuple
+
+from job import RevertGraphJob
+from utils import convert_to_binary
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from benchmarks.generators import write_power_law_graph  # noqa: E402
+
+
+def legacy_mapper(input_path: str) -> Generator[Tuple[int, int], None, None]:
+    """
+    The previous mapper of the job: one split and two int calls per line, and one (destination, source) pair per edge.
+
+    :param input_path: The location of the text edge file.
+    :return: Key-value tuples with key=destination_node and value=source_node.
+    """
+    with open(input_path, 'r') as input_file:
+        for line in input_file:
+            if line.startswith('#'):
+                continue
+            source, destination = line.split()
+            yield int(destination), int(source)
+
+
+def throughput(mapper: Callable[[], object], n_edges: int, repeat: int) -> float:
+    """
+    Measure the best throughput of a mapper.
+
+    :param mapper: A function that runs the mapper to completion.
+    :param n_edges: The number of edges of the input.
+    :param repeat: How many times to run the mapper.
+    :return: The throughput, in edges per second.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        mapper()
+        best = min(best, time.perf_counter() - start)
+    return n_edges / best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the edge parsing throughput of the RevertGraphJob mapper.")
+    parser.add_argument("--nodes", type=int, default=100000)
+    parser.add_argument("--edges", type=int, default=1000000)
+    parser.add_argument("--blockEdges", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        text_path = os.path.join(directory, 'graph.txt')
+        binary_path = os.path.join(directory, 'graph.bin')
+        write_power_law_graph(text_path, args.nodes, args.edges)
+        convert_to_binary(text_path, binary_path)
+        job = RevertGraphJob(['--blockEdges', str(args.blockEdges)])
+        mappers = [
+            ('legacy', lambda: deque(legacy_mapper(text_path), maxlen=0)),
+            ('text', lambda: deque(job.mapper_nodes(text_path, text_path), maxlen=0)),
+            ('binary', lambda: deque(job.mapper_nodes(binary_path, binary_path), maxlen=0)),
+        ]
+        print(f"{'input':>8} {'edges/s':>12} {'speedup':>8}")
+        baseline = None
+        for name, mapper in mappers:
+            edges_per_second = throughput(mapper, args.edges, args.repeat)
+            baseline = baseline or edges_per_second
+            print(f"{name:>8} {edges_per_second:>12,.0f} {edges_per_second / baseline:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
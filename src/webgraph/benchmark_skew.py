@@ -0,0 +1,59 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+from job import RevertGraphJob
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from benchmarks.generators import write_power_law_graph  # noqa: E402
+
+
+def reducer_times(counters: List[Dict[str, Dict[str, int]]]) -> List[List[int]]:
+    """
+    Get the reducer wall times reported by each step of a RevertGraphJob run.
+
+    :param counters: The counters of the steps, from runner.counters().
+    :return: For each step, the wall time of each reducer partition in milliseconds.
+    """
+    times = []
+    for step_counters in counters:
+        for group, partitions in step_counters.items():
+            if group.endswith('wall time (ms)'):
+                times.append([partitions[name] for name in sorted(partitions)])
+    return times
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the reducer balance of RevertGraphJob with --salt, on a "
+                                                 "skewed power-law graph, with the local runner.")
+    parser.add_argument("--nodes", type=int, default=100000)
+    parser.add_argument("--edges", type=int, default=2000000)
+    parser.add_argument("--exponent", type=float, default=2.0)
+    parser.add_argument("--salt", type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument("--heavyDegree", type=int, default=10000)
+    args = parser.parse_args()
+
+    directory_of_job = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'graph.txt')
+        write_power_law_graph(path, args.nodes, args.edges, args.exponent)
+        print(f"{'salt':>5} {'step':>5} {'reducers':>9} {'max (ms)':>9} {'mean (ms)':>10} {'max/mean':>9} "
+              f"{'total (s)':>10}")
+        for salt in args.salt:
+            job = RevertGraphJob(['-r', 'local', '--py-files', os.path.join(directory_of_job, 'utils.py'), path,
+                                  '--salt', str(salt), '--heavyDegree', str(args.heavyDegree)])
+            start = time.perf_counter()
+            with job.make_runner() as runner:
+                runner.run()
+                elapsed = time.perf_counter() - start
+                for step, times in enumerate(reducer_times(runner.counters()), 1):
+                    mean = sum(times) / len(times)
+                    print(f"{salt:>5} {step:>5} {len(times):>9} {max(times):>9} {mean:>10.1f} "
+                          f"{max(times) / max(mean, 1):>9.2f} {elapsed:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
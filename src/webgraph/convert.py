@@ -0,0 +1,18 @@
+import argparse
+
+from utils import convert_to_binary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Convert a SNAP edge list to the binary edge format of "
+                                                 "RevertGraphJob.")
+    parser.add_argument("input", help="The SNAP text edge list.")
+    parser.add_argument("output", help="The binary edge file.")
+    parser.add_argument("--width", type=int, choices=[32, 64], default=32, help="The width of the node ids, in bits.")
+    args = parser.parse_args()
+    n_edges = convert_to_binary(args.input, args.output, args.width // 8)
+    print(f"Converted {n_edges} edges to {args.output}.")
+
+
+if __name__ == '__main__':
+    main()
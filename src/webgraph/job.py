@@ -1,68 +1,296 @@
-from collections import Generator
-from typing import Tuple, List
+import os
+import sys
+import time
+from typing import Tuple, List, Generator, Union, Dict, Any, Iterable, Optional
 
+from mrjob.compat import jobconf_from_env
 from mrjob.job import MRJob, MRStep
 
+from utils import delta_encode, varint_encode, merge_sorted, parse_edges, group_by_destination, read_edge_blocks, \
+    find_heavy_nodes, read_heavy_nodes
 
-class RevertGraphJob(MRJob):
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from common.instrumentation import InstrumentationMixin  # noqa: E402
+from common.protocols import CompactProtocol  # noqa: E402
+
+OUTPUT_ENCODERS = {
+    'list': lambda sources: sources,
+    'delta': delta_encode,
+    'varint': varint_encode,
+}
+
+
+class RevertGraphJob(InstrumentationMixin, MRJob):
     """A mapreduce job that wraps the inversion of the edges in the Google web graph."""
 
+    # Upload the shared modules next to the job.
+    DIRS = ['../common']
+    INTERNAL_PROTOCOL = CompactProtocol
+
+    def configure_args(self) -> None:
+        """
+        Configure the command line arguments for running the job.
+
+        :return: None
+        """
+        super(RevertGraphJob, self).configure_args()
+        self.add_passthru_arg("--outputFormat",
+                              choices=sorted(OUTPUT_ENCODERS),
+                              default='list',
+                              help="How to write the sorted source nodes: as a list, as a delta-encoded list, or as "
+                                   "delta-encoded LEB128 varints in a base64 string.")
+        self.add_passthru_arg("-s",
+                              "--splitInput",
+                              action="store_true",
+                              help="Split the lines of text edge files across the mappers, instead of one mapper per "
+                                   "file. Binary edge files cannot be split by lines.")
+        self.add_passthru_arg("-b",
+                              "--blockEdges",
+                              type=int,
+                              default=100000,
+                              help="How many edges a mapper parses or reads at once.")
+        self.add_passthru_arg("--salt",
+                              type=int,
+                              default=1,
+                              help="Spread the source nodes of every heavy destination node across this many reducer "
+                                   "keys, and merge them back in a second step. 1 disables the salting.")
+        self.add_passthru_arg("--heavyDegree",
+                              type=int,
+                              default=10000,
+                              help="The smallest in-degree of a heavy node, with --salt. Each mapper finds the heavy "
+                                   "nodes of its input file with a pre-pass, unless --heavyNodes is given.")
+        self.add_file_arg("--heavyNodes",
+                          help="A file of heavy nodes, one per line, written by skew.py, for --salt. Required with "
+                               "--splitInput, as the mappers do not see their whole input then.")
+
+    def load_args(self, args: List[str]) -> None:
+        """
+        Parse the command line arguments, and check the salting options before the job is launched.
+
+        :param args: The command line arguments.
+        :return: None
+        """
+        super(RevertGraphJob, self).load_args(args)
+        for option in ['blockEdges', 'salt', 'heavyDegree']:
+            if getattr(self.options, option) < 1:
+                self.arg_parser.error(f"--{option} must be positive.")
+        if self.options.salt > 1 and self.options.splitInput and not self.options.heavyNodes:
+            self.arg_parser.error("--salt with --splitInput requires --heavyNodes, as the mappers do not see their "
+                                  "whole input.")
+
     def mapper_nodes(self,
                      input_path: str,
-                     _: str) -> Generator[Tuple[int, int], None, None]:
+                     _: str) -> Generator[Tuple[Union[int, List[int]], List[int]], None, None]:
         """
-        Reads the raw text file containing source destination node pairs.
+        Reads the raw text file containing source destination node pairs, about --blockEdges lines at a time.
+        Binary edge files (see utils.BINARY_HEADER) are detected automatically and memory-mapped.
 
         :param input_path: The location of the input file.
         :param _: The URI of the input (unused).
-        :return: Key-value tuples with key=source_node and value=destination_node.
+        :return: Key-value tuples with key=destination_node and value=sorted source nodes of the reverted edges of a
+        block (see salt_keys for the keys of heavy nodes).
+        """
+        self.load_heavy_nodes(input_path)
+        for edges in read_edge_blocks(input_path, self.options.blockEdges):
+            yield from self.salt_keys(group_by_destination(edges))
+
+    def load_heavy_nodes(self, input_path: Optional[str] = None) -> None:
+        """
+        Load the heavy nodes to salt from --heavyNodes or else find those of the input file, if salting, and start the
+        salts of the mapper at its task partition.
+
+        :param input_path: The location of the whole input file of the mapper, without --heavyNodes.
+        :return: None
+        """
+        self.heavy_nodes = set()
+        self.salt_offset = int(jobconf_from_env('mapreduce.task.partition', '0'))
+        if self.options.salt > 1:
+            if self.options.heavyNodes:
+                self.heavy_nodes = read_heavy_nodes(self.options.heavyNodes)
+            else:
+                self.heavy_nodes = find_heavy_nodes(input_path, self.options.heavyDegree, self.options.blockEdges)
+
+    def salt_keys(self,
+                  pairs: Iterable[Tuple[int, List[int]]]) -> Generator[Tuple[Union[int, List[int]], List[int]],
+                                                                       None, None]:
+        """
+        Spread the sorted source nodes of the heavy destination nodes across --salt [destination_node, salt] keys,
+        which are partitioned independently. Every salt gets every --salt-th source node, so its list stays sorted.
+        When a block has fewer source nodes of a heavy node than --salt, they would always go to the first salts, so
+        the first salt is rotated by the destination node, the task partition and the block.
+
+        :param pairs: Tuples consisting of a destination node and its sorted source nodes.
+        :return: The tuples of the light nodes unchanged, and up to --salt tuples for each heavy node.
+        """
+        salt = self.options.salt
+        self.salt_offset += 1
+        for destination, sources in pairs:
+            if destination not in self.heavy_nodes:
+                yield destination, sources
+                continue
+            first_salt = self.salt_offset + destination
+            for index in range(min(salt, len(sources))):
+                yield [destination, (first_salt + index) % salt], sources[index::salt]
+
+    def mapper_init_lines(self) -> None:
+        """
+        Initialize the line buffer of the mapper, and load the heavy nodes.
+
+        :return: None
+        """
+        self.lines = []
+        self.load_heavy_nodes()
+
+    def mapper_lines(self,
+                     _: None,
+                     line: str) -> Generator[Tuple[Union[int, List[int]], List[int]], None, None]:
+        """
+        Buffers an edge line, and reverts the buffered edges once there are --blockEdges of them.
+
+        :param _: The key (unused).
+        :param line: A 'source destination' line.
+        :return: Key-value tuples with key=destination_node and value=sorted source nodes of the reverted edges of a
+        block.
         """
-        with open(input_path, 'r') as input_file:
-            for line in input_file:
-                # Just skip the comment lines
-                if line.startswith('#'):
-                    continue
-                source_node, destination_node = map(int, line.split())
-                yield source_node, destination_node
+        # Just skip the comment lines
+        if line.startswith('#') or line.isspace():
+            return
+        self.lines.append(line)
+        if len(self.lines) >= self.options.blockEdges:
+            yield from self.mapper_final_lines()
+
+    def mapper_final_lines(self) -> Generator[Tuple[Union[int, List[int]], List[int]], None, None]:
+        """
+        Parse the buffered edge lines as a block and revert them.
+
+        :return: Key-value tuples with key=destination_node and value=sorted source nodes of the reverted edges of the
+        block.
+        """
+        if not self.lines:
+            return
+        edges = parse_edges(self.lines)
+        self.lines = []
+        yield from self.salt_keys(group_by_destination(edges))
+
+    def mapper_kwargs(self) -> Dict[str, Any]:
+        """
+        Select the mapper of the step: either every mapper reads a whole file, or the lines are split across the
+        mappers.
+
+        :return: The mapper keyword arguments of the MRStep.
+        """
+        if self.options.splitInput:
+            return dict(mapper_init=self.mapper_init_lines,
+                        mapper=self.mapper_lines,
+                        mapper_final=self.mapper_final_lines)
+        return dict(mapper_raw=self.mapper_nodes)
 
     def combiner(self,
-                 key: int,
-                 values: List[int]) -> Generator[Tuple[int, int], None, None]:
+                 key: Union[int, List[int]],
+                 values: List[List[int]]) -> Generator[Tuple[Union[int, List[int]], List[int]], None, None]:
         """
-        Combine the pairs with the same key (source_node).
+        Combine the pairs with the same key (destination_node) into a single sorted list of source nodes.
         This step happens locally in the mapper node.
 
-        :param key: Source node.
-        :param values: Destination nodes.
-        :return: Key-value pairs where the key is the source node and the value is a list of destination nodes.
+        :param key: Destination node, or [destination_node, salt].
+        :param values: Sorted lists of source nodes, one per block.
+        :return: Key-value pairs where the key is the destination node and the value is the sorted list of the source
+        nodes of the mapper node.
+        """
+        yield key, merge_sorted(values)
+
+    def reducer_init_timing(self) -> None:
+        """
+        Start timing the reducer task.
+
+        :return: None
+        """
+        self.reducer_start = time.perf_counter()
+        self.reducer_sources = 0
+
+    def reducer_final_timing(self, group: str) -> None:
+        """
+        Report the wall-clock time and the number of source nodes of the reducer task as counters of the group, one per
+        task partition, so that the balance of the reducers can be checked.
+
+        :param group: The counter group.
+        :return: None
+        """
+        partition = jobconf_from_env('mapreduce.task.partition', '0')
+        self.increment_counter(f'{group} wall time (ms)', f'partition {partition}',
+                               int((time.perf_counter() - self.reducer_start) * 1000))
+        self.increment_counter(f'{group} source nodes', f'partition {partition}', self.reducer_sources)
+
+    def reducer_final_graph(self) -> None:
+        """
+        Report the timing of the reducer that reverts the graph.
+
+        :return: None
+        """
+        self.reducer_final_timing('reducer')
+
+    def reducer_final_merge(self) -> None:
+        """
+        Report the timing of the reducer that merges the salted keys back.
+
+        :return: None
+        """
+        self.reducer_final_timing('merge reducer')
+
+    def reducer_salted(self,
+                       key: Union[int, List[int]],
+                       values: List[List[int]]) -> Generator[Tuple[int, List[int]], None, None]:
+        """
+        Reduce the pairs with the same (possibly salted) key into a sorted list of source nodes, and remove the salt.
+
+        :param key: The destination node, or [destination_node, salt].
+        :param values: Sorted lists of source nodes of the key, emitted by different mapper nodes.
+        :return: Key-value pairs where the key is the destination node and the value is the sorted list of the source
+        nodes of the key.
         """
-        yield key, values
+        sources = merge_sorted(values)
+        self.reducer_sources += len(sources)
+        yield key[0] if isinstance(key, list) else key, sources
 
     def reducer(self,
                 key: int,
-                values: List[List[int]]) -> Generator[Tuple[int, int], None, None]:
+                values: List[List[int]]) -> Generator[Tuple[int, Union[List[int], str]], None, None]:
         """
-        Reduce the pairs with the same key (from across different mapper nodes).
+        Reduce the pairs with the same key (from across different mapper nodes or salts) into the adjacency list of
+        the reverted graph.
 
-        :param key: The source node.
-        :param values: Nested list containing lists of neighbours of a single key emitted by different mappers.
-        :return: Key-value pairs where they key is the source node and the value is a (flat) list of all neighbours.
+        :param key: The destination node.
+        :param values: Sorted lists of source nodes of the key, emitted by different mapper nodes or salts.
+        :return: Key-value pairs where the key is the destination node and the value is the sorted list of all its
+        source nodes, encoded according to --outputFormat.
         """
-        # Flatten the neighbours list, which is nested at this point.
-        flat_values = [item for sublist in values for item in sublist]
-        for value in flat_values:
-            yield value, key
+        sources = merge_sorted(values)
+        self.reducer_sources += len(sources)
+        yield key, OUTPUT_ENCODERS[self.options.outputFormat](sources)
 
     def steps(self):
         """
-        Define the job steps. As there can only be 1 reducer step, another MRStep has to be defined for the sorting.
+        Define the job steps. With --salt, the salted keys are reduced in the first step and merged back into their
+        destination nodes in a second step.
 
         :return: The list of the steps of the job.
         """
+        if self.options.salt > 1:
+            return [
+                MRStep(**self.mapper_kwargs(),
+                       combiner=self.combiner,
+                       reducer_init=self.reducer_init_timing,
+                       reducer=self.reducer_salted,
+                       reducer_final=self.reducer_final_graph),
+                MRStep(reducer_init=self.reducer_init_timing,
+                       reducer=self.reducer,
+                       reducer_final=self.reducer_final_merge)]
         return [
-            MRStep(mapper_raw=self.mapper_nodes,
+            MRStep(**self.mapper_kwargs(),
                    combiner=self.combiner,
-                   reducer=self.reducer)]
+                   reducer_init=self.reducer_init_timing,
+                   reducer=self.reducer,
+                   reducer_final=self.reducer_final_graph)]
 
 
 if __name__ == '__main__':
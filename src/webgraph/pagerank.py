@@ -0,0 +1,304 @@
+import os
+import sys
+import time
+from typing import Tuple, List, Generator, Union, Optional, Callable
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from mrjob.job import MRJob, MRStep
+from mrjob.protocol import JSONProtocol
+
+from utils import delta_decode, varint_decode
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from common.instrumentation import InstrumentationMixin  # noqa: E402
+from common.protocols import CompactProtocol  # noqa: E402
+
+INPUT_DECODERS = {
+    'list': lambda sources: sources,
+    'delta': delta_decode,
+    'varint': varint_decode,
+}
+
+
+def build_in_links(destinations: np.ndarray,
+                   counts: np.ndarray,
+                   sources: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Number the nodes of a graph given by its inverted adjacency lists.
+
+    :param destinations: The destination nodes.
+    :param counts: The number of source nodes of each destination node.
+    :param sources: The concatenated source nodes of the destination nodes.
+    :return: The sorted nodes, and the (destination, source) indices of every edge into them.
+    """
+    nodes = np.unique(np.concatenate([destinations, sources]))
+    rows = np.repeat(np.searchsorted(nodes, destinations), counts)
+    columns = np.searchsorted(nodes, sources)
+    return nodes, rows, columns
+
+
+def in_link_matrix(rows: np.ndarray, columns: np.ndarray, n_nodes: int) -> csr_matrix:
+    """
+    Build the in-link matrix of a graph, where the (v, u) entry is 1 / C(u) for every edge u -> v.
+
+    :param rows: The destination index of every edge.
+    :param columns: The source index of every edge.
+    :param n_nodes: The number of nodes.
+    :return: The in-link matrix, in CSR form.
+    """
+    out_degrees = np.bincount(columns, minlength=n_nodes)
+    index_dtype = np.int32 if n_nodes < np.iinfo(np.int32).max else np.int64
+    return csr_matrix((1. / out_degrees[columns], (rows.astype(index_dtype), columns.astype(index_dtype))),
+                      shape=(n_nodes, n_nodes))
+
+
+def iterate_pagerank(matrix: csr_matrix,
+                     damping: float,
+                     max_iterations: int,
+                     tolerance: float,
+                     report: Optional[Callable[[int, float, float], None]] = None) -> np.ndarray:
+    """
+    Iterate PR = (1 - d) + d * M @ PR from PR = 1, until the mean absolute change is below the tolerance.
+
+    :param matrix: The in-link matrix, see in_link_matrix.
+    :param damping: The damping factor d.
+    :param max_iterations: The maximum number of iterations.
+    :param tolerance: The mean absolute change of the ranks that stops the iterations.
+    :param report: An optional function called with the number, the change and the wall time of each iteration.
+    :return: The ranks.
+    """
+    ranks = np.ones(matrix.shape[0])
+    for iteration in range(1, max_iterations + 1):
+        start = time.perf_counter()
+        new_ranks = (1 - damping) + damping * (matrix @ ranks)
+        change = np.abs(new_ranks - ranks).mean() if len(ranks) else 0.
+        ranks = new_ranks
+        if report is not None:
+            report(iteration, change, time.perf_counter() - start)
+        if change < tolerance:
+            break
+    return ranks
+
+
+class PageRankJob(InstrumentationMixin, MRJob):
+    """
+    A mapreduce job that ranks the nodes of the web graph with PageRank, from the inverted adjacency lists written by
+    RevertGraphJob. It uses the formula of Brin and Page, PR(v) = (1 - d) + d * sum(PR(u) / C(u)) over the in-links
+    u -> v, where C(u) is the out-degree of u, so the ranks average to 1.
+    """
+
+    # Upload the shared modules next to the job.
+    DIRS = ['../common']
+    INPUT_PROTOCOL = JSONProtocol
+    INTERNAL_PROTOCOL = CompactProtocol
+
+    def configure_args(self) -> None:
+        """
+        Configure the command line arguments for running the job.
+
+        :return: None
+        """
+        super(PageRankJob, self).configure_args()
+        self.add_passthru_arg("--inputFormat",
+                              choices=sorted(INPUT_DECODERS),
+                              default='list',
+                              help="The --outputFormat of the RevertGraphJob that wrote the input.")
+        self.add_passthru_arg("-d",
+                              "--damping",
+                              type=float,
+                              default=0.85,
+                              help="The damping factor.")
+        self.add_passthru_arg("--maxIterations",
+                              type=int,
+                              default=20,
+                              help="The maximum number of iterations.")
+        self.add_passthru_arg("--tolerance",
+                              type=float,
+                              default=1e-6,
+                              help="Stop iterating once the mean absolute change of the ranks is below this value.")
+        self.add_passthru_arg("--chain",
+                              action="store_true",
+                              help="Run every iteration as its own MRStep, shuffling the adjacency lists with the "
+                                   "ranks. The chain always runs --maxIterations steps and only reports the change "
+                                   "of each iteration as a counter.")
+        self.add_passthru_arg("-b",
+                              "--blockLines",
+                              type=int,
+                              default=10000,
+                              help="How many adjacency lists a mapper sends to the CSR reducer at once.")
+
+    def mapper_init_blocks(self) -> None:
+        """
+        Initialize the adjacency list buffers of the mapper.
+
+        :return: None
+        """
+        self.destinations = []
+        self.counts = []
+        self.sources = []
+
+    def mapper_blocks(self,
+                      destination: int,
+                      sources: Union[List[int], str]) -> Generator[Tuple[None, List[List[int]]], None, None]:
+        """
+        Buffers an adjacency list, and emits the buffered lists once there are --blockLines of them.
+
+        :param destination: The destination node.
+        :param sources: Its sorted source nodes, encoded according to --inputFormat.
+        :return: Blocks of adjacency lists, see mapper_final_blocks.
+        """
+        sources = INPUT_DECODERS[self.options.inputFormat](sources)
+        self.destinations.append(destination)
+        self.counts.append(len(sources))
+        self.sources.extend(sources)
+        if len(self.destinations) >= self.options.blockLines:
+            yield from self.mapper_final_blocks()
+
+    def mapper_final_blocks(self) -> Generator[Tuple[None, List[List[int]]], None, None]:
+        """
+        Emit the buffered adjacency lists as a single block, so that the whole graph goes to a single reducer once.
+
+        :return: A key-value pair with key=None and value=[destination nodes, numbers of source nodes, concatenated
+        source nodes].
+        """
+        if self.destinations:
+            yield None, [self.destinations, self.counts, self.sources]
+        self.mapper_init_blocks()
+
+    def reducer_iterate(self,
+                        _: None,
+                        blocks: List[List[List[int]]]) -> Generator[Tuple[int, float], None, None]:
+        """
+        Build the in-link matrix of the graph in CSR form once, and iterate the ranks in memory until they converge,
+        so only the rank vector changes across the iterations.
+
+        :param _: The key (unused).
+        :param blocks: The blocks of adjacency lists, see mapper_final_blocks.
+        :return: Key-value pairs where the key is a node and the value is its rank.
+        """
+        destinations, counts, sources = [], [], []
+        for block_destinations, block_counts, block_sources in blocks:
+            destinations.extend(block_destinations)
+            counts.extend(block_counts)
+            sources.extend(block_sources)
+        destinations = np.array(destinations, dtype=np.int64)
+        sources = np.array(sources, dtype=np.int64)
+        nodes, rows, columns = build_in_links(destinations, np.array(counts, dtype=np.int64), sources)
+        ranks = iterate_pagerank(in_link_matrix(rows, columns, len(nodes)),
+                                 self.options.damping,
+                                 self.options.maxIterations,
+                                 self.options.tolerance,
+                                 self.report_iteration)
+        yield from zip(nodes.tolist(), ranks.tolist())
+
+    def report_iteration(self, iteration: int, change: float, elapsed: float) -> None:
+        """
+        Report an iteration of the CSR reducer as counters.
+
+        :param iteration: The number of the iteration, from 1.
+        :param change: The mean absolute change of the ranks.
+        :param elapsed: The wall time of the iteration, in seconds.
+        :return: None
+        """
+        self.increment_counter('pagerank', 'iterations', 1)
+        self.increment_counter('pagerank iteration time (us)', f'iteration {iteration:03d}', int(elapsed * 1e6))
+        self.increment_counter('pagerank change (1e-9)', f'iteration {iteration:03d}', int(change * 1e9))
+
+    def mapper_out_links(self,
+                         destination: int,
+                         sources: Union[List[int], str]) -> Generator[Tuple[int, Optional[int]], None, None]:
+        """
+        Revert the in-links back into out-links, for the chain.
+
+        :param destination: The destination node.
+        :param sources: Its sorted source nodes, encoded according to --inputFormat.
+        :return: Key-value pairs (source node, destination node), and (destination node, None) so that nodes without
+        out-links exist too.
+        """
+        yield destination, None
+        for source in INPUT_DECODERS[self.options.inputFormat](sources):
+            yield source, destination
+
+    def reducer_init_ranks(self,
+                           node: int,
+                           destinations: List[Optional[int]]) -> Generator[Tuple[int, List[Union[float, List[int]]]],
+                                                                           None, None]:
+        """
+        Build the initial record of a node for the chain.
+
+        :param node: The node.
+        :param destinations: Its out-links, and None values.
+        :return: A key-value pair with key=node and value=[rank, out-links].
+        """
+        yield node, [1.0, sorted(destination for destination in destinations if destination is not None)]
+
+    def mapper_contribute(self,
+                          node: int,
+                          record: List[Union[float, List[int]]]) -> Generator[Tuple[int, Union[float, List]], None,
+                                                                              None]:
+        """
+        Send the rank of a node to its out-links, along with its own record.
+
+        :param node: The node.
+        :param record: Its [rank, out-links] record.
+        :return: Key-value pairs with the record of the node, and the contribution to the rank of each out-link.
+        """
+        rank, out_links = record
+        yield node, record
+        for destination in out_links:
+            yield destination, rank / len(out_links)
+
+    def reducer_rank(self,
+                     node: int,
+                     values: List[Union[float, List]]) -> Generator[Tuple[int, List[Union[float, List[int]]]],
+                                                                    None, None]:
+        """
+        Add the contributions to the rank of a node and update its record.
+
+        :param node: The node.
+        :param values: Its record and the contributions of its in-links.
+        :return: A key-value pair with key=node and value=[rank, out-links].
+        """
+        record = None
+        total = 0.
+        for value in values:
+            if isinstance(value, list):
+                record = value
+            else:
+                total += value
+        rank = (1 - self.options.damping) + self.options.damping * total
+        self.increment_counter('pagerank change (1e-9)', 'total', int(abs(rank - record[0]) * 1e9))
+        yield node, [rank, record[1]]
+
+    def mapper_ranks(self,
+                     node: int,
+                     record: List[Union[float, List[int]]]) -> Generator[Tuple[int, float], None, None]:
+        """
+        Drop the out-links of the final records.
+
+        :param node: The node.
+        :param record: Its [rank, out-links] record.
+        :return: A key-value pair with key=node and value=rank.
+        """
+        yield node, record[0]
+
+    def steps(self) -> List:
+        """
+        Define the job steps: either a single step that sends the graph to a single reducer, which iterates in memory,
+        or the naive chain of one MRStep per iteration.
+
+        :return: The list of the steps of the job.
+        """
+        if not self.options.chain:
+            return [MRStep(mapper_init=self.mapper_init_blocks,
+                           mapper=self.mapper_blocks,
+                           mapper_final=self.mapper_final_blocks,
+                           reducer=self.reducer_iterate)]
+        return ([MRStep(mapper=self.mapper_out_links, reducer=self.reducer_init_ranks)] +
+                [MRStep(mapper=self.mapper_contribute, reducer=self.reducer_rank)] * self.options.maxIterations +
+                [MRStep(mapper=self.mapper_ranks)])
+
+
+if __name__ == '__main__':
+    job = PageRankJob().run()
@@ -0,0 +1,33 @@
+import argparse
+
+import numpy as np
+
+from utils import in_degree_histogram
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Print the in-degree histogram of an edge file and write its heavy "
+                                                 "nodes, for RevertGraphJob's --salt --heavyNodes.")
+    parser.add_argument("input", help="The edge file, text or binary.")
+    parser.add_argument("--heavyDegree", type=int, default=10000, help="The smallest in-degree of a heavy node.")
+    parser.add_argument("--output", help="Where to write the heavy nodes, one per line.")
+    args = parser.parse_args()
+
+    nodes, degrees = in_degree_histogram(args.input)
+    print(f"{len(nodes)} destination nodes, {degrees.sum()} edges")
+    # Powers of two buckets: [1, 2), [2, 4), [4, 8), ...
+    buckets = np.bincount(np.log2(degrees).astype(int)) if len(degrees) else []
+    print(f"{'in-degree':>20} {'nodes':>10} {'edges':>12}")
+    for bucket, n_nodes in enumerate(buckets):
+        if n_nodes:
+            in_bucket = (degrees >= 2 ** bucket) & (degrees < 2 ** (bucket + 1))
+            print(f"{f'[{2 ** bucket}, {2 ** (bucket + 1)})':>20} {n_nodes:>10} {degrees[in_bucket].sum():>12}")
+    heavy = nodes[degrees >= args.heavyDegree]
+    print(f"{len(heavy)} heavy nodes with in-degree >= {args.heavyDegree}, with "
+          f"{degrees[degrees >= args.heavyDegree].sum()} edges")
+    if args.output:
+        np.savetxt(args.output, heavy, fmt='%d')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,250 @@
+import base64
+import itertools
+import struct
+from typing import List, Iterator, Tuple, Set, Iterable
+
+import numpy as np
+
+BINARY_MAGIC = b'BINEDGES'
+# The header of the binary edge format: the magic, the item size of the node ids (4 for uint32, 8 for uint64), padding
+# and the number of edges. It is followed by the little-endian (source, destination) pairs.
+BINARY_HEADER = struct.Struct('<8sB7xQ')
+BINARY_DTYPES = {4: '<u4', 8: '<u8'}
+
+
+def delta_encode(sorted_values: List[int]) -> List[int]:
+    """
+    Delta-encode a sorted list of integers: the first value, then the differences between consecutive values.
+
+    :param sorted_values: A list of integers in ascending order.
+    :return: The delta-encoded list, of small non-negative integers after the first one.
+    """
+    return [value - previous for previous, value in zip([0] + sorted_values, sorted_values)]
+
+
+def delta_decode(deltas: List[int]) -> List[int]:
+    """
+    Decode a delta-encoded list of integers.
+
+    :param deltas: A delta-encoded list.
+    :return: The original sorted list.
+    """
+    values = []
+    total = 0
+    for delta in deltas:
+        total += delta
+        values.append(total)
+    return values
+
+
+def varint_encode(sorted_values: List[int]) -> str:
+    """
+    Delta-encode a sorted list of non-negative integers and pack the deltas as LEB128 varints (7 bits per byte), in a
+    base64 string.
+
+    :param sorted_values: A list of non-negative integers in ascending order.
+    :return: The base64 string.
+    """
+    packed = bytearray()
+    for delta in delta_encode(sorted_values):
+        while delta >= 0x80:
+            packed.append((delta & 0x7f) | 0x80)
+            delta >>= 7
+        packed.append(delta)
+    return base64.b64encode(bytes(packed)).decode('ascii')
+
+
+def varint_decode(encoded: str) -> List[int]:
+    """
+    Decode a base64 string of LEB128 varint deltas.
+
+    :param encoded: The base64 string, from varint_encode.
+    :return: The original sorted list.
+    """
+    deltas = []
+    delta = shift = 0
+    for byte in base64.b64decode(encoded):
+        delta |= (byte & 0x7f) << shift
+        shift += 7
+        if not byte & 0x80:
+            deltas.append(delta)
+            delta = shift = 0
+    return delta_decode(deltas)
+
+
+def merge_sorted(runs: Iterable[List[int]]) -> List[int]:
+    """
+    Merge sorted lists into a single sorted list. Timsort finds the sorted runs of the concatenation and merges them
+    in C, which is several times faster than heapq.merge.
+
+    :param runs: Sorted lists.
+    :return: The sorted list of all their elements.
+    """
+    return sorted(itertools.chain.from_iterable(runs))
+
+
+def parse_edges(lines: List[str]) -> np.ndarray:
+    """
+    Parse a block of 'source destination' lines in a single NumPy call.
+
+    :param lines: Edge lines, without comment lines.
+    :return: A (len(lines), 2) array of source, destination node ids.
+    """
+    values = np.fromstring(' '.join(lines), dtype=np.int64, sep=' ')
+    if values.size != 2 * len(lines):
+        raise ValueError("Every edge line must contain exactly a source and a destination node.")
+    return values.reshape(len(lines), 2)
+
+
+def group_by_destination(edges: np.ndarray) -> Iterator[Tuple[int, List[int]]]:
+    """
+    Group a block of edges by their destination node.
+
+    :param edges: A (n_edges, 2) array of source, destination node ids.
+    :return: An iterator of tuples consisting of a destination node and the sorted list of its source nodes.
+    """
+    if not len(edges):
+        return
+    order = np.lexsort((edges[:, 0], edges[:, 1]))
+    destinations = edges[order, 1]
+    # Convert to Python ints once and slice the list, as most groups are small.
+    sources = edges[order, 0].tolist()
+    starts = [0] + (np.flatnonzero(np.diff(destinations)) + 1).tolist()
+    ends = starts[1:] + [len(sources)]
+    for destination, start, end in zip(destinations[starts].tolist(), starts, ends):
+        yield destination, sources[start:end]
+
+
+def is_binary(path: str) -> bool:
+    """
+    Check whether an edge file is in the binary format.
+
+    :param path: The location of the edge file.
+    :return: True if the file starts with BINARY_MAGIC.
+    """
+    with open(path, 'rb') as input_file:
+        return input_file.read(len(BINARY_MAGIC)) == BINARY_MAGIC
+
+
+def open_binary_edges(path: str) -> np.ndarray:
+    """
+    Memory-map a binary edge file, without reading or copying its content.
+
+    :param path: The location of the edge file.
+    :return: A read-only (n_edges, 2) memory-mapped array of source, destination node ids.
+    """
+    with open(path, 'rb') as input_file:
+        _, item_size, n_edges = BINARY_HEADER.unpack(input_file.read(BINARY_HEADER.size))
+    if not n_edges:
+        return np.zeros((0, 2), dtype=BINARY_DTYPES[item_size])
+    return np.memmap(path, dtype=BINARY_DTYPES[item_size], mode='r', offset=BINARY_HEADER.size, shape=(n_edges, 2))
+
+
+def convert_to_binary(text_path: str,
+                      binary_path: str,
+                      item_size: int = 4,
+                      block_lines: int = 1000000) -> int:
+    """
+    Convert an edge list in the SNAP text format ('source destination' lines and '#' comment lines) to the binary
+    format, block_lines lines at a time.
+
+    :param text_path: The location of the text edge file.
+    :param binary_path: The location of the binary edge file.
+    :param item_size: The size of the node ids, 4 (uint32) or 8 (uint64) bytes.
+    :param block_lines: How many lines to parse at once.
+    :return: The number of edges.
+    """
+    dtype = np.dtype(BINARY_DTYPES[item_size])
+    n_edges = 0
+    with open(text_path, 'r') as input_file, open(binary_path, 'wb') as output_file:
+        output_file.write(BINARY_HEADER.pack(BINARY_MAGIC, item_size, 0))
+        lines = []
+        for line in input_file:
+            if not line.startswith('#') and not line.isspace():
+                lines.append(line)
+            if len(lines) >= block_lines:
+                n_edges += write_edges(output_file, parse_edges(lines), dtype)
+                lines = []
+        if lines:
+            n_edges += write_edges(output_file, parse_edges(lines), dtype)
+        output_file.seek(0)
+        output_file.write(BINARY_HEADER.pack(BINARY_MAGIC, item_size, n_edges))
+    return n_edges
+
+
+def write_edges(output_file, edges: np.ndarray, dtype: np.dtype) -> int:
+    """
+    Append a block of edges to a binary edge file.
+
+    :param output_file: The binary edge file, opened for writing.
+    :param edges: A (n_edges, 2) array of source, destination node ids.
+    :param dtype: The dtype of the node ids in the file.
+    :return: The number of edges written.
+    """
+    if edges.size and (edges.min() < 0 or edges.max() > np.iinfo(dtype).max):
+        raise ValueError(f"Node ids do not fit in {dtype}.")
+    output_file.write(np.ascontiguousarray(edges, dtype=dtype).tobytes())
+    return len(edges)
+
+
+def read_edge_blocks(path: str, block_edges: int) -> Iterator[np.ndarray]:
+    """
+    Read an edge file, text or binary, about block_edges edges at a time. Comment lines of text files are skipped,
+    and binary files are memory-mapped.
+
+    :param path: The location of the edge file.
+    :param block_edges: How many edges to read at once.
+    :return: An iterator of (n_edges, 2) int64 arrays of source, destination node ids.
+    """
+    if is_binary(path):
+        edges = open_binary_edges(path)
+        for start in range(0, len(edges), block_edges):
+            yield np.asarray(edges[start:start + block_edges], dtype=np.int64)
+        return
+    with open(path, 'r') as input_file:
+        while True:
+            # readlines takes a size hint in bytes; SNAP edge lines are about 16 bytes long.
+            lines = input_file.readlines(block_edges * 16)
+            if not lines:
+                break
+            lines = [line for line in lines if not line.startswith('#') and not line.isspace()]
+            if lines:
+                yield parse_edges(lines)
+
+
+def in_degree_histogram(path: str, block_edges: int = 1000000) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Count the in-degree of every destination node of an edge file.
+
+    :param path: The location of the edge file.
+    :param block_edges: How many edges to read at once.
+    :return: The sorted destination nodes and their in-degrees.
+    """
+    destinations = [block[:, 1].copy() for block in read_edge_blocks(path, block_edges)]
+    if not destinations:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return np.unique(np.concatenate(destinations), return_counts=True)
+
+
+def find_heavy_nodes(path: str, heavy_degree: int, block_edges: int = 1000000) -> Set[int]:
+    """
+    Find the destination nodes of an edge file with at least heavy_degree incoming edges.
+
+    :param path: The location of the edge file.
+    :param heavy_degree: The smallest in-degree of a heavy node.
+    :param block_edges: How many edges to read at once.
+    :return: The heavy nodes.
+    """
+    nodes, degrees = in_degree_histogram(path, block_edges)
+    return set(nodes[degrees >= heavy_degree].tolist())
+
+
+def read_heavy_nodes(path: str) -> Set[int]:
+    """
+    Read a heavy nodes file written by skew.py, with one node per line.
+
+    :param path: The location of the file.
+    :return: The heavy nodes.
+    """
+    with open(path, 'r') as input_file:
+        return {int(line) for line in input_file if line.strip()}